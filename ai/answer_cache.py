@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import random
+import re
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r'\w+')
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_question(text: str) -> str:
+    """Вопрос без регистра, пунктуации и лишних пробелов"""
+    return ' '.join(_WORD_RE.findall(text.lower().replace('ё', 'е')))
+
+
+def context_hash(context: str) -> str:
+    """Короткий отпечаток контекста курса, попавшего в промпт"""
+    return hashlib.blake2b(context.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _shingles(normalized: str, size: int = 3) -> Set[int]:
+    text = f' {normalized} '
+    if len(text) <= size:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)}
+
+
+class _Entry:
+    __slots__ = ('key', 'value', 'expires_at', 'signature', 'bands')
+
+    def __init__(self, key, value, expires_at, signature, bands):
+        self.key = key
+        self.value = value
+        self.expires_at = expires_at
+        self.signature = signature
+        self.bands = bands
+
+
+class AnswerCache:
+    """LRU-кэш ответов ИИ с TTL и поиском почти одинаковых вопросов.
+
+    Точный ключ — (вид, хэш контекста, нормализованный вопрос). Если точного
+    совпадения нет, кандидаты находятся через MinHash по символьным
+    триграммам и LSH-корзины; подходит запись с оценкой сходства Жаккара
+    не ниже ``similarity``.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 86400, similarity: float = 0.8,
+                 num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(0)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+        self._entries: 'OrderedDict[tuple, _Entry]' = OrderedDict()
+        self._buckets: Dict[tuple, Set[tuple]] = defaultdict(set)
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.near_hits + self.misses
+        return (self.hits + self.near_hits) / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики кэша для логов"""
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hit_rate, 3),
+        }
+
+    def _signature(self, normalized: str) -> Tuple[int, ...]:
+        hashes = _shingles(normalized)
+        return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms)
+
+    def _band_keys(self, kind: str, ctx_hash: str, signature: Tuple[int, ...]) -> List[tuple]:
+        return [(kind, ctx_hash, band, signature[band * self.rows:(band + 1) * self.rows])
+                for band in range(self.bands)]
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        for band_key in entry.bands:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _lookup(self, kind: str, ctx_hash: str, question: str) -> Optional[Any]:
+        now = time.monotonic()
+        normalized = normalize_question(question)
+        key = (kind, ctx_hash, normalized)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self._remove(key)
+
+        signature = self._signature(normalized)
+        candidates = set()
+        for band_key in self._band_keys(kind, ctx_hash, signature):
+            candidates |= self._buckets.get(band_key, set())
+
+        best_key, best_score = None, self.similarity
+        for candidate in candidates:
+            candidate_entry = self._entries[candidate]
+            if candidate_entry.expires_at <= now:
+                continue
+            matches = sum(1 for x, y in zip(signature, candidate_entry.signature) if x == y)
+            score = matches / len(signature)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+
+        if best_key is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(best_key)
+        self.near_hits += 1
+        return self._entries[best_key].value
+
+    def get(self, kind: str, question: str, context: str = "") -> Optional[Any]:
+        """Закэшированное значение вида ``answer`` или ``suggestions`` либо None"""
+        value = self._lookup(kind, context_hash(context), question)
+        return list(value) if isinstance(value, list) else value
+
+    def put(self, kind: str, question: str, context: str, value: Any):
+        self.put_hashed(kind, question, context_hash(context), value)
+
+    def put_hashed(self, kind: str, question: str, ctx_hash: str, value: Any, age: float = 0.0):
+        """Сохранение по готовому хэшу контекста; ``age`` — возраст записи в секундах"""
+        if self.max_size <= 0 or age >= self.ttl:
+            return
+        normalized = normalize_question(question)
+        key = (kind, ctx_hash, normalized)
+        if key in self._entries:
+            self._remove(key)
+
+        signature = self._signature(normalized)
+        bands = self._band_keys(kind, ctx_hash, signature)
+        self._entries[key] = _Entry(key, value, time.monotonic() + self.ttl - age, signature, bands)
+        for band_key in bands:
+            self._buckets[band_key].add(key)
+
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def evict_answer(self, answer: str) -> int:
+        """Удаление всех записей с этим ответом (например, после 👎)"""
+        keys = [key for key, entry in self._entries.items() if entry.value == answer]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def warm(self, rows: Iterable[Tuple[str, str, str, float]]) -> int:
+        """Загрузка ответов из истории: (вопрос, ответ, хэш контекста, возраст в секундах).
+
+        Строки ожидаются от новых к старым, поэтому загружаются в обратном
+        порядке — самые свежие окажутся в конце LRU.
+        """
+        loaded = 0
+        for question, answer, ctx_hash, age in reversed(list(rows)):
+            if answer and ctx_hash and age < self.ttl:
+                self.put_hashed('answer', question, ctx_hash, answer, age)
+                loaded += 1
+        logger.info(f"Кэш ответов ИИ загружен из истории: {loaded} записей")
+        return loaded
@@ -1,29 +1,343 @@
 import aiohttp
+import asyncio
+import contextlib
 import json
 import logging
+import random
+import time
 import uuid
-from config import GIGACHAT_AUTH_KEY
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from ai.answer_cache import AnswerCache, context_hash, normalize_question
+from utils.circuit_breaker import CircuitBreaker
+from utils.rate_limit import TokenBucket
+from config import (GIGACHAT_AUTH_KEY, AI_MAX_CONNECTIONS, AI_CACHE_SIZE, AI_CACHE_TTL,
+                    AI_CACHE_SIMILARITY, AI_MAX_CONCURRENT, AI_RATE_LIMIT, AI_RATE_BURST,
+                    AI_MAX_QUEUE, API_TIMEOUT, API_DEADLINE, MAX_RETRIES,
+                    AI_BREAKER_THRESHOLD, AI_BREAKER_RESET)
 
 logger = logging.getLogger(__name__)
 
+GIGACHAT_OAUTH_URL = 'https://ngw.devices.sberbank.ru:9443/api/v2/oauth'
+GIGACHAT_API_URL = 'https://gigachat.devices.sberbank.ru/api/v1/chat/completions'
+
+# Разделы ответа в режиме combined
+ANSWER_MARKER = 'ОТВЕТ:'
+SUGGESTIONS_MARKER = 'ПОХОЖИЕ ВОПРОСЫ:'
+
+# Так начинаются сообщения об ошибках, которые не кэшируются
+ERROR_PREFIXES = ('❌', '⚠️')
+
+QUEUE_FULL_MESSAGE = "⚠️ Сейчас слишком много вопросов. Попробуй задать свой через минуту."
+
+CIRCUIT_OPEN_MESSAGE = "⚠️ ИИ помощник временно недоступен. Попробуй чуть позже."
+
+# Вызывается с позицией запроса в очереди к GigaChat (1 — следующий)
+QueuePositionCallback = Callable[[int], None]
+
+
+class AIQueueFullError(Exception):
+    """Очередь запросов к GigaChat заполнена"""
+
+
+class AITokenError(Exception):
+    """Не удалось получить Access token"""
+
+
+class AdmissionController:
+    """Допуск запросов к GigaChat: не больше ``max_concurrent`` одновременно
+    и не чаще ``rate`` в секунду.
+
+    Остальные ждут в очереди длиной до ``max_queue``; освободившийся слот
+    передаётся первому ожидающему, а всем остальным сообщается новая позиция.
+    Когда очередь заполнена, новый запрос сразу получает ``AIQueueFullError``.
+    """
+
+    def __init__(self, max_concurrent: int = 10, rate: float = 10, burst: float = 10,
+                 max_queue: int = 200):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.bucket = TokenBucket(rate, burst)
+        self.active = 0
+        self._waiters: Deque[Tuple[asyncio.Future, Optional[QueuePositionCallback]]] = deque()
+        # Метрики
+        self.admitted = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики очереди для логов"""
+        return {
+            'active': self.active,
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'avg_wait': round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+            'max_wait': round(self.max_wait, 3),
+        }
+
+    def _notify_positions(self):
+        for position, (_, on_position) in enumerate(self._waiters, 1):
+            if on_position is not None:
+                try:
+                    on_position(position)
+                except Exception as e:
+                    logger.error(f"Ошибка уведомления о позиции в очереди: {e}")
+
+    async def acquire(self, on_position: Optional[QueuePositionCallback] = None):
+        start = time.monotonic()
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise AIQueueFullError(f"В очереди уже {len(self._waiters)} запросов")
+            waiter = (asyncio.get_running_loop().create_future(), on_position)
+            self._waiters.append(waiter)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+            if on_position is not None:
+                on_position(len(self._waiters))
+            try:
+                await waiter[0]
+            except asyncio.CancelledError:
+                if waiter[0].done() and not waiter[0].cancelled():
+                    # Слот уже передан этому запросу — отдаём его следующему
+                    self.release()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self._notify_positions()
+                raise
+
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.release()
+            raise
+
+        wait = time.monotonic() - start
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def release(self):
+        while self._waiters:
+            future, _ = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                self._notify_positions()
+                return
+        self.active -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self, on_position: Optional[QueuePositionCallback] = None,
+                   timeout: Optional[float] = None):
+        """Занять слот на время запроса; ``timeout`` ограничивает ожидание в очереди"""
+        try:
+            await asyncio.wait_for(self.acquire(on_position), timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AIQueueFullError("Истёк срок ожидания в очереди")
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class _StreamFlight:
+    """Один потоковый запрос на несколько читателей: фрагменты копятся и раздаются всем"""
+    
+    def __init__(self, source: AsyncIterator[str]):
+        self.chunks: List[str] = []
+        self.done = False
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._run(source))
+    
+    async def _run(self, source: AsyncIterator[str]):
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            logger.error(f"Error in GigaChat stream: {e}")
+            self.chunks.append("❌ Произошла ошибка при обработке запроса")
+        finally:
+            self.done = True
+            self._notify()
+    
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    async def read(self) -> AsyncIterator[str]:
+        """Все фрагменты с начала ответа, в том числе уже полученные"""
+        position = 0
+        while True:
+            while position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            if self.done:
+                return
+            await self._changed.wait()
+    
+    async def text(self) -> str:
+        """Ответ целиком после окончания генерации"""
+        await asyncio.shield(self.task)
+        return ''.join(self.chunks)
+
+
 class AIClient:
-    def __init__(self):
-        self.auth_key = GIGACHAT_AUTH_KEY  # Это Authorization key от Сбера
+    _instance: Optional['AIClient'] = None
+    
+    def __init__(self, auth_key: str = GIGACHAT_AUTH_KEY,
+                 oauth_url: str = GIGACHAT_OAUTH_URL, api_url: str = GIGACHAT_API_URL,
+                 max_connections: int = AI_MAX_CONNECTIONS, token_refresh_margin: float = 60,
+                 cache_size: int = AI_CACHE_SIZE, timeout: float = API_TIMEOUT,
+                 deadline: float = API_DEADLINE, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0):
+        self.auth_key = auth_key  # Это Authorization key от Сбера
+        self.oauth_url = oauth_url
+        self.api_url = api_url
+        self.max_connections = max_connections
+        # За сколько секунд до истечения токен обновляется заранее
+        self.token_refresh_margin = token_refresh_margin
         self.access_token = None
+        self.token_expires_at = 0.0
         self.session = None
+        self._token_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Повторные вопросы студентов отвечаются из кэша без запроса к GigaChat
+        self.cache = AnswerCache(cache_size, AI_CACHE_TTL, AI_CACHE_SIMILARITY) if cache_size > 0 else None
+        # Ограничение нагрузки на GigaChat и склейка одинаковых запросов в полёте
+        self.admission = AdmissionController(AI_MAX_CONCURRENT, AI_RATE_LIMIT, AI_RATE_BURST, AI_MAX_QUEUE)
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._streams: Dict[tuple, _StreamFlight] = {}
+        self.coalesced = 0
+        # Таймаут одной попытки, общий срок запроса со всеми повторами и паузы между ними
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Пока GigaChat лежит, запросы сразу получают отказ, а не копятся
+        self.breaker = CircuitBreaker(AI_BREAKER_THRESHOLD, AI_BREAKER_RESET)
+    
+    @classmethod
+    def get_instance(cls) -> 'AIClient':
+        """Общий клиент процесса: одна сессия и один токен на все вопросы"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        await self._get_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        await self.close()
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Долгоживущая сессия с пулом keep-alive соединений"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,
+                ssl=False  # Отключаем проверку SSL для внутренних сервисов Сбера
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+    
+    async def close(self):
+        """Остановка фонового обновления токена и закрытие сессии"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self.session is not None and not self.session.closed:
             await self.session.close()
+        self.session = None
+        if self.cache is not None:
+            logger.info(f"Кэш ответов ИИ: {self.cache.stats()}")
+        logger.info(f"Очередь GigaChat: {self.admission.stats()}, склеено запросов: {self.coalesced}, "
+                    f"срабатываний предохранителя: {self.breaker.opened}")
+    
+    @staticmethod
+    def _flight_key(kind: str, question: str, context: str) -> tuple:
+        return kind, normalize_question(question), context_hash(context)
+    
+    async def _single_flight(self, kind: str, question: str, context: str,
+                             fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Одинаковые вопросы в полёте ждут один общий запрос"""
+        key = self._flight_key(kind, question, context)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fetch())
+            self._inflight[key] = task
+            
+            def forget(done: asyncio.Task):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+            
+            task.add_done_callback(forget)
+        else:
+            self.coalesced += 1
+        # shield: отмена одного из ожидающих не обрывает запрос для остальных
+        return await asyncio.shield(task)
+    
+    def _cached(self, kind: str, question: str, context: str) -> Optional[Any]:
+        if self.cache is None:
+            return None
+        return self.cache.get(kind, question, context)
+    
+    def _cache_put(self, kind: str, question: str, context: str, value: Any):
+        """Сохранение в кэш; ошибки и пустые результаты не кэшируются"""
+        if self.cache is None or not value:
+            return
+        if isinstance(value, str) and value.startswith(ERROR_PREFIXES):
+            return
+        self.cache.put(kind, question, context, value)
+    
+    def _token_is_fresh(self) -> bool:
+        return bool(self.access_token) and time.time() < self.token_expires_at - self.token_refresh_margin
+    
+    async def _ensure_token(self) -> str:
+        """Действующий токен из кэша; запрос нового — один на всех ожидающих"""
+        if self._token_is_fresh():
+            return self.access_token
+        async with self._token_lock:
+            if not self._token_is_fresh():
+                await self._get_access_token()
+        return self.access_token
+    
+    def _schedule_refresh(self):
+        """Фоновое обновление токена незадолго до истечения"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+    
+    async def _refresh_loop(self):
+        delay = self.token_expires_at - self.token_refresh_margin - time.time()
+        while True:
+            await asyncio.sleep(max(delay, 1))
+            try:
+                async with self._token_lock:
+                    await self._get_access_token(schedule=False)
+                delay = self.token_expires_at - self.token_refresh_margin - time.time()
+            except Exception:
+                # Пробуем ещё раз чуть позже; до истечения старый токен действует
+                delay = 5
     
-    async def _get_access_token(self):
+    async def _get_access_token(self, schedule: bool = True):
         """Получение Access token для GigaChat"""
         if not self.auth_key:
-            raise Exception("GigaChat Authorization key не настроен")
+            raise AITokenError("GigaChat Authorization key не настроен")
+        
+        session = await self._get_session()
         
         try:
             headers = {
@@ -35,101 +349,333 @@ class AIClient:
             
             data = {'scope': 'GIGACHAT_API_PERS'}
             
-            async with self.session.post(
-                'https://ngw.devices.sberbank.ru:9443/api/v2/oauth',
+            async with session.post(
+                self.oauth_url,
                 headers=headers,
                 data=data,
-                ssl=False  # Отключаем проверку SSL для внутренних сервисов Сбера
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
             ) as response:
                 if response.status == 200:
                     result = await response.json()
                     self.access_token = result.get('access_token')
+                    # expires_at приходит в миллисекундах; без него считаем токен живущим 30 минут
+                    expires_at = result.get('expires_at')
+                    self.token_expires_at = expires_at / 1000 if expires_at else time.time() + 1800
+                    if schedule:
+                        self._schedule_refresh()
                     return self.access_token
                 else:
                     error_text = await response.text()
                     logger.error(f"Ошибка получения токена: {response.status} - {error_text}")
-                    raise Exception(f"Не удалось получить Access token: {response.status}")
+                    raise AITokenError(f"Не удалось получить Access token: {response.status}")
                     
         except Exception as e:
             logger.error(f"Ошибка при получении Access token: {e}")
             raise
     
-    async def _make_gigachat_request(self, messages, max_tokens=500, temperature=0.7):
-        """Выполнение запроса к GigaChat API"""
-        if not self.access_token:
-            await self._get_access_token()
+    def _retry_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Пауза перед повтором: Retry-After сервера или экспонента с полным джиттером"""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    def _record_outcome(self, status: Optional[int]):
+        """Сбой для предохранителя — таймаут, обрыв соединения или 5xx"""
+        if status is None or status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+    
+    async def _attempt_request(self, data: dict,
+                               on_queue_position: Optional[QueuePositionCallback],
+                               deadline: float) -> Tuple[Optional[int], Any, Optional[float]]:
+        """Одна попытка запроса: (статус, ответ или текст ошибки, Retry-After)"""
+        if deadline - time.monotonic() <= 0:
+            raise asyncio.TimeoutError()
         
-        try:
-            headers = {
-                'Accept': 'application/json',
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
+        await self._ensure_token()
+        session = await self._get_session()
+        headers = {
+            'Accept': 'application/json',
+            'Authorization': f'Bearer {self.access_token}',
+            'Content-Type': 'application/json'
+        }
+        
+        # Получение токена тоже тратит время из deadline: очередь ждёт только остаток
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        async with self.admission.slot(on_queue_position, timeout=remaining):
+            timeout = aiohttp.ClientTimeout(total=min(self.timeout, max(deadline - time.monotonic(), 0.001)))
+            async with session.post(self.api_url, headers=headers, json=data, timeout=timeout) as response:
+                if response.status == 200:
+                    return response.status, await response.json(), None
+                return response.status, await response.text(), _parse_retry_after(response)
+    
+    async def _make_gigachat_request(self, messages, max_tokens=500, temperature=0.7,
+                                     on_queue_position: Optional[QueuePositionCallback] = None):
+        """Выполнение запроса к GigaChat API.
+        
+        Каждая попытка ограничена ``timeout``, все вместе — ``deadline``.
+        429, 5xx и сетевые ошибки повторяются до ``max_retries`` раз с паузой,
+        401 — один раз после обновления токена.
+        """
+        data = {
+            "model": "GigaChat:latest",
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        deadline = time.monotonic() + self.deadline
+        token_refreshed = False
+        attempt = 0
+        
+        while True:
+            if not self.breaker.allow():
+                return CIRCUIT_OPEN_MESSAGE
             
-            data = {
-                "model": "GigaChat:latest",
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": temperature
-            }
+            try:
+                status, body, retry_after = await self._attempt_request(data, on_queue_position, deadline)
+            except AIQueueFullError as e:
+                logger.warning(f"Запрос к GigaChat отклонён: {e}")
+                return QUEUE_FULL_MESSAGE
+            except (asyncio.TimeoutError, aiohttp.ClientError, AITokenError) as e:
+                status, body, retry_after = None, repr(e), None
+            except Exception as e:
+                logger.error(f"Error in GigaChat API: {e}")
+                return "❌ Произошла ошибка при обработке запроса"
             
-            async with self.session.post(
-                'https://gigachat.devices.sberbank.ru/api/v1/chat/completions',
-                headers=headers,
-                json=data,
-                ssl=False  # Отключаем проверку SSL
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
-                elif response.status == 401:
-                    # Токен истек, получаем новый
-                    await self._get_access_token()
-                    # Повторяем запрос с новым токеном
-                    return await self._make_gigachat_request(messages, max_tokens, temperature)
-                else:
-                    error_text = await response.text()
-                    logger.error(f"GigaChat API error: {response.status} - {error_text}")
-                    return f"❌ Ошибка API: {response.status}"
-                    
-        except Exception as e:
-            logger.error(f"Error in GigaChat API: {e}")
-            return "❌ Произошла ошибка при обработке запроса"
+            self._record_outcome(status)
+            if status == 200:
+                return body["choices"][0]["message"]["content"]
+            if status == 401 and not token_refreshed:
+                # Токен истек: получаем новый и повторяем запрос один раз
+                token_refreshed = True
+                self.access_token = None
+                continue
+            
+            logger.error(f"GigaChat API error: {status} - {body}")
+            if status is not None and status != 429 and status < 500:
+                return f"❌ Ошибка API: {status}"
+            delay = self._retry_delay(attempt, retry_after)
+            if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                return f"❌ Ошибка API: {status}" if status else "❌ GigaChat не ответил вовремя"
+            attempt += 1
+            await asyncio.sleep(delay)
     
-    async def get_answer(self, question: str, context: str = "") -> str:
-        """Получение ответа от GigaChat"""
-        if not self.auth_key:
-            return "⚠️ GigaChat Authorization key не настроен. Обратитесь к администратору."
+    async def _stream_gigachat_request(self, messages, max_tokens=500, temperature=0.7,
+                                       on_queue_position: Optional[QueuePositionCallback] = None
+                                       ) -> AsyncIterator[str]:
+        """Потоковый запрос к GigaChat API (stream: true, ответ в формате SSE).
         
-        try:
-            # Формируем промпт с контекстом
-            if context:
-                system_prompt = f"""Ты помощник курса по развитию креативного мышления. 
+        Повторы — как в ``_make_gigachat_request``, но только до первого
+        фрагмента; ``timeout`` ограничивает паузу между фрагментами.
+        """
+        data = {
+            "model": "GigaChat:latest",
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True
+        }
+        deadline = time.monotonic() + self.deadline
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        token_refreshed = False
+        attempt = 0
+        
+        while True:
+            if not self.breaker.allow():
+                yield CIRCUIT_OPEN_MESSAGE
+                return
+            
+            status, error_text, retry_after = None, None, None
+            started = False
+            try:
+                await self._ensure_token()
+                session = await self._get_session()
+                headers = {
+                    'Accept': 'text/event-stream',
+                    'Authorization': f'Bearer {self.access_token}',
+                    'Content-Type': 'application/json'
+                }
+                # После повторов на очередь может не остаться времени: это таймаут, а не переполнение
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                # Слот занят на всё время генерации ответа
+                async with self.admission.slot(on_queue_position, timeout=remaining):
+                    async with session.post(self.api_url, headers=headers, json=data, timeout=timeout) as response:
+                        status = response.status
+                        if status != 200:
+                            error_text = await response.text()
+                            retry_after = _parse_retry_after(response)
+                        else:
+                            self._record_outcome(status)
+                            async for payload in _iter_sse_data(response.content):
+                                if payload == '[DONE]':
+                                    break
+                                choices = json.loads(payload).get('choices') or [{}]
+                                delta = choices[0].get('delta', {}).get('content')
+                                if delta:
+                                    started = True
+                                    yield delta
+                            return
+            except AIQueueFullError as e:
+                logger.warning(f"Запрос к GigaChat отклонён: {e}")
+                yield QUEUE_FULL_MESSAGE
+                return
+            except (asyncio.TimeoutError, aiohttp.ClientError, AITokenError) as e:
+                if started:
+                    # Часть ответа уже показана — повторять запрос поздно
+                    logger.error(f"GigaChat stream interrupted: {e!r}")
+                    self.breaker.record_failure()
+                    yield "❌ Произошла ошибка при обработке запроса"
+                    return
+                status, error_text = None, repr(e)
+            except Exception as e:
+                logger.error(f"Error in GigaChat stream: {e}")
+                yield "❌ Произошла ошибка при обработке запроса"
+                return
+            
+            self._record_outcome(status)
+            if status == 401 and not token_refreshed:
+                # Токен истек: обновляем и повторяем запрос один раз
+                token_refreshed = True
+                self.access_token = None
+                continue
+            
+            logger.error(f"GigaChat API error: {status} - {error_text}")
+            if status is not None and status != 429 and status < 500:
+                yield f"❌ Ошибка API: {status}"
+                return
+            delay = self._retry_delay(attempt, retry_after)
+            if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                yield f"❌ Ошибка API: {status}" if status else "❌ GigaChat не ответил вовремя"
+                return
+            attempt += 1
+            await asyncio.sleep(delay)
+    
+    def _build_system_prompt(self, context: str) -> str:
+        """Системный промпт для ответа с контекстом курса"""
+        if context:
+            return f"""Ты помощник курса по развитию креативного мышления. 
 Используй следующий контекст курса для ответов:
 
 {context}
 
 Отвечай кратко, по существу и дружелюбно. Если вопрос не связан с курсом, 
 вежливо перенаправь на темы курса."""
-            else:
-                system_prompt = "Ты полезный помощник по курсу развития креативного мышления. Отвечай кратко и по существу."
-            
+        return "Ты полезный помощник по курсу развития креативного мышления. Отвечай кратко и по существу."
+    
+    async def get_answer(self, question: str, context: str = "",
+                         on_queue_position: Optional[QueuePositionCallback] = None) -> str:
+        """Получение ответа от GigaChat"""
+        if not self.auth_key:
+            return "⚠️ GigaChat Authorization key не настроен. Обратитесь к администратору."
+        
+        cached = self._cached('answer', question, context)
+        if cached is not None:
+            return cached
+        
+        flight = self._streams.get(self._flight_key('answer', question, context))
+        if flight is not None:
+            # Такой же вопрос уже генерируется потоком — ждём его целиком
+            self.coalesced += 1
+            return await flight.text()
+        
+        return await self._single_flight(
+            'answer', question, context,
+            lambda: self._fetch_answer(question, context, on_queue_position)
+        )
+    
+    async def _fetch_answer(self, question: str, context: str,
+                            on_queue_position: Optional[QueuePositionCallback]) -> str:
+        try:
             messages = [
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": self._build_system_prompt(context)},
                 {"role": "user", "content": question}
             ]
             
-            return await self._make_gigachat_request(messages, max_tokens=500, temperature=0.7)
+            answer = await self._make_gigachat_request(messages, max_tokens=500, temperature=0.7,
+                                                       on_queue_position=on_queue_position)
+            self._cache_put('answer', question, context, answer)
+            return answer
                     
         except Exception as e:
             logger.error(f"Error in GigaChat API: {e}")
             return "❌ Произошла ошибка при обработке запроса"
     
-    async def get_suggestions(self, question: str, context: str = "") -> list:
+    async def stream_answer(self, question: str, context: str = "",
+                            on_queue_position: Optional[QueuePositionCallback] = None) -> AsyncIterator[str]:
+        """Ответ от GigaChat фрагментами по мере генерации"""
+        if not self.auth_key:
+            yield "⚠️ GigaChat Authorization key не настроен. Обратитесь к администратору."
+            return
+        
+        cached = self._cached('answer', question, context)
+        if cached is not None:
+            yield cached
+            return
+        
+        key = self._flight_key('answer', question, context)
+        task = self._inflight.get(key)
+        if task is not None:
+            # Такой же вопрос уже ждёт обычный ответ — отдаём его целиком
+            self.coalesced += 1
+            yield await asyncio.shield(task)
+            return
+        
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = self._streams[key] = _StreamFlight(self._fetch_stream(question, context, on_queue_position))
+            
+            def forget(_):
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+            
+            flight.task.add_done_callback(forget)
+        else:
+            self.coalesced += 1
+        # Запрос идёт в своей задаче: уход одного читателя не обрывает ответ для остальных
+        async for chunk in flight.read():
+            yield chunk
+    
+    async def _fetch_stream(self, question: str, context: str,
+                            on_queue_position: Optional[QueuePositionCallback]) -> AsyncIterator[str]:
+        messages = [
+            {"role": "system", "content": self._build_system_prompt(context)},
+            {"role": "user", "content": question}
+        ]
+        
+        chunks = []
+        failed = False
+        async for chunk in self._stream_gigachat_request(messages, max_tokens=500, temperature=0.7,
+                                                         on_queue_position=on_queue_position):
+            # Ошибки приходят отдельным фрагментом, в том числе посреди ответа
+            failed = failed or chunk.startswith(ERROR_PREFIXES)
+            chunks.append(chunk)
+            yield chunk
+        if not failed:
+            self._cache_put('answer', question, context, ''.join(chunks))
+    
+    async def get_suggestions(self, question: str, context: str = "",
+                              on_queue_position: Optional[QueuePositionCallback] = None) -> list:
         """Получение предложений похожих вопросов"""
         if not self.auth_key:
             return []
         
+        cached = self._cached('suggestions', question, context)
+        if cached is not None:
+            return cached
+        
+        suggestions = await self._single_flight(
+            'suggestions', question, context,
+            lambda: self._fetch_suggestions(question, context, on_queue_position)
+        )
+        return list(suggestions)
+    
+    async def _fetch_suggestions(self, question: str, context: str,
+                                 on_queue_position: Optional[QueuePositionCallback]) -> list:
         try:
             system_prompt = "Ты помощник по курсу развития креативного мышления. Предлагай релевантные вопросы."
             user_prompt = f"На основе вопроса '{question}' предложи 3 похожих вопроса по теме курса. Формат: только вопросы, каждый с новой строки."
@@ -139,13 +685,142 @@ class AIClient:
                 {"role": "user", "content": user_prompt}
             ]
             
-            result = await self._make_gigachat_request(messages, max_tokens=200, temperature=0.8)
+            result = await self._make_gigachat_request(messages, max_tokens=200, temperature=0.8,
+                                                       on_queue_position=on_queue_position)
             
-            if result.startswith("❌"):
+            if result.startswith(ERROR_PREFIXES):
                 return []
             
-            return [s.strip() for s in result.split('\n') if s.strip()]
+            suggestions = _parse_suggestions(result)
+            self._cache_put('suggestions', question, context, suggestions)
+            return suggestions
                     
         except Exception as e:
             logger.error(f"Error getting suggestions: {e}")
-            return [] 
\ No newline at end of file
+            return []
+    
+    async def get_answer_and_suggestions(self, question: str, context: str = "",
+                                         mode: str = "parallel",
+                                         on_queue_position: Optional[QueuePositionCallback] = None
+                                         ) -> Tuple[str, list]:
+        """Ответ и похожие вопросы.
+        
+        ``sequential`` — два запроса по очереди, ``parallel`` — два запроса
+        одновременно, ``combined`` — один запрос, ответ и вопросы разбираются
+        из структурированного текста.
+        """
+        if mode == "combined":
+            return await self._get_combined(question, context, on_queue_position)
+        if mode == "sequential":
+            answer = await self.get_answer(question, context, on_queue_position)
+            suggestions = await self.get_suggestions(question, context, on_queue_position)
+            return answer, suggestions
+        # О позиции в очереди сообщает запрос ответа, похожие вопросы идут молча
+        answer, suggestions = await asyncio.gather(
+            self.get_answer(question, context, on_queue_position),
+            self.get_suggestions(question, context)
+        )
+        return answer, suggestions
+    
+    async def _get_combined(self, question: str, context: str = "",
+                            on_queue_position: Optional[QueuePositionCallback] = None) -> Tuple[str, list]:
+        """Ответ и три похожих вопроса одним запросом"""
+        if not self.auth_key:
+            return "⚠️ GigaChat Authorization key не настроен. Обратитесь к администратору.", []
+        
+        cached_answer = self._cached('answer', question, context)
+        cached_suggestions = self._cached('suggestions', question, context)
+        if cached_answer is not None and cached_suggestions is not None:
+            return cached_answer, cached_suggestions
+        
+        answer, suggestions = await self._single_flight(
+            'combined', question, context,
+            lambda: self._fetch_combined(question, context, on_queue_position)
+        )
+        return answer, list(suggestions)
+    
+    async def _fetch_combined(self, question: str, context: str,
+                              on_queue_position: Optional[QueuePositionCallback]) -> Tuple[str, list]:
+        try:
+            system_prompt = self._build_system_prompt(context) + f"""
+
+Ответь строго в формате:
+{ANSWER_MARKER}
+<ответ на вопрос>
+{SUGGESTIONS_MARKER}
+1. <похожий вопрос по теме курса>
+2. <похожий вопрос по теме курса>
+3. <похожий вопрос по теме курса>"""
+            
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": question}
+            ]
+            
+            result = await self._make_gigachat_request(messages, max_tokens=700, temperature=0.7,
+                                                       on_queue_position=on_queue_position)
+            
+            if result.startswith(ERROR_PREFIXES):
+                return result, []
+            
+            answer, suggestions = parse_combined_response(result)
+            self._cache_put('answer', question, context, answer)
+            self._cache_put('suggestions', question, context, suggestions)
+            return answer, suggestions
+        
+        except Exception as e:
+            logger.error(f"Error in GigaChat API: {e}")
+            return "❌ Произошла ошибка при обработке запроса", []
+
+
+async def _iter_sse_data(stream) -> AsyncIterator[str]:
+    """Поля data из событий Server-Sent Events"""
+    data_lines = []
+    async for raw_line in stream:
+        line = raw_line.decode('utf-8').rstrip('\r\n')
+        if not line:
+            # Пустая строка завершает событие
+            if data_lines:
+                yield '\n'.join(data_lines)
+                data_lines = []
+        elif line.startswith('data:'):
+            data_lines.append(line[5:].lstrip())
+    if data_lines:
+        yield '\n'.join(data_lines)
+
+
+def _parse_retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+    """Заголовок Retry-After в секундах, если сервер его прислал"""
+    value = response.headers.get('Retry-After')
+    try:
+        return max(float(value), 0.0) if value else None
+    except ValueError:
+        return None
+
+
+def _parse_suggestions(text: str) -> list:
+    """Вопросы по одному на строку, без нумерации и маркеров списка"""
+    suggestions = []
+    for line in text.split('\n'):
+        line = line.strip().lstrip('-•*').strip()
+        # Убираем нумерацию вида "1." или "2)"
+        head, sep, tail = line.partition(' ')
+        if sep and head.rstrip('.)').isdigit():
+            line = tail.strip()
+        if line:
+            suggestions.append(line)
+    return suggestions
+
+
+def parse_combined_response(text: str) -> Tuple[str, list]:
+    """Разбор ответа формата ОТВЕТ: ... ПОХОЖИЕ ВОПРОСЫ: ..."""
+    upper = text.upper()
+    position = upper.find(SUGGESTIONS_MARKER)
+    if position == -1:
+        return text.strip(), []
+    
+    answer = text[:position].strip()
+    if answer.upper().startswith(ANSWER_MARKER):
+        answer = answer[len(ANSWER_MARKER):].strip()
+    suggestions = _parse_suggestions(text[position + len(SUGGESTIONS_MARKER):])
+    return answer, suggestions[:3]
@@ -1,15 +1,17 @@
 from ai.ai_curator import COURSE_CONTEXT
+from ai.retrieval import CourseRetriever
+from config import AI_CONTEXT_TOP_K, AI_CONTEXT_TOKEN_BUDGET
 
 class ContextManager:
-    def __init__(self):
+    def __init__(self, top_k: int = AI_CONTEXT_TOP_K, token_budget: int = AI_CONTEXT_TOKEN_BUDGET):
         self.context_data = COURSE_CONTEXT
+        # Индекс строится один раз при запуске
+        self.retriever = CourseRetriever(COURSE_CONTEXT, top_k=top_k, token_budget=token_budget)
     
     def get_context_for_question(self, question: str) -> str:
         """Получение релевантного контекста для вопроса"""
-        # Пока возвращаем весь контекст
-        # В будущем можно добавить логику выбора релевантных частей
-        return self.context_data
+        return self.retriever.get_context(question)
     
     def get_full_context(self) -> str:
         """Получение полного контекста курса"""
-        return self.context_data 
\ No newline at end of file
+        return self.context_data
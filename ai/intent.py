@@ -0,0 +1,82 @@
+import re
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+_WORD_RE = re.compile(r'[а-яёa-z0-9]+')
+
+# Разделы меню: action из callback_data "menu:<action>", название и начала слов
+SECTIONS = {
+    'quiz': ('📚 Тест-квиз', ('квиз', 'викторин', 'quiz')),
+    'attention': ('👁 Тест на внимание', ('вниман', 'внимат')),
+    'speed': ('⚡ Тест на скорость', ('скорост', 'быстрот')),
+    'brain_games': ('🧠 Разминка мозга', ('разминк', 'игр', 'головолом')),
+    'ai_assistant': ('🤖 ИИ помощник', ('ии', 'ai', 'нейросет', 'гигачат', 'gigachat')),
+    'reminders': ('⏰ Напоминания', ('напомин', 'уведомл')),
+    'leaderboard': ('🏆 Рейтинг', ('рейтинг', 'топ', 'лидер')),
+    'help': ('❓ Помощь', ('помощ', 'help', 'справк', 'умеешь', 'умеет')),
+    'back': ('🏠 Главное меню', ('меню', 'menu', 'старт', 'start', 'начал', 'главн')),
+}
+
+_GREETINGS = ('привет', 'здравств', 'хай', 'hello', 'hi', 'добр', 'ку')
+_THANKS = ('спасиб', 'благодар', 'thanks', 'thank')
+_QUESTION_WORDS = ('что', 'как', 'почему', 'зачем', 'чем', 'какой', 'какая', 'какие', 'какое', 'кто',
+                   'где', 'когда', 'сколько', 'объясни', 'расскажи', 'подскажи')
+
+# Частые вопросы об использовании бота: (группы начал слов — из каждой должно
+# встретиться хотя бы одно, раздел для кнопки, ответ)
+FAQ: List[Tuple[Sequence[Sequence[str]], str, str]] = [
+    ((('напомин', 'уведомл'), ('отключ', 'выключ', 'убра', 'останов', 'измен', 'смен', 'настро', 'врем', 'час')),
+     'reminders',
+     "⏰ Напоминания настраиваются в разделе «Напоминания»: там можно выбрать частоту, "
+     "время и часовой пояс или отключить их совсем."),
+    ((('тест', 'квиз'), ('сколько', 'длит', 'долго', 'вопрос')),
+     'quiz',
+     "📚 В каждом тесте несколько коротких вопросов с вариантами ответа, "
+     "проходить их можно сколько угодно раз."),
+    ((('результат', 'балл', 'очк', 'статистик'),),
+     'back',
+     "📊 Результат показывается в конце каждого теста и сохраняется. "
+     "Чтобы улучшить его, пройди тест ещё раз из главного меню."),
+]
+
+
+class Intent(NamedTuple):
+    """Намерение пользователя.
+
+    ``kind``: menu — открыть раздел, faq — готовый ответ, smalltalk — приветствие
+    или благодарность, question — вопрос для ИИ помощника, unknown — непонятно.
+    """
+    kind: str
+    section: Optional[str] = None
+    answer: Optional[str] = None
+
+
+def _has(words: List[str], prefixes: Sequence[str]) -> bool:
+    return any(word.startswith(prefix) if len(prefix) > 2 else word == prefix
+               for word in words for prefix in prefixes)
+
+
+def classify(text: Optional[str]) -> Intent:
+    """Дешёвая локальная классификация сообщения вне чата с ИИ, без запросов к модели"""
+    if not text:
+        return Intent('unknown')
+    words = _WORD_RE.findall(text.lower().replace('ё', 'е'))
+    if not words:
+        return Intent('unknown')
+
+    for groups, section, answer in FAQ:
+        if all(_has(words, group) for group in groups):
+            return Intent('faq', section, answer)
+
+    short = len(words) <= 4
+    if short:
+        for section, (_, prefixes) in SECTIONS.items():
+            if _has(words, prefixes):
+                return Intent('menu', section)
+        if _has(words, _THANKS):
+            return Intent('smalltalk', 'back', "😊 Пожалуйста! Возвращайся к тренировкам, когда захочешь.")
+        if _has(words, _GREETINGS):
+            return Intent('smalltalk', 'back', "👋 Привет! Выбери, чем займёмся:")
+
+    if '?' in text or words[0] in _QUESTION_WORDS or len(words) >= 5:
+        return Intent('question')
+    return Intent('unknown')
@@ -0,0 +1,144 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+_WORD_RE = re.compile(r'[а-яёa-z0-9]+')
+
+# Окончания для лёгкого стемминга русского текста, от длинных к коротким
+_ENDINGS = sorted([
+    'иями', 'ями', 'ами', 'ием', 'ией', 'иям', 'иях',
+    'ениями', 'ениях', 'ением', 'ения', 'ение', 'ений', 'ению',
+    'аниями', 'аниях', 'анием', 'ания', 'ание', 'аний', 'анию',
+    'ости', 'остью', 'остей', 'ость',
+    'ировать', 'ируют', 'ирует',
+    'ться', 'тся', 'ется', 'ются', 'ать', 'ять', 'ить', 'еть', 'ает', 'яет', 'ует', 'ают', 'яют',
+    'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ых', 'их',
+    'ий', 'ый', 'ой', 'ым', 'им', 'ую', 'юю', 'ия', 'ию',
+    'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ов', 'ев', 'ей',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+], key=len, reverse=True)
+
+_STOPWORDS = {
+    'и', 'в', 'во', 'на', 'с', 'со', 'по', 'к', 'ко', 'о', 'об', 'от', 'до', 'из', 'за', 'для',
+    'не', 'ни', 'что', 'как', 'это', 'то', 'а', 'но', 'или', 'ли', 'же', 'бы', 'у', 'при',
+    'такое', 'такой', 'какие', 'какой', 'какая', 'чем', 'зачем', 'почему', 'где', 'когда',
+    'мне', 'я', 'ты', 'мы', 'вы', 'он', 'она', 'они', 'его', 'ее', 'их', 'можно', 'нужно',
+}
+
+
+def stem(word: str) -> str:
+    """Отсечение одного окончания с сохранением основы не короче 3 букв"""
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Нормализованные термы текста без стоп-слов"""
+    words = _WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [stem(word) for word in words if word not in _STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов: для русского текста ~3 символа на токен"""
+    return len(text) // 3 + 1
+
+
+def _is_heading(line: str) -> bool:
+    letters = [char for char in line if char.isalpha()]
+    return len(letters) >= 3 and all(char.isupper() for char in letters)
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """Разбиение текста курса на фрагменты (заголовок раздела, абзац)"""
+    chunks = []
+    heading = ''
+    for paragraph in re.split(r'\n\s*\n', text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        lines = paragraph.split('\n')
+        if _is_heading(lines[0]):
+            heading = lines[0].rstrip(':')
+            lines = lines[1:]
+        body = '\n'.join(lines).strip()
+        if body:
+            chunks.append((heading, body))
+    return chunks
+
+
+class BM25Index:
+    """Инвертированный индекс с ранжированием BM25"""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+
+        for doc_id, document in enumerate(documents):
+            terms = tokenize(document)
+            self.doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings[term].append((doc_id, frequency))
+
+        self.doc_count = len(documents)
+        self.avg_length = sum(self.doc_lengths) / max(self.doc_count, 1)
+        self.idf = {
+            term: math.log(1 + (self.doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float]]:
+        """Номера документов и их вес, по убыванию релевантности"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, frequency in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+class CourseRetriever:
+    """Поиск релевантных фрагментов курса в пределах бюджета токенов"""
+
+    def __init__(self, text: str, top_k: int = 4, token_budget: int = 600):
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.chunks = split_sections(text)
+        # Заголовок индексируется вместе с абзацем: «модуль 2» находит его содержимое
+        self.index = BM25Index([f"{heading}\n{body}" for heading, body in self.chunks])
+        self.outline = '\n'.join(dict.fromkeys(heading for heading, _ in self.chunks if heading))
+
+    def retrieve(self, question: str) -> List[int]:
+        """Номера выбранных фрагментов в порядке следования в курсе"""
+        selected = []
+        used_tokens = 0
+        for doc_id, _ in self.index.search(question, self.top_k):
+            tokens = estimate_tokens(self.chunks[doc_id][1])
+            if selected and used_tokens + tokens > self.token_budget:
+                continue
+            selected.append(doc_id)
+            used_tokens += tokens
+        return sorted(selected)
+
+    def get_context(self, question: str) -> str:
+        """Контекст для промпта; без совпадений — только план курса"""
+        selected = self.retrieve(question)
+        if not selected:
+            return f"Разделы курса:\n{self.outline}"
+
+        parts = []
+        current_heading = None
+        for doc_id in selected:
+            heading, body = self.chunks[doc_id]
+            if heading and heading != current_heading:
+                parts.append(heading)
+                current_heading = heading
+            parts.append(body)
+        return '\n\n'.join(parts)
@@ -0,0 +1,65 @@
+"""Микробенчмарк адаптивного подбора вопросов (utils/adaptive.py).
+
+Для банков разного размера симулируются пользователи со скрытым уровнем:
+на каждом шаге выбирается вопрос под текущий рейтинг, ответ верен с
+вероятностью по формуле Эло, затем оба рейтинга обновляются. Замеряется
+время шага «ответ + выбор следующего» — оно не должно расти с размером
+банка — и то, насколько рейтинг пользователя приблизился к скрытому уровню.
+База не используется.
+
+Запуск: python -m benchmarks.bench_adaptive --answers 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from utils.adaptive import AdaptiveEngine, expected_score
+
+
+async def simulate(items: int, users: int, answers: int) -> tuple:
+    """Микросекунд на ответ и средняя ошибка рейтинга пользователей после симуляции"""
+    random.seed(items)
+    # Запись в базу не нужна: фоновая запись не успеет сработать
+    engine = AdaptiveEngine(database=None, flush_interval=3600)
+    difficulty = {item_id: random.gauss(1200, 300) for item_id in range(items)}
+    # Сложность вопросов движку неизвестна — все начинают с начального рейтинга
+    engine.register('topic', ((item_id, None) for item_id in range(items)))
+    skill = {user_id: random.gauss(1200, 250) for user_id in range(users)}
+    asked = {user_id: [] for user_id in range(users)}
+
+    start = time.perf_counter()
+    for step in range(answers):
+        user_id = step % users
+        history = asked[user_id]
+        item_id = engine.next_item(user_id, 'topic', history[-20:])
+        correct = random.random() < expected_score(skill[user_id], difficulty[item_id])
+        engine.record(user_id, 'topic', correct, item_id=item_id)
+        history.append(item_id)
+    elapsed = (time.perf_counter() - start) / answers * 1e6
+
+    error = sum(abs(engine.rating(user_id, 'topic') - skill[user_id]) for user_id in range(users)) / users
+    return elapsed, error
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--answers', type=int, default=200_000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--items', type=int, nargs='+', default=[100, 1000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'вопросов':<12}{'мкс на ответ':>14}{'ошибка рейтинга':>18}")
+    for items in args.items:
+        elapsed, error = await simulate(items, args.users, args.answers)
+        print(f"{items:<12}{elapsed:>14.1f}{error:>18.0f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Бенчмарк всплеска вопросов к ИИ: одновременные вопросы против мока GigaChat с лимитом параллельных запросов.
+
+Сравнивается клиент без ограничений и клиент с допуском запросов
+(семафор, token bucket, очередь) и склейкой одинаковых вопросов.
+Часть вопросов повторяется, как после лекции.
+
+Запуск: python -m benchmarks.bench_ai_burst --questions 300 --unique 60 --upstream-limit 10
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from ai.api_client import AIClient, AdmissionController, ERROR_PREFIXES
+from benchmarks.mock_gigachat import MockGigaChat
+
+
+async def run_burst(client: AIClient, questions: int, unique: int) -> tuple:
+    """Задержки ответов и число ответов-ошибок"""
+    positions = []
+
+    async def ask(i: int):
+        start = time.perf_counter()
+        answer = await client.get_answer(f"Вопрос номер {i % unique} про курс", "контекст",
+                                         on_queue_position=positions.append)
+        return time.perf_counter() - start, answer.startswith(ERROR_PREFIXES)
+
+    results = await asyncio.gather(*(ask(i) for i in range(questions)))
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, failed in results if failed)
+    return latencies, errors, len(positions)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--questions', type=int, default=300)
+    parser.add_argument('--unique', type=int, default=60)
+    parser.add_argument('--upstream-limit', type=int, default=10, help='сколько запросов мок обслуживает одновременно')
+    parser.add_argument('--base-latency', type=float, default=0.2)
+    parser.add_argument('--rate', type=float, default=0, help='лимит запросов в секунду (0 — без лимита)')
+    args = parser.parse_args()
+    # Ошибки 429 в режиме без лимита ожидаемы, в выводе нужна только таблица
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(f"{'клиент':<12}{'ошибок':>8}{'к API':>8}{'429':>6}{'p50, с':>9}{'p95, с':>9}{'позиций':>9}")
+    for name, limited in (('без лимита', False), ('с допуском', True)):
+        mock = MockGigaChat(args.base_latency, 0, max_concurrent=args.upstream_limit)
+        await mock.start()
+        # Кэш выключен, чтобы сравнивались только очередь и склейка запросов
+        client = AIClient(auth_key='benchmark', oauth_url=mock.oauth_url, api_url=mock.api_url, cache_size=0)
+        if limited:
+            client.admission = AdmissionController(args.upstream_limit, args.rate, args.upstream_limit,
+                                                   max_queue=args.questions)
+        else:
+            client.admission = AdmissionController(args.questions, 0, 1, max_queue=0)
+            # Без склейки каждый вопрос идёт отдельным запросом
+            client._single_flight = lambda kind, question, context, fetch: fetch()
+
+        try:
+            latencies, errors, positions = await run_burst(client, args.questions, args.unique)
+        finally:
+            await client.close()
+            await mock.stop()
+
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{name:<12}{errors:>8}{mock.chat_requests:>8}{mock.rejected_requests:>6}"
+              f"{statistics.median(latencies):>9.2f}{p95:>9.2f}{positions:>9}")
+        if limited:
+            print(f"метрики очереди: {client.admission.stats()}, склеено: {client.coalesced}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""Бенчмарк задержки ответа ИИ: sequential, parallel, combined и stream против локального мока GigaChat.
+
+Для stream задержкой считается время до первого фрагмента ответа.
+
+Запуск: python -m benchmarks.bench_ai_modes --questions 20 --base-latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from ai.api_client import AIClient
+from benchmarks.mock_gigachat import MockGigaChat
+
+MODES = ['sequential', 'parallel', 'combined']
+
+
+async def bench_mode(client: AIClient, mode: str, questions: int) -> list:
+    """Задержка каждого вопроса в секундах, вопросы задаются по одному"""
+    latencies = []
+    for i in range(questions):
+        start = time.perf_counter()
+        answer, suggestions = await client.get_answer_and_suggestions(f"Вопрос {i}", "контекст", mode=mode)
+        latencies.append(time.perf_counter() - start)
+        assert answer and len(suggestions) == 3, (mode, answer, suggestions)
+    return latencies
+
+
+async def bench_stream(client: AIClient, questions: int) -> list:
+    """Время до первого фрагмента потокового ответа"""
+    latencies = []
+    for i in range(questions):
+        start = time.perf_counter()
+        first = None
+        async for chunk in client.stream_answer(f"Вопрос {i}", "контекст"):
+            if first is None:
+                first = time.perf_counter() - start
+        latencies.append(first)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--base-latency', type=float, default=0.3)
+    parser.add_argument('--token-latency', type=float, default=0.001)
+    args = parser.parse_args()
+
+    mock = MockGigaChat(args.base_latency, args.token_latency)
+    await mock.start()
+    # Кэш ответов выключен: каждый вопрос должен доходить до мока
+    client = AIClient(auth_key='benchmark', oauth_url=mock.oauth_url, api_url=mock.api_url, cache_size=0)
+
+    try:
+        print(f"{'режим':<12}{'p50, с':>10}{'p95, с':>10}{'запросов':>10}")
+        for mode in MODES + ['stream']:
+            before = mock.chat_requests
+            if mode == 'stream':
+                latencies = sorted(await bench_stream(client, args.questions))
+            else:
+                latencies = sorted(await bench_mode(client, mode, args.questions))
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            requests = (mock.chat_requests - before) / args.questions
+            print(f"{mode:<12}{statistics.median(latencies):>10.3f}{p95:>10.3f}{requests:>10.0f}")
+    finally:
+        await client.close()
+        await mock.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""Бенчмарк рассылки напоминаний против локального мока Bot API.
+
+Сравнивается старый последовательный цикл (на первых --legacy-users
+получателях, время экстраполируется) и BroadcastEngine, которому
+получатели отдаются пачками по page_size, как в диспетчере напоминаний.
+
+Запуск: python -m benchmarks.bench_broadcast --users 3000 --rate 200 --api-limit 250
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from benchmarks.fake_bot_api import FakeBotAPI
+from utils.broadcast import BroadcastEngine
+from utils.database import Database
+
+async def make_database(path: str, users: int) -> Database:
+    database = Database(f'sqlite:///{path}')
+    await database.init_db()
+    await database.backend.executemany('''
+        INSERT INTO users (user_id, reminder_frequency, reminder_enabled) VALUES (?, 'daily', TRUE)
+    ''', [(user_id,) for user_id in range(1, users + 1)])
+    return database
+
+
+async def bench_legacy(bot: Bot, users: int) -> float:
+    """Старый цикл: по одному сообщению, ошибки только печатаются"""
+    start = time.perf_counter()
+    for user_id in range(1, users + 1):
+        try:
+            await bot.send_message(chat_id=user_id, text='Напоминание')
+        except Exception:
+            pass
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=3000)
+    parser.add_argument('--legacy-users', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=200, help='лимит движка, сообщений в секунду')
+    parser.add_argument('--api-limit', type=int, default=250, help='после скольких сообщений в секунду мок отвечает 429')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--block-every', type=int, default=50)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    api = FakeBotAPI(args.latency, rate_limit=args.api_limit, block_every=args.block_every)
+    await api.start()
+    bot = Bot('42:benchmark', session=AiohttpSession(api=api.api_server()))
+    directory = tempfile.mkdtemp()
+    database = await make_database(os.path.join(directory, 'bench.db'), args.users)
+
+    try:
+        legacy = await bench_legacy(bot, args.legacy_users)
+        print(f"последовательный цикл: {args.legacy_users / legacy:.0f} сообщений/с, "
+              f"на {args.users} получателей ~{legacy / args.legacy_users * args.users:.0f} с")
+
+        api.delivered.clear()
+        api.max_per_second = 0
+        engine = BroadcastEngine(bot, database, rate=args.rate, concurrency=50)
+        text = lambda user_id: 'Напоминание'
+
+        user_ids = list(range(1, args.users + 1))
+        start = time.perf_counter()
+        for offset in range(0, len(user_ids), engine.page_size):
+            await engine.send_batch(user_ids[offset:offset + engine.page_size], text)
+        elapsed = time.perf_counter() - start
+
+        duplicates = sum(count - 1 for count in api.delivered.values() if count > 1)
+        disabled = await database.backend.fetchall('SELECT COUNT(*) FROM users WHERE reminder_enabled = FALSE')
+        print(f"BroadcastEngine: {sum(api.delivered.values()) / elapsed:.0f} сообщений/с, "
+              f"{elapsed:.1f} с на {args.users} получателей")
+        print(f"  доставлено уникальным: {len(api.delivered)}, дублей: {duplicates}")
+        print(f"  пик в секунду: {api.max_per_second}, ответов 429: {api.too_many_requests}, "
+              f"отключено заблокировавших: {disabled[0][0]}")
+    finally:
+        await database.close()
+        await bot.session.close()
+        await api.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Микробенчмарк маршрутизации нажатий кнопок: фильтры-лямбды aiogram против CallbackRouter.
+
+Для каждого числа обработчиков диспетчер получает callback_query,
+предназначенный последнему зарегистрированному обработчику — худший
+случай для последовательной проверки фильтров. Сеть не используется:
+замеряется только путь обновления через диспетчер.
+
+Запуск: python -m benchmarks.bench_callback_routing --updates 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from utils.callback_router import CallbackRouter
+
+
+def make_update(update_id: int, data: str) -> Update:
+    return Update.model_validate({
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': {'id': 42, 'is_bot': False, 'first_name': 'Тест'},
+            'chat_instance': '1',
+            'data': data,
+        },
+    })
+
+
+def lambda_dispatcher(handlers: int) -> Dispatcher:
+    """Как раньше в main.py: по обработчику с фильтром startswith на каждый префикс"""
+    dp = Dispatcher()
+
+    async def handler(callback):
+        return None
+
+    for i in range(handlers):
+        dp.callback_query.register(handler, lambda c, prefix=f"route{i}_": c.data.startswith(prefix))
+    return dp
+
+
+def router_dispatcher(handlers: int) -> Dispatcher:
+    dp = Dispatcher()
+    router = CallbackRouter()
+
+    async def handler(callback, state, payload):
+        return None
+
+    for i in range(handlers):
+        router.route(f"route{i}", handler)
+    dp.callback_query.register(router.dispatch)
+    return dp
+
+
+async def measure(dp: Dispatcher, bot: Bot, updates: list) -> float:
+    """Микросекунд на обновление"""
+    start = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - start) / len(updates) * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--handlers', type=int, nargs='+', default=[10, 25, 50, 100, 200])
+    args = parser.parse_args()
+
+    bot = Bot('42:benchmark')
+    print(f"{'обработчиков':<14}{'лямбды, мкс':>14}{'роутер, мкс':>14}{'ускорение':>12}")
+    for handlers in args.handlers:
+        last = handlers - 1
+        legacy_updates = [make_update(i, f"route{last}_{i % 4}") for i in range(args.updates)]
+        router_updates = [make_update(i, f"route{last}:{i % 4}") for i in range(args.updates)]
+        legacy = await measure(lambda_dispatcher(handlers), bot, legacy_updates)
+        routed = await measure(router_dispatcher(handlers), bot, router_updates)
+        print(f"{handlers:<14}{legacy:>14.1f}{routed:>14.1f}{legacy / routed:>11.1f}x")
+    await bot.session.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""Бенчмарк вставок в test_results: соединение на каждый вызов против потока записи с пачками.
+
+Запуск: python -m benchmarks.bench_db_inserts --inserts 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import Database
+from utils.migrations import MIGRATIONS
+
+
+def _legacy_insert(db_path: str, user_id: int):
+    """Старый путь: connect → INSERT → commit → close на каждый вызов"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO test_results (user_id, test_type, score, total_questions, completion_time)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (user_id, 'speed', 7, 10, 12.5))
+    conn.commit()
+    conn.close()
+
+
+async def _run_concurrently(total: int, concurrency: int, insert):
+    """Запуск total вставок не более чем в concurrency корутинах"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await insert(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+async def bench_legacy(db_path: str, total: int, concurrency: int) -> float:
+    # Старая схема работала без WAL
+    conn = sqlite3.connect(db_path)
+    for statement in MIGRATIONS[0].statements['sqlite']:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+
+    loop = asyncio.get_running_loop()
+
+    async def insert(i: int):
+        await loop.run_in_executor(None, _legacy_insert, db_path, i)
+
+    return await _run_concurrently(total, concurrency, insert)
+
+
+async def bench_batched(database_url: str, total: int, concurrency: int) -> float:
+    database = Database(database_url)
+    await database.init_db()
+
+    async def insert(i: int):
+        await database.save_test_result(i, 'speed', 7, 10, 12.5)
+
+    try:
+        return await _run_concurrently(total, concurrency, insert)
+    finally:
+        await database.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--inserts', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--aiosqlite', action='store_true', help="также замерить бэкенд aiosqlite")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = await bench_legacy(os.path.join(tmp, 'legacy.db'), args.inserts, args.concurrency)
+        batched = await bench_batched('sqlite:///' + os.path.join(tmp, 'batched.db'),
+                                      args.inserts, args.concurrency)
+        if args.aiosqlite:
+            native = await bench_batched('sqlite+aiosqlite:///' + os.path.join(tmp, 'native.db'),
+                                         args.inserts, args.concurrency)
+
+    print(f"Вставок: {args.inserts}, параллельно: {args.concurrency}")
+    print(f"  connect на вызов: {args.inserts / legacy:10.0f} вставок/с ({legacy:.2f} с)")
+    print(f"  поток записи:     {args.inserts / batched:10.0f} вставок/с ({batched:.2f} с)")
+    if args.aiosqlite:
+        print(f"  aiosqlite:        {args.inserts / native:10.0f} вставок/с ({native:.2f} с)")
+    print(f"  ускорение:        {legacy / batched:10.1f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""Бенчмарк запросов истории пользователя и рассылки напоминаний до и после миграции с индексами.
+
+Запуск: python -m benchmarks.bench_indexes --rows 10000000 --users 200000
+(на 10M строк генерация занимает несколько минут и ~1 ГБ на диске)
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_backends import SQLiteBackend
+from utils.migrations import apply_migrations, MIGRATIONS
+
+TEST_TYPES = ['quiz_design_thinking', 'quiz_perception', 'attention', 'speed',
+              'brain_game_sequence', 'brain_game_logic', 'brain_game_pattern']
+FREQUENCIES = ['daily', '2days', 'mon_thu', 'weekends']
+
+QUERIES = {
+    'история по типу теста': '''
+        SELECT test_type, score, total_questions, completion_time, created_at
+        FROM test_results
+        WHERE user_id = ? AND test_type = ?
+        ORDER BY created_at DESC
+        LIMIT 10
+    ''',
+    'история ИИ': '''
+        SELECT question, answer, feedback, created_at
+        FROM ai_interactions
+        WHERE user_id = ?
+        ORDER BY created_at DESC
+        LIMIT 10
+    ''',
+    'рассылка напоминаний': '''
+        SELECT user_id FROM users
+        WHERE reminder_enabled = TRUE AND reminder_frequency = ?
+    ''',
+}
+
+
+def populate(db_path: str, rows: int, users: int):
+    """Заполнение синтетическими данными рекурсивными CTE прямо в SQLite"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous=OFF')
+    types_case = ' '.join(f"WHEN {i} THEN '{t}'" for i, t in enumerate(TEST_TYPES))
+    freq_case = ' '.join(f"WHEN {i} THEN '{f}'" for i, f in enumerate(FREQUENCIES))
+
+    conn.execute(f'''
+        WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < {users})
+        INSERT INTO users (user_id, username, reminder_frequency, reminder_enabled)
+        SELECT x, 'user' || x,
+               CASE abs(random()) % {len(FREQUENCIES)} {freq_case} END,
+               (abs(random()) % 10) = 0
+        FROM c
+    ''')
+    conn.execute(f'''
+        WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < {rows})
+        INSERT INTO test_results (user_id, test_type, score, total_questions, completion_time, created_at)
+        SELECT 1 + abs(random()) % {users},
+               CASE abs(random()) % {len(TEST_TYPES)} {types_case} END,
+               abs(random()) % 11, 10, (abs(random()) % 60000) / 1000.0,
+               datetime('2025-01-01', '+' || (abs(random()) % 31536000) || ' seconds')
+        FROM c
+    ''')
+    conn.execute(f'''
+        WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < {max(rows // 10, 1)})
+        INSERT INTO ai_interactions (user_id, question, answer, feedback, created_at)
+        SELECT 1 + abs(random()) % {users}, 'Что такое дизайн-мышление?', 'Ответ', NULL,
+               datetime('2025-01-01', '+' || (abs(random()) % 31536000) || ' seconds')
+        FROM c
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def time_queries(db_path: str, users: int, samples: int) -> dict:
+    """Среднее время каждого запроса в миллисекундах"""
+    conn = sqlite3.connect(db_path)
+    rng = random.Random(42)
+    results = {}
+    for name, sql in QUERIES.items():
+        if name == 'рассылка напоминаний':
+            params_list = [(FREQUENCIES[i % len(FREQUENCIES)],) for i in range(max(samples // 50, 4))]
+        elif name == 'история ИИ':
+            params_list = [(rng.randint(1, users),) for _ in range(samples)]
+        else:
+            params_list = [(rng.randint(1, users), rng.choice(TEST_TYPES)) for _ in range(samples)]
+
+        start = time.perf_counter()
+        for params in params_list:
+            conn.execute(sql, params).fetchall()
+        results[name] = (time.perf_counter() - start) * 1000 / len(params_list)
+    conn.close()
+    return results
+
+
+async def migrate(db_path: str, target: int = None):
+    backend = SQLiteBackend(db_path)
+    await backend.connect()
+    try:
+        await apply_migrations(backend, target)
+    finally:
+        await backend.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        await migrate(db_path, target=1)
+
+        start = time.perf_counter()
+        populate(db_path, args.rows, args.users)
+        print(f"Сгенерировано {args.rows} результатов за {time.perf_counter() - start:.1f} с")
+
+        before = time_queries(db_path, args.users, args.samples)
+
+        start = time.perf_counter()
+        await migrate(db_path)
+        print(f"Миграции до версии {MIGRATIONS[-1].version} применены за {time.perf_counter() - start:.1f} с")
+
+        after = time_queries(db_path, args.users, args.samples)
+
+    print(f"{'запрос':<24}{'до, мс':>12}{'после, мс':>12}{'ускорение':>12}")
+    for name in QUERIES:
+        print(f"{name:<24}{before[name]:>12.3f}{after[name]:>12.3f}{before[name] / after[name]:>11.0f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""Микробенчмарк клавиатур: сборка и сериализация на каждое обновление против реестра KEYBOARDS.
+
+Для главного меню и клавиатуры вопроса квиза замеряется путь от построения
+разметки до готовых form-data запроса sendMessage (то, что aiogram делает
+перед отправкой): время на обновление и пик выделенной памяти по tracemalloc.
+Сеть не используется.
+
+Запуск: python -m benchmarks.bench_keyboards --updates 5000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage
+from data.quiz_data import QUIZ_MODULES
+from handlers.start import StartHandler
+from utils.keyboards import CachedMarkupSession, KeyboardRegistry, options_keyboard
+
+
+def scenarios():
+    """(название, ключ в реестре, фабрика клавиатуры)"""
+    question = next(iter(QUIZ_MODULES.values()))['questions'][0]
+    return [
+        ('главное меню', 'main_menu', StartHandler._main_menu_keyboard),
+        ('вопрос квиза', ('quiz', question['id']),
+         lambda: options_keyboard('quiz_ans', question['options'], labeled=True)),
+    ]
+
+
+def one_update(bot: Bot, session: AiohttpSession, keyboard_factory):
+    method = SendMessage(chat_id=42, text='Вопрос', reply_markup=keyboard_factory())
+    return session.build_form_data(bot, method)
+
+
+def measure(bot: Bot, session: AiohttpSession, keyboard_factory, updates: int):
+    """Микросекунд на обновление и средний пик памяти в байтах"""
+    one_update(bot, session, keyboard_factory)
+    start = time.perf_counter()
+    for _ in range(updates):
+        one_update(bot, session, keyboard_factory)
+    elapsed = (time.perf_counter() - start) / updates * 1e6
+
+    samples = min(updates, 500)
+    peak = 0
+    tracemalloc.start()
+    for _ in range(samples):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        one_update(bot, session, keyboard_factory)
+        peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return elapsed, peak / samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--updates', type=int, default=5000)
+    args = parser.parse_args()
+
+    bot = Bot('42:benchmark')
+    plain = AiohttpSession()
+    registry = KeyboardRegistry()
+    cached = CachedMarkupSession(registry=registry)
+
+    print(f"{'клавиатура':<16}{'сборка, мкс':>13}{'реестр, мкс':>13}{'ускорение':>11}"
+          f"{'сборка, КБ':>12}{'реестр, КБ':>12}")
+    for name, key, factory in scenarios():
+        built_time, built_memory = measure(bot, plain, factory, args.updates)
+        cached_time, cached_memory = measure(bot, cached, lambda: registry.get(key, factory), args.updates)
+        print(f"{name:<16}{built_time:>13.1f}{cached_time:>13.1f}{built_time / cached_time:>10.1f}x"
+              f"{built_memory / 1024:>12.1f}{cached_memory / 1024:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Микробенчмарк рейтингов (utils/leaderboard.py).
+
+Для разного числа сохранённых результатов замеряется: обновление рейтинга
+при сохранении результата, запрос места пользователя по дереву Фенвика и
+тот же запрос «в лоб» — лучший результат каждого пользователя по таблице
+test_results во временной базе SQLite и подсчёт тех, у кого он выше.
+Места, посчитанные обоими способами, сверяются.
+
+Запуск: python -m benchmarks.bench_leaderboard --results 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from utils.database import Database
+from utils.leaderboard import Leaderboards
+
+# Тот же ключ, что result_key, но посчитанный по сырым результатам
+RANK_SQL = '''
+    WITH best AS (
+        SELECT user_id,
+               MAX(MIN(100, MAX(0, score * 100 / total_questions)) * 100
+                   + 99 - MIN(99, CAST(completion_time * 10 / total_questions AS INTEGER))) AS best_key
+        FROM test_results WHERE test_type = 'speed'
+        GROUP BY user_id
+    )
+    SELECT COUNT(*) + 1 FROM best WHERE best_key > (SELECT best_key FROM best WHERE user_id = ?)
+'''
+
+
+async def measure(results: int, users: int, queries: int, scan_queries: int) -> tuple:
+    """Микросекунд на обновление, на запрос места и на тот же запрос по test_results"""
+    rnd = random.Random(results)
+    rows = [(rnd.randrange(users), 'speed', rnd.randint(0, 10), 10, rnd.uniform(5, 120))
+            for _ in range(results)]
+
+    # Запись в базу не нужна: фоновая запись не успеет сработать
+    leaderboards = Leaderboards(database=None, flush_interval=3600)
+    start = time.perf_counter()
+    for user_id, test_type, score, total, completion_time in rows:
+        leaderboards.on_result(user_id, test_type, score, total, completion_time)
+    update = (time.perf_counter() - start) / results * 1e6
+
+    sample = [rnd.choice(rows)[0] for _ in range(queries)]
+    start = time.perf_counter()
+    places = [leaderboards.standing('speed', user_id).place for user_id in sample]
+    query = (time.perf_counter() - start) / queries * 1e6
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        await database.init_db()
+        try:
+            await database.backend.executemany('''
+                INSERT INTO test_results (user_id, test_type, score, total_questions, completion_time)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            start = time.perf_counter()
+            scan_places = [(await database.backend.fetchall(RANK_SQL, (user_id,)))[0][0]
+                           for user_id in sample[:scan_queries]]
+            scan = (time.perf_counter() - start) / len(scan_places) * 1e6
+        finally:
+            await database.close()
+
+    assert scan_places == places[:len(scan_places)], "места по дереву и по таблице расходятся"
+    return update, query, scan
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--results', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--queries', type=int, default=10_000)
+    parser.add_argument('--scan-queries', type=int, default=20,
+                        help='запросов по таблице: каждый читает все результаты')
+    args = parser.parse_args()
+
+    print(f"{'результатов':<14}{'обновление, мкс':>17}{'место, мкс':>12}{'по таблице, мкс':>17}")
+    for results in args.results:
+        update, query, scan = await measure(results, args.users, args.queries, args.scan_queries)
+        print(f"{results:<14}{update:>17.1f}{query:>12.1f}{scan:>17.0f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
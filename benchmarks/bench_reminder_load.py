@@ -0,0 +1,85 @@
+"""Бенчмарк распределения напоминаний по минутам за неделю: три cron-рассылки против очереди по времени пользователей.
+
+Пользователи получают случайную частоту, часовой пояс и (у части) своё
+время. Для каждой минуты недели считается, сколько напоминаний наступает;
+при лимите --rate сообщений в секунду видно, сколько длится самый
+большой всплеск.
+
+Запуск: python -m benchmarks.bench_reminder_load --users 100000 --custom-time 0.3
+"""
+import argparse
+import collections
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from utils.reminder_schedule import REMINDER_TIMES, TIMEZONES, next_reminder_at
+
+FREQUENCIES = ['daily', '2days', 'mon_thu', 'weekends']
+# Старое расписание: все пользователи частоты в одну минуту по Москве (UTC+3)
+LEGACY_CRON = {
+    'daily': ({0, 1, 2, 3, 4, 5, 6}, 10),
+    'mon_thu': ({0, 3}, 18),
+    'weekends': ({5, 6}, 12),
+}
+
+
+def legacy_minutes(frequency: str, start: datetime, days: int):
+    if frequency not in LEGACY_CRON:
+        # До версии с очередью «раз в 2 дня» не отправлялось вовсе
+        return []
+    weekdays, hour = LEGACY_CRON[frequency]
+    return [start + timedelta(days=day, hours=hour - 3) for day in range(days)
+            if (start + timedelta(days=day)).weekday() in weekdays]
+
+
+def queued_minutes(user_id: int, frequency: str, zone: str, reminder_time, start: datetime, days: int):
+    minutes = []
+    moment = next_reminder_at(user_id, frequency, zone, reminder_time, start)
+    while moment is not None and moment < start + timedelta(days=days):
+        minutes.append(moment)
+        moment = next_reminder_at(user_id, frequency, zone, reminder_time, moment, reminded=True)
+    return minutes
+
+
+def summary(name: str, buckets: collections.Counter, rate: float):
+    peak = max(buckets.values())
+    print(f"{name:<14}{sum(buckets.values()):>10}{len(buckets):>10}{peak:>10}{peak / rate:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--custom-time', type=float, default=0.3, help='доля пользователей со своим временем')
+    parser.add_argument('--rate', type=float, default=25, help='сообщений в секунду')
+    parser.add_argument('--days', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    # Понедельник, полночь UTC
+    start = datetime(2024, 1, 1)
+    zones = list(TIMEZONES)
+    zone_weights = [1, 10, 2, 2, 1, 2, 1, 1]
+    legacy, queued = collections.Counter(), collections.Counter()
+
+    for user_id in range(1, args.users + 1):
+        frequency = rng.choice(FREQUENCIES)
+        zone = rng.choices(zones, zone_weights)[0]
+        reminder_time = rng.choice(REMINDER_TIMES) if rng.random() < args.custom_time else None
+        for moment in legacy_minutes(frequency, start, args.days):
+            legacy[moment] += 1
+        for moment in queued_minutes(user_id, frequency, zone, reminder_time, start, args.days):
+            queued[moment] += 1
+
+    print(f"{'расписание':<14}{'писем':>10}{'минут':>10}{'пик/мин':>10}{'пик, с':>12}")
+    summary('cron', legacy, args.rate)
+    summary('очередь', queued, args.rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Бенчмарк поиска по курсу: полнота (recall) выбранного контекста, задержка и экономия токенов.
+
+Вопрос считается найденным, если в контекст попал фрагмент с ожидаемой фразой.
+
+Запуск: python -m benchmarks.bench_retrieval --repeat 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.ai_curator import COURSE_CONTEXT
+from ai.retrieval import CourseRetriever, estimate_tokens
+
+# (вопрос, фраза, которая должна оказаться в контексте)
+SAMPLE_QUESTIONS = [
+    ("Что такое дизайн-мышление?", "Дизайн-мышление - это методология"),
+    ("Какие этапы у дизайн-мышления?", "ЭМПАТИЯ"),
+    ("Зачем нужна эмпатия?", "ЭМПАТИЯ"),
+    ("Как правильно делать прототип?", "ПРОТОТИПИРОВАНИЕ"),
+    ("Что значит итеративность?", "Итеративность"),
+    ("Что такое когнитивные искажения?", "Когнитивные искажения - это"),
+    ("Объясни эффект якоря", "Эффект якоря"),
+    ("Что такое эффект подтверждения?", "Эффект подтверждения"),
+    ("Почему люди следуют за большинством?", "Эффект стадности"),
+    ("Как преодолеть искажения мышления?", "Методы преодоления искажений"),
+    ("Как провести мозговой штурм?", "Мозговой штурм"),
+    ("Как составить ментальную карту?", "Ментальные карты"),
+    ("Расскажи про метод SCAMPER", "SCAMPER"),
+    ("Что означает черная шляпа?", "Шесть шляп"),
+    ("Как применять креативность в бизнесе?", "В бизнесе"),
+    ("Как использовать креативность в повседневной жизни?", "В повседневной жизни"),
+    ("Что такое карта эмпатии?", "Карта эмпатии"),
+    ("Как построить customer journey map?", "Customer Journey Map"),
+    ("Что мешает быть креативным?", "Страх ошибок"),
+    ("Как побороть страх ошибок?", "безопасной среды"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--top-k', type=int, default=4)
+    parser.add_argument('--token-budget', type=int, default=600)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    retriever = CourseRetriever(COURSE_CONTEXT, top_k=args.top_k, token_budget=args.token_budget)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    found = 0
+    context_tokens = []
+    for question, expected in SAMPLE_QUESTIONS:
+        context = retriever.get_context(question)
+        context_tokens.append(estimate_tokens(context))
+        if expected.lower() in context.lower():
+            found += 1
+        else:
+            print(f"не найдено: {question!r} (ожидалось {expected!r})")
+
+    latencies = []
+    for _ in range(args.repeat):
+        for question, _ in SAMPLE_QUESTIONS:
+            start = time.perf_counter()
+            retriever.get_context(question)
+            latencies.append((time.perf_counter() - start) * 1_000_000)
+    latencies.sort()
+
+    full_tokens = estimate_tokens(COURSE_CONTEXT)
+    print(f"фрагментов в индексе: {len(retriever.chunks)}, построение {build_ms:.2f} мс")
+    print(f"recall@{args.top_k}: {found}/{len(SAMPLE_QUESTIONS)} ({found / len(SAMPLE_QUESTIONS):.0%})")
+    print(f"задержка: p50 {statistics.median(latencies):.1f} мкс, "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:.1f} мкс")
+    print(f"токенов контекста: полный курс {full_tokens}, "
+          f"в среднем после поиска {statistics.mean(context_tokens):.0f}")
+
+
+if __name__ == '__main__':
+    main()
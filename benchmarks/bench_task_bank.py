@@ -0,0 +1,97 @@
+"""Бенчмарк банка задач-последовательностей (utils/task_bank.py).
+
+Замеряет генерацию пула NumPy (задач в секунду, сколько различных осталось),
+память на 1 млн задач в массиве и в виде словарей Python, как раньше,
+выдачу задачи для раунда (банк против генерации через random на каждый
+раунд) и открытие сохранённого банка через memory-map.
+
+Запуск: python -m benchmarks.bench_task_bank --size 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from utils.task_bank import TASK_DTYPE, SequenceBank, generate_tasks
+
+
+def legacy_task() -> dict:
+    """Как раньше в BrainGamesHandler.generate_task: random на каждый раунд"""
+    pattern = random.choice(['arithmetic', 'geometric', 'fibonacci'])
+    if pattern == 'arithmetic':
+        start = random.randint(1, 10)
+        step = random.randint(2, 5)
+        sequence = [start + i * step for i in range(4)]
+        next_num = sequence[-1] + step
+    elif pattern == 'geometric':
+        start = random.randint(1, 5)
+        ratio = random.randint(2, 3)
+        sequence = [start * (ratio ** i) for i in range(4)]
+        next_num = sequence[-1] * ratio
+    else:
+        sequence = [1, 1, 2, 3]
+        next_num = 5
+    options = [next_num, next_num + random.randint(1, 5), next_num - random.randint(1, 3), next_num * 2]
+    random.shuffle(options)
+    return {
+        'question': f"Найдите следующее число в последовательности:\n{sequence[0]}, {sequence[1]}, {sequence[2]}, {sequence[3]}, ?",
+        'options': options,
+        'correct': options.index(next_num)
+    }
+
+
+def per_second(func, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--rounds', type=int, default=100_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tasks = generate_tasks(args.size, seed=0)
+    elapsed = time.perf_counter() - start
+    print(f"Генерация: {args.size} задач за {elapsed:.2f} с ({args.size / elapsed:,.0f} задач/с), "
+          f"различных {len(tasks)}")
+
+    legacy_sample = 20_000
+    tracemalloc.start()
+    pool = [legacy_task() for _ in range(legacy_sample)]
+    legacy_bytes = tracemalloc.get_traced_memory()[0] / legacy_sample
+    tracemalloc.stop()
+    del pool
+    print(f"Память на 1 млн задач: массив {TASK_DTYPE.itemsize * 1e6 / 2 ** 20:.1f} МБ, "
+          f"словари Python ~{legacy_bytes * 1e6 / 2 ** 20:.0f} МБ")
+
+    bank = SequenceBank(tasks)
+    legacy_rate = per_second(legacy_task, args.rounds)
+    bank_rate = per_second(lambda: bank.task(bank.draw()), args.rounds)
+    ranged_rate = per_second(lambda: bank.task(bank.draw(1200, 1400)), args.rounds)
+    print(f"Задач для раунда в секунду: random {legacy_rate:,.0f}, банк {bank_rate:,.0f}, "
+          f"банк с диапазоном сложности {ranged_rate:,.0f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sequences.npy')
+        bank.save(path)
+        start = time.perf_counter()
+        mapped = SequenceBank.load(path)
+        mapped.task(mapped.draw())
+        print(f"Файл банка: {os.path.getsize(path) / 2 ** 20:.1f} МБ, "
+              f"открытие через memory-map {(time.perf_counter() - start) * 1e3:.1f} мс")
+        del mapped
+
+
+if __name__ == '__main__':
+    main()
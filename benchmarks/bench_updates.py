@@ -0,0 +1,142 @@
+"""Нагрузочный тест приёма обновлений: long polling против webhook.
+
+Синтетические обновления Update (текстовые сообщения) обрабатываются
+хендлером, который отвечает через мок Bot API с задержкой --latency.
+В режиме polling обновления отдаются через getUpdates мока, в режиме
+webhook — отправляются POST-запросами на WebhookServer в --connections
+соединений, как это делает Telegram. Считается время от отправки
+обновления до ответа хендлера.
+
+Запуск: python -m benchmarks.bench_updates --updates 5000 --workers 50 --connections 40
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+import aiohttp
+from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from benchmarks.fake_bot_api import FakeBotAPI
+from utils.webhook import SECRET_HEADER, WebhookServer
+
+SECRET = 'benchmark-secret'
+
+
+def make_update(update_id: int, chats: int) -> dict:
+    chat_id = update_id % chats + 1
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Тест'},
+            'text': f'Вопрос {update_id}',
+        },
+    }
+
+
+class Probe:
+    """Хендлер-эхо, который запоминает время обработки каждого обновления"""
+
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.sent_at = {}
+        self.latencies = []
+        self.done = asyncio.Event()
+
+    def dispatcher(self) -> Dispatcher:
+        dp = Dispatcher()
+        dp.message.register(self.handle)
+        return dp
+
+    async def handle(self, message: types.Message):
+        await message.answer('Ответ')
+        self.latencies.append(time.perf_counter() - self.sent_at[message.message_id])
+        if len(self.latencies) >= self.expected:
+            self.done.set()
+
+
+async def bench_polling(bot: Bot, api: FakeBotAPI, updates: list) -> Probe:
+    probe = Probe(len(updates))
+    dp = probe.dispatcher()
+    start = time.perf_counter()
+    for update in updates:
+        probe.sent_at[update['update_id']] = start
+    api.push_updates(updates)
+    task = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False,
+                                                polling_timeout=1))
+    await probe.done.wait()
+    await dp.stop_polling()
+    await task
+    return probe
+
+
+async def bench_webhook(bot: Bot, updates: list, workers: int, connections: int) -> tuple:
+    probe = Probe(len(updates))
+    server = WebhookServer(bot, probe.dispatcher(), secret=SECRET, workers=workers, queue_size=len(updates))
+    port = await server.start('127.0.0.1', 0)
+    url = f'http://127.0.0.1:{port}/webhook'
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=connections)) as session:
+        async with session.post(url, json=updates[0], headers={SECRET_HEADER: 'wrong'}) as response:
+            wrong_secret = response.status
+
+        async def post(update: dict):
+            probe.sent_at[update['update_id']] = time.perf_counter()
+            async with session.post(url, json=update, headers={SECRET_HEADER: SECRET}) as response:
+                return response.status
+
+        statuses = await asyncio.gather(*(post(update) for update in updates))
+        await probe.done.wait()
+
+    await server.stop()
+    return probe, wrong_secret, sum(1 for status in statuses if status != 200)
+
+
+def report(name: str, probe: Probe, elapsed: float):
+    latencies = sorted(probe.latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{name:<10}{len(latencies) / elapsed:>12.0f}{statistics.median(latencies):>10.3f}{p95:>10.3f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--updates', type=int, default=5000)
+    parser.add_argument('--chats', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.02, help='задержка ответа мока Bot API')
+    parser.add_argument('--workers', type=int, default=50, help='воркеров WebhookServer')
+    parser.add_argument('--connections', type=int, default=40, help='одновременных запросов от «Telegram»')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    api = FakeBotAPI(args.latency)
+    await api.start()
+    bot = Bot('42:benchmark', session=AiohttpSession(api=api.api_server()))
+    try:
+        print(f"{'режим':<10}{'обновл./с':>12}{'p50, с':>10}{'p95, с':>10}")
+        updates = [make_update(i, args.chats) for i in range(1, args.updates + 1)]
+        start = time.perf_counter()
+        probe = await bench_polling(bot, api, updates)
+        report('polling', probe, time.perf_counter() - start)
+
+        updates = [make_update(i, args.chats) for i in range(args.updates + 1, 2 * args.updates + 1)]
+        start = time.perf_counter()
+        probe, wrong_secret, rejected = await bench_webhook(bot, updates, args.workers, args.connections)
+        report('webhook', probe, time.perf_counter() - start)
+        print(f"неверный секрет -> HTTP {wrong_secret}, отклонено из-за очереди: {rejected}")
+    finally:
+        await bot.session.close()
+        await api.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""Локальный мок Telegram Bot API для бенчмарков: sendMessage с задержкой, флуд-контролем и блокировками, getUpdates из очереди."""
+import asyncio
+import collections
+import json
+import time
+from typing import Optional
+
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+
+class FakeBotAPI:
+    """sendMessage отвечает через ``latency`` секунд.
+
+    При ``rate_limit`` больше этого числа сообщений за скользящую секунду
+    получают 429 с retry_after; чаты, id которых делится на ``block_every``,
+    отвечают 403, как заблокировавшие бота пользователи. getUpdates
+    отдаёт обновления, добавленные через ``push_updates``.
+    """
+
+    def __init__(self, latency: float = 0.05, rate_limit: Optional[int] = None,
+                 block_every: Optional[int] = None, retry_after: int = 1):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.block_every = block_every
+        self.retry_after = retry_after
+        self.delivered = collections.Counter()
+        self.too_many_requests = 0
+        self.forbidden = 0
+        self.max_per_second = 0
+        self._window = collections.deque()
+        self._message_id = 0
+        self._runner = None
+        self.base_url = None
+        self._updates = collections.deque()
+        self._updates_ready = asyncio.Event()
+
+    def _error(self, code: int, description: str, **parameters) -> web.Response:
+        body = {'ok': False, 'error_code': code, 'description': description}
+        if parameters:
+            body['parameters'] = parameters
+        return web.json_response(body, status=code)
+
+    async def _send_message(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        chat_id = int(data['chat_id'])
+        now = time.monotonic()
+        while self._window and self._window[0] <= now - 1:
+            self._window.popleft()
+
+        if self.rate_limit is not None and len(self._window) >= self.rate_limit:
+            self.too_many_requests += 1
+            return self._error(429, f'Too Many Requests: retry after {self.retry_after}',
+                               retry_after=self.retry_after)
+        if self.block_every and chat_id % self.block_every == 0:
+            self.forbidden += 1
+            return self._error(403, 'Forbidden: bot was blocked by the user')
+
+        self._window.append(now)
+        self.max_per_second = max(self.max_per_second, len(self._window))
+        await asyncio.sleep(self.latency)
+        self.delivered[chat_id] += 1
+        self._message_id += 1
+        return web.json_response({'ok': True, 'result': {
+            'message_id': self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+    def push_updates(self, updates):
+        """Обновления (словари в формате Bot API) для getUpdates"""
+        self._updates.extend(updates)
+        self._updates_ready.set()
+
+    async def _get_updates(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        offset = int(data.get('offset', 0))
+        limit = int(data.get('limit', 100))
+        timeout = float(data.get('timeout', 0))
+        while self._updates and self._updates[0]['update_id'] < offset:
+            self._updates.popleft()
+        if not self._updates and timeout:
+            self._updates_ready.clear()
+            try:
+                await asyncio.wait_for(self._updates_ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        batch = [self._updates[i] for i in range(min(limit, len(self._updates)))]
+        return web.json_response({'ok': True, 'result': batch})
+
+    async def _method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        if method.lower() == 'sendmessage':
+            return await self._send_message(request)
+        if method.lower() == 'getupdates':
+            return await self._get_updates(request)
+        if method.lower() == 'getme':
+            return web.json_response({'ok': True, 'result': {
+                'id': 42, 'is_bot': True, 'first_name': 'Benchmark', 'username': 'benchmark_bot'
+            }})
+        return web.Response(text=json.dumps({'ok': True, 'result': True}), content_type='application/json')
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self._method)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f'http://{host}:{port}'
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def api_server(self) -> TelegramAPIServer:
+        """Адрес для ``AiohttpSession(api=...)``"""
+        return TelegramAPIServer.from_base(self.base_url)
@@ -0,0 +1,103 @@
+"""Локальный мок GigaChat API для бенчмарков: OAuth и chat/completions с настраиваемой задержкой."""
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+SUGGESTIONS_MARKER = 'ПОХОЖИЕ ВОПРОСЫ:'
+
+
+class MockGigaChat:
+    """Задержка ответа моделируется как base_latency + max_tokens * token_latency.
+
+    При ``max_concurrent`` запросы сверх этого числа одновременно получают 429.
+    """
+
+    def __init__(self, base_latency: float = 0.3, token_latency: float = 0.001,
+                 max_concurrent: int = None):
+        self.base_latency = base_latency
+        self.token_latency = token_latency
+        self.max_concurrent = max_concurrent
+        self.oauth_requests = 0
+        self.chat_requests = 0
+        self.rejected_requests = 0
+        self.active_requests = 0
+        self.max_active_requests = 0
+        self._runner = None
+        self.base_url = None
+
+    def _content(self, body: dict) -> str:
+        system = body['messages'][0]['content']
+        question = body['messages'][-1]['content']
+        if SUGGESTIONS_MARKER in system:
+            return (f"ОТВЕТ:\nКраткий ответ на вопрос «{question}».\n"
+                    f"{SUGGESTIONS_MARKER}\n1. Первый вопрос?\n2. Второй вопрос?\n3. Третий вопрос?")
+        if 'похожих вопроса' in question:
+            return "Первый вопрос?\nВторой вопрос?\nТретий вопрос?"
+        return f"Краткий ответ на вопрос «{question}»."
+
+    async def _oauth(self, request: web.Request) -> web.Response:
+        self.oauth_requests += 1
+        return web.json_response({
+            'access_token': f'token-{self.oauth_requests}',
+            'expires_at': int((time.time() + 1800) * 1000)
+        })
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        self.chat_requests += 1
+        if self.max_concurrent is not None and self.active_requests >= self.max_concurrent:
+            self.rejected_requests += 1
+            return web.json_response({'message': 'Too Many Requests'}, status=429)
+        self.active_requests += 1
+        self.max_active_requests = max(self.max_active_requests, self.active_requests)
+        try:
+            body = await request.json()
+            if body.get('stream'):
+                return await self._chat_stream(request, body)
+            await asyncio.sleep(self.base_latency + body.get('max_tokens', 500) * self.token_latency)
+            return web.json_response({'choices': [{'message': {'content': self._content(body)}}]})
+        finally:
+            self.active_requests -= 1
+
+    async def _chat_stream(self, request: web.Request, body: dict) -> web.StreamResponse:
+        """SSE-ответ: первый фрагмент после base_latency, остальные по мере «генерации»"""
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        await asyncio.sleep(self.base_latency)
+        words = self._content(body).split(' ')
+        tokens_per_word = body.get('max_tokens', 500) / max(len(words), 1)
+        for i, word in enumerate(words):
+            chunk = word if i == 0 else ' ' + word
+            event = json.dumps({'choices': [{'delta': {'content': chunk}}]}, ensure_ascii=False)
+            await response.write(f'data: {event}\n\n'.encode())
+            await asyncio.sleep(tokens_per_word * self.token_latency)
+        await response.write(b'data: [DONE]\n\n')
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/api/v2/oauth', self._oauth)
+        app.router.add_post('/api/v1/chat/completions', self._chat)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f'http://{host}:{port}'
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @property
+    def oauth_url(self) -> str:
+        return f'{self.base_url}/api/v2/oauth'
+
+    @property
+    def api_url(self) -> str:
+        return f'{self.base_url}/api/v1/chat/completions'
@@ -0,0 +1,60 @@
+"""Отчёт об экономии запросов к GigaChat по журналу ai_interactions.
+
+Считает сообщения за последние --days дней по источнику ответа: llm —
+ответила модель, остальные (menu, faq, smalltalk, question, unknown) —
+локальный классификатор вместо модели. Для ответов модели дополнительно
+показывает, сколько из них вовсе не похожи на вопрос (приветствия,
+названия разделов) — столько запросов тратилось на случайные сообщения.
+
+Запуск: python -m benchmarks.report_ai_usage --database-url sqlite:///mind_bot.db --days 7
+"""
+import argparse
+import asyncio
+import collections
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from ai.intent import classify
+from config import AI_SUGGESTIONS_MODE, DATABASE_URL
+from utils.database import Database
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--days', type=int, default=7)
+    args = parser.parse_args()
+
+    # Вопрос без классификатора стоил ответ и, кроме режима combined, отдельный запрос похожих вопросов
+    calls_per_question = 1 if AI_SUGGESTIONS_MODE == 'combined' else 2
+
+    database = Database(args.database_url)
+    await database.init_db()
+    try:
+        stats = await database.get_ai_usage_stats(args.days)
+        llm_questions = await database.get_llm_questions(args.days)
+    finally:
+        await database.close()
+
+    total = sum(stats.values())
+    local = total - stats.get('llm', 0)
+    print(f"Сообщений за {args.days} дн.: {total}")
+    for source, count in sorted(stats.items(), key=lambda item: -item[1]):
+        print(f"  {source:<10}{count:>8}{count / total:>8.1%}")
+    if total:
+        print(f"Ответов без модели: {local} ({local / total:.1%}), "
+              f"сэкономлено запросов к GigaChat: ~{local * calls_per_question}")
+
+    if llm_questions:
+        intents = collections.Counter(classify(question).kind for question in llm_questions)
+        intercepted = len(llm_questions) - intents['question']
+        print(f"Из {len(llm_questions)} сообщений, ушедших в модель, не похожи на вопрос "
+              f"{intercepted} ({intercepted / len(llm_questions):.1%}): {dict(intents)}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
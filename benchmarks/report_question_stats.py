@@ -0,0 +1,60 @@
+"""Отчёт по вопросам тестов из журнала answer_events.
+
+Для каждого вопроса за последние --days дней: число ответов, доля верных
+и среднее время ответа. Отдельно выводятся вопросы, на которые почти все
+отвечают верно или почти все ошибаются, — кандидаты на правку.
+
+Запуск: python -m benchmarks.report_question_stats --database-url sqlite:///mind_bot.db --days 30
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+os.environ.setdefault('GIGACHAT_AUTH_KEY', 'benchmark')
+
+from config import DATABASE_URL
+from data.quiz_data import QUESTION_INDEX
+from utils.database import Database
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--test-type', default=None)
+    parser.add_argument('--min-answers', type=int, default=20,
+                        help='вопросы с меньшим числом ответов не попадают в список кандидатов')
+    args = parser.parse_args()
+
+    database = Database(args.database_url)
+    await database.init_db()
+    try:
+        stats = await database.get_question_stats(args.days, args.test_type)
+    finally:
+        await database.close()
+
+    if not stats:
+        print(f"Ответов за {args.days} дн. нет")
+        return
+
+    print(f"{'id':<6}{'тест':<24}{'ответов':>9}{'верно':>8}{'время, с':>10}  вопрос")
+    for row in stats:
+        question = QUESTION_INDEX.get(row['question_id'], {}).get('question', '?').splitlines()[0]
+        latency = f"{row['avg_latency_ms'] / 1000:.1f}" if row['avg_latency_ms'] is not None else '—'
+        print(f"{row['question_id']:<6}{row['test_type']:<24}{row['answers']:>9}{row['accuracy']:>8.0%}"
+              f"{latency:>10}  {question[:50]}")
+
+    frequent = [row for row in stats if row['answers'] >= args.min_answers]
+    easy = [row['question_id'] for row in frequent if row['accuracy'] >= 0.95]
+    hard = [row['question_id'] for row in frequent if row['accuracy'] <= 0.2]
+    if easy:
+        print(f"Слишком лёгкие (≥95% верных): {easy}")
+    if hard:
+        print(f"Слишком трудные (≤20% верных): {hard}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
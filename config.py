@@ -16,12 +16,76 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///mind_bot.db')
 # Logging level
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
-# API timeout
+# API timeout (на одну попытку запроса, секунды)
 API_TIMEOUT = int(os.getenv('API_TIMEOUT', '30'))
 
+# Общий срок запроса к GigaChat вместе с очередью и повторами, секунды
+API_DEADLINE = int(os.getenv('API_DEADLINE', '60'))
+
 # Max retries for API calls
 MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
 
+# Предохранитель: после AI_BREAKER_THRESHOLD сбоев подряд запросы к GigaChat
+# отклоняются сразу, пробный запрос — через AI_BREAKER_RESET секунд
+AI_BREAKER_THRESHOLD = int(os.getenv('AI_BREAKER_THRESHOLD', '5'))
+AI_BREAKER_RESET = int(os.getenv('AI_BREAKER_RESET', '30'))
+
+# Размер пула соединений с GigaChat
+AI_MAX_CONNECTIONS = int(os.getenv('AI_MAX_CONNECTIONS', '20'))
+
+# Допуск запросов к GigaChat: одновременно не больше AI_MAX_CONCURRENT,
+# не чаще AI_RATE_LIMIT в секунду (0 — без ограничения) с запасом AI_RATE_BURST,
+# ожидающих в очереди — не больше AI_MAX_QUEUE
+AI_MAX_CONCURRENT = int(os.getenv('AI_MAX_CONCURRENT', '10'))
+AI_RATE_LIMIT = float(os.getenv('AI_RATE_LIMIT', '5'))
+AI_RATE_BURST = float(os.getenv('AI_RATE_BURST', '10'))
+AI_MAX_QUEUE = int(os.getenv('AI_MAX_QUEUE', '200'))
+
+# Как получать ответ и похожие вопросы: sequential, parallel или combined (один запрос)
+AI_SUGGESTIONS_MODE = os.getenv('AI_SUGGESTIONS_MODE', 'parallel')
+
+# Потоковый ответ ИИ с постепенной правкой сообщения
+AI_STREAMING = os.getenv('AI_STREAMING', 'true').lower() == 'true'
+
+# Минимальный интервал между правками сообщения при потоковом ответе, секунды
+AI_STREAM_EDIT_INTERVAL = float(os.getenv('AI_STREAM_EDIT_INTERVAL', '1.0'))
+
+# Сколько фрагментов курса подставлять в промпт и их суммарный бюджет в токенах
+AI_CONTEXT_TOP_K = int(os.getenv('AI_CONTEXT_TOP_K', '4'))
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv('AI_CONTEXT_TOKEN_BUDGET', '600'))
+
+# Кэш ответов ИИ: число записей (0 — выключен), время жизни в секундах
+# и порог сходства для почти одинаковых вопросов
+AI_CACHE_SIZE = int(os.getenv('AI_CACHE_SIZE', '1000'))
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', '86400'))
+AI_CACHE_SIMILARITY = float(os.getenv('AI_CACHE_SIMILARITY', '0.8'))
+
+# Прогревать кэш при запуске ответами из таблицы ai_interactions
+AI_CACHE_PERSIST = os.getenv('AI_CACHE_PERSIST', 'true').lower() == 'true'
+
+# Режим получения обновлений: polling или webhook
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+
+# Webhook: публичный адрес (https://bot.example.com), путь, секрет из заголовка
+# X-Telegram-Bot-Api-Secret-Token и адрес, на котором слушает сервер
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+
+# Обработчиков обновлений одновременно, размер очереди и сколько секунд
+# дорабатывать принятые обновления при остановке
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '50'))
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', '30'))
+
+# FSM storage: memory, database (таблица fsm_states в DATABASE_URL) или redis://host:port/db
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'memory')
+
+# Время жизни брошенной FSM-сессии в секундах
+FSM_STATE_TTL = int(os.getenv('FSM_STATE_TTL', '86400'))
+
 # Проверка обязательных переменных
 if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN не найден в переменных окружения")
@@ -29,5 +93,57 @@ if not BOT_TOKEN:
 if not GIGACHAT_AUTH_KEY:
     raise ValueError("GIGACHAT_AUTH_KEY не найден в переменных окружения")
 
-# Scheduler
-SCHEDULER_TIMEZONE = "Europe/Moscow" 
\ No newline at end of file
+if BOT_MODE not in ('polling', 'webhook'):
+    raise ValueError(f"Неизвестный BOT_MODE: {BOT_MODE}")
+
+if BOT_MODE == 'webhook' and not WEBHOOK_URL:
+    raise ValueError("WEBHOOK_URL обязателен в режиме webhook")
+
+if BOT_MODE == 'webhook' and not WEBHOOK_SECRET:
+    raise ValueError("WEBHOOK_SECRET обязателен в режиме webhook: без него кто угодно может слать боту поддельные обновления")
+
+# Scheduler: часовой пояс бота и пользователей, не выбравших свой
+SCHEDULER_TIMEZONE = os.getenv('SCHEDULER_TIMEZONE', 'Europe/Moscow')
+
+# Аренда лидерства: рассылки выполняет один экземпляр бота, аренда продлевается
+# каждую минуту и переходит к другому экземпляру через столько секунд после падения
+SCHEDULER_LEASE_TTL = int(os.getenv('SCHEDULER_LEASE_TTL', '90'))
+
+# Напоминание, опоздавшее больше чем на столько секунд (бот был выключен),
+# не отправляется, а переносится на следующий раз
+REMINDER_MISFIRE_GRACE = int(os.getenv('REMINDER_MISFIRE_GRACE', '10800'))
+
+# Напоминания без выбранного времени разносятся на столько минут после времени по умолчанию
+REMINDER_SPREAD_MINUTES = int(os.getenv('REMINDER_SPREAD_MINUTES', '60'))
+
+# Рассылка напоминаний: сообщений в секунду на весь бот (лимит Telegram ~30),
+# одновременных отправок и размер страницы получателей из базы
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', '25'))
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '20'))
+BROADCAST_PAGE_SIZE = int(os.getenv('BROADCAST_PAGE_SIZE', '500'))
+
+# Банк задач-последовательностей для разминки: файл .npy (открывается через
+# memory-map; если его нет — генерируется и сохраняется, пустой путь — без файла),
+# сколько задач генерировать до удаления повторов (из 500 тысяч остаётся
+# ~50 тысяч различных, больше генератор почти не даёт) и зерно генератора.
+# При том же зерне номера задач в незавершённых играх остаются верными
+# после перезапуска; после смены размера или зерна файл нужно удалить
+TASK_BANK_PATH = os.getenv('TASK_BANK_PATH', 'data/task_bank.npy')
+TASK_BANK_SIZE = int(os.getenv('TASK_BANK_SIZE', '500000'))
+TASK_BANK_SEED = int(os.getenv('TASK_BANK_SEED', '0'))
+
+# Адаптивные тесты: вопросов в тесте (не больше, чем в банке темы) и как часто,
+# в секундах, рейтинги навыков и сложности вопросов записываются в базу
+ADAPTIVE_TEST_LENGTH = int(os.getenv('ADAPTIVE_TEST_LENGTH', '10'))
+ADAPTIVE_FLUSH_INTERVAL = float(os.getenv('ADAPTIVE_FLUSH_INTERVAL', '5'))
+
+# Журнал ответов на вопросы (answer_events): размер буфера в памяти, строк
+# в одной пачке записи и как часто, в секундах, буфер сбрасывается в базу
+ANSWER_EVENTS_BUFFER = int(os.getenv('ANSWER_EVENTS_BUFFER', '10000'))
+ANSWER_EVENTS_BATCH = int(os.getenv('ANSWER_EVENTS_BATCH', '500'))
+ANSWER_EVENTS_FLUSH_INTERVAL = float(os.getenv('ANSWER_EVENTS_FLUSH_INTERVAL', '1'))
+
+# Рейтинги: как часто, в секундах, лучшие результаты записываются в базу
+# (и подтягиваются записанные другими экземплярами) и сколько участников в топе
+LEADERBOARD_FLUSH_INTERVAL = float(os.getenv('LEADERBOARD_FLUSH_INTERVAL', '30'))
+LEADERBOARD_TOP_SIZE = int(os.getenv('LEADERBOARD_TOP_SIZE', '10'))
@@ -27,6 +27,7 @@ HELP_MESSAGE = """
 🧠 **Разминка мозга** - Логические задачи
 🤖 **ИИ помощник** - Задавай вопросы по курсу
 ⏰ **Напоминания** - Настрой уведомления о занятиях
+🏆 **Рейтинг** - Твоё место среди других участников
 
 **Во время тестов:**
 • Используй /start для выхода
@@ -47,6 +48,17 @@ REMINDER_CONFIRMED_MESSAGE = """
 чтобы ты не забыл прокачивать своё мышление! 💪
 """
 
+REMINDER_SCHEDULE_MESSAGE = """
+🕘 Время: {time}
+🌍 Часовой пояс: {zone}
+
+Время и часовой пояс можно поменять кнопками ниже.
+"""
+
+REMINDER_TIME_MESSAGE = "🕘 Во сколько присылать напоминания?"
+
+REMINDER_TIMEZONE_MESSAGE = "🌍 Выбери свой часовой пояс:"
+
 REMINDER_CANCELLED_MESSAGE = """
 ✅ Готово! Все напоминания отключены.
 
@@ -64,12 +76,22 @@ AI_WELCOME_MESSAGE = """
 
 AI_THINKING_MESSAGE = "🤔 Думаю..."
 
+AI_QUEUE_MESSAGE = "⏳ Сейчас много вопросов. Твой — {position}-й в очереди, скоро отвечу!"
+
 AI_ERROR_MESSAGE = """
 ❌ Извините, произошла ошибка при обработке вопроса.
 
 Попробуйте переформулировать вопрос или обратитесь позже.
 """
 
+FALLBACK_SECTION_MESSAGE = "Похоже, тебе нужен раздел «{section}» 👇"
+
+FALLBACK_QUESTION_MESSAGE = "🤖 Похоже на вопрос по курсу. Задать его ИИ помощнику?"
+
+FALLBACK_IN_TEST_MESSAGE = "👆 Чтобы ответить, нажми на кнопку с вариантом ответа под вопросом."
+
+FALLBACK_UNKNOWN_MESSAGE = "🤔 Не понял сообщение. Выбери раздел в меню или задай вопрос ИИ помощнику."
+
 QUIZ_SELECTION_MESSAGE = """
 📚 **Выбор модуля для тест-квиза**
 
@@ -102,4 +124,12 @@ BRAIN_GAMES_INTRO = """
 Не обязательно отвечать идеально - главное включить мозги!
 
 Отвечай быстро и интуитивно. Потом сравним с правильными ответами.
-""" 
\ No newline at end of file
+""" 
+
+LEADERBOARD_MESSAGE = """
+🏆 **Рейтинг**
+
+Твоё место среди всех, кто проходил тесты (по лучшему результату):
+"""
+
+LEADERBOARD_EMPTY_MESSAGE = "🏆 Ты ещё не проходил тесты. Пройди любой — и увидишь своё место в рейтинге!"
@@ -5,6 +5,7 @@ QUIZ_MODULES = {
         "title": "Основы мышления",
         "questions": [
             {
+                "id": 101,
                 "question": "Что лежит в основе подхода дизайн-мышления?",
                 "options": [
                     "Логический анализ рынка",
@@ -16,6 +17,7 @@ QUIZ_MODULES = {
                 "explanation": "Глубокое понимание потребностей пользователя"
             },
             {
+                "id": 102,
                 "question": "С чего начинается процесс дизайн-мышления?",
                 "options": [
                     "Генерации идей",
@@ -27,6 +29,7 @@ QUIZ_MODULES = {
                 "explanation": "Эмпатии"
             },
             {
+                "id": 103,
                 "question": "Какой этап следует за генерацией идей в классической модели?",
                 "options": [
                     "Исследование",
@@ -38,6 +41,7 @@ QUIZ_MODULES = {
                 "explanation": "Прототипирование"
             },
             {
+                "id": 104,
                 "question": "Что важно на этапе тестирования в дизайн-мышлении?",
                 "options": [
                     "Получить максимальную прибыль",
@@ -49,6 +53,7 @@ QUIZ_MODULES = {
                 "explanation": "Получить обратную связь от реальных пользователей"
             },
             {
+                "id": 105,
                 "question": "Для чего используется метод \"карта эмпатии\"?",
                 "options": [
                     "Оценки эмоций команды",
@@ -65,6 +70,7 @@ QUIZ_MODULES = {
         "title": "Границы восприятия",
         "questions": [
             {
+                "id": 201,
                 "question": "Что такое когнитивные искажения?",
                 "options": [
                     "Физические недостатки зрения",
@@ -76,6 +82,7 @@ QUIZ_MODULES = {
                 "explanation": "Систематические ошибки в мышлении"
             },
             {
+                "id": 202,
                 "question": "Что такое эффект якоря?",
                 "options": [
                     "Склонность полагаться на первую полученную информацию",
@@ -87,6 +94,7 @@ QUIZ_MODULES = {
                 "explanation": "Склонность полагаться на первую полученную информацию"
             },
             {
+                "id": 203,
                 "question": "Что такое эффект подтверждения?",
                 "options": [
                     "Стремление подтвердить свои убеждения",
@@ -103,42 +111,49 @@ QUIZ_MODULES = {
 
 ATTENTION_QUESTIONS = [
     {
+        "id": 301,
         "question": "Сколько букв Н в слове \"КОНСЕРВИРОВАННЫЙ\"?",
         "options": ["1", "2", "3", "4"],
         "correct": 2,
         "explanation": "3"
     },
     {
+        "id": 302,
         "question": "Какой цвет был первым в списке?",
         "options": ["Синий", "Красный", "Желтый", "Зеленый"],
         "correct": 1,
         "explanation": "Красный"
     },
     {
+        "id": 303,
         "question": "Что не повторяется в ряду: 3, 5, 3, 7, 5, 7, 9?",
         "options": ["3", "5", "7", "9"],
         "correct": 3,
         "explanation": "9"
     },
     {
+        "id": 304,
         "question": "Прочитай слово ЗВЕЗДОЧКА задом наперед. Какой будет третьей буквой?",
         "options": ["М", "Ч", "Е", "Н"],
         "correct": 1,
         "explanation": "Ч"
     },
     {
+        "id": 305,
         "question": "Сколько раз в слове РАЗНООБРАЗНЫЙ встречается гласная?",
         "options": ["4", "5", "6", "7"],
         "correct": 2,
         "explanation": "6"
     },
     {
+        "id": 306,
         "question": "Найдите лишнее слово: КНИГА, ТЕТРАДЬ, РУЧКА, СТОЛ",
         "options": ["КНИГА", "ТЕТРАДЬ", "РУЧКА", "СТОЛ"],
         "correct": 3,
         "explanation": "СТОЛ (не канцелярский предмет)"
     },
     {
+        "id": 307,
         "question": "Сколько треугольников на картинке? (представьте простой треугольник)",
         "options": ["1", "2", "3", "4"],
         "correct": 0,
@@ -148,60 +163,70 @@ ATTENTION_QUESTIONS = [
 
 SPEED_QUESTIONS = [
     {
+        "id": 401,
         "question": "15 + 27 = ?",
         "options": ["42", "43", "41", "44"],
         "correct": 0,
         "explanation": "15 + 27 = 42"
     },
     {
+        "id": 402,
         "question": "8 × 7 = ?",
         "options": ["54", "56", "58", "60"],
         "correct": 1,
         "explanation": "8 × 7 = 56"
     },
     {
+        "id": 403,
         "question": "64 ÷ 8 = ?",
         "options": ["6", "7", "8", "9"],
         "correct": 2,
         "explanation": "64 ÷ 8 = 8"
     },
     {
+        "id": 404,
         "question": "23 - 15 = ?",
         "options": ["6", "7", "8", "9"],
         "correct": 2,
         "explanation": "23 - 15 = 8"
     },
     {
+        "id": 405,
         "question": "12 > 8?",
         "options": ["Да", "Нет", "Равны", "Не знаю"],
         "correct": 0,
         "explanation": "12 больше 8"
     },
     {
+        "id": 406,
         "question": "5 × 9 = ?",
         "options": ["40", "45", "50", "55"],
         "correct": 1,
         "explanation": "5 × 9 = 45"
     },
     {
+        "id": 407,
         "question": "36 ÷ 6 = ?",
         "options": ["5", "6", "7", "8"],
         "correct": 1,
         "explanation": "36 ÷ 6 = 6"
     },
     {
+        "id": 408,
         "question": "19 + 11 = ?",
         "options": ["28", "29", "30", "31"],
         "correct": 2,
         "explanation": "19 + 11 = 30"
     },
     {
+        "id": 409,
         "question": "7 < 3?",
         "options": ["Да", "Нет", "Равны", "Не знаю"],
         "correct": 1,
         "explanation": "7 не меньше 3"
     },
     {
+        "id": 410,
         "question": "4 × 6 = ?",
         "options": ["20", "22", "24", "26"],
         "correct": 2,
@@ -228,6 +253,7 @@ BRAIN_GAMES = {
 BRAIN_GAME_TASKS = {
     "logic": [
         {
+            "id": 501,
             "question": "Если все розы - цветы, а некоторые цветы быстро увядают, то:",
             "options": [
                 "Все розы быстро увядают",
@@ -238,6 +264,7 @@ BRAIN_GAME_TASKS = {
             "correct": 1
         },
         {
+            "id": 502,
             "question": "Если A = B, а B = C, то:",
             "options": [
                 "A = C",
@@ -248,6 +275,7 @@ BRAIN_GAME_TASKS = {
             "correct": 0
         },
         {
+            "id": 503,
             "question": "Все студенты - люди. Некоторые люди носят очки. Значит:",
             "options": [
                 "Все студенты носят очки",
@@ -258,6 +286,7 @@ BRAIN_GAME_TASKS = {
             "correct": 1
         },
         {
+            "id": 504,
             "question": "Если X > Y, а Y > Z, то:",
             "options": [
                 "X > Z",
@@ -270,24 +299,45 @@ BRAIN_GAME_TASKS = {
     ],
     "pattern": [
         {
+            "id": 601,
             "question": "Какая фигура должна быть следующей?\n🔴 ⚫ 🔴 ⚫ 🔴 ?",
             "options": ["🔴", "⚫", "🔵", "🟡"],
             "correct": 1
         },
         {
+            "id": 602,
             "question": "Какая фигура должна быть следующей?\n🔺 🔻 🔺 🔻 🔺 ?",
             "options": ["🔻", "🔺", "🔸", "🔹"],
             "correct": 0
         },
         {
+            "id": 603,
             "question": "Какая фигура должна быть следующей?\n🟩 🟨 🟩 🟨 🟩 ?",
             "options": ["🟦", "🟨", "🟩", "🟥"],
             "correct": 1
         },
         {
+            "id": 604,
             "question": "Какая фигура должна быть следующей?\n⭐ 🌟 ⭐ 🌟 ⭐ ?",
             "options": ["⭐", "🌟", "✨", "💫"],
             "correct": 1
         }
     ]
-} 
\ No newline at end of file
+} 
+
+def _build_question_index() -> dict:
+    """Индекс всех вопросов по стабильному id"""
+    index = {}
+    groups = [module['questions'] for module in QUIZ_MODULES.values()]
+    groups += [ATTENTION_QUESTIONS, SPEED_QUESTIONS]
+    groups += list(BRAIN_GAME_TASKS.values())
+    for questions in groups:
+        for question in questions:
+            if question['id'] in index:
+                raise ValueError(f"Повторяющийся id вопроса: {question['id']}")
+            index[question['id']] = question
+    return index
+
+
+# В состоянии пользователя хранится только порядок id, сами вопросы берутся отсюда
+QUESTION_INDEX = _build_question_index()
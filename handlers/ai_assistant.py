@@ -1,16 +1,29 @@
+import asyncio
 from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from states.user_states import UserStates
-from data.messages import AI_WELCOME_MESSAGE, AI_THINKING_MESSAGE, AI_ERROR_MESSAGE
-from ai.api_client import AIClient
+from data.messages import AI_WELCOME_MESSAGE, AI_THINKING_MESSAGE, AI_ERROR_MESSAGE, AI_QUEUE_MESSAGE
+from ai.api_client import AIClient, ERROR_PREFIXES, QueuePositionCallback
+from ai.answer_cache import context_hash
 from ai.context_manager import ContextManager
 from utils.database import Database
+from utils.keyboards import KEYBOARDS
+from utils.message_editor import ThrottledEditor
+from config import AI_SUGGESTIONS_MODE, AI_STREAMING, AI_STREAM_EDIT_INTERVAL, AI_CACHE_PERSIST
 
 class AIAssistantHandler:
     def __init__(self, database: Database):
         self.database = database
         self.context_manager = ContextManager()
+        self.ai_client = AIClient.get_instance()
+    
+    async def warm_cache(self):
+        """Прогрев кэша ответов из сохранённых взаимодействий"""
+        if AI_CACHE_PERSIST and self.ai_client.cache is not None:
+            rows = await self.database.get_cacheable_ai_answers(self.ai_client.cache.max_size)
+            self.ai_client.cache.warm(rows)
         
     async def start_ai_chat(self, message: types.Message, state: FSMContext):
         """Начало чата с ИИ"""
@@ -19,77 +32,143 @@ class AIAssistantHandler:
         
     async def handle_ai_question(self, message: types.Message, state: FSMContext):
         """Обработка вопроса к ИИ"""
-        question = message.text
-        
+        await self.answer_question(message, state, message.text, message.from_user.id)
+    
+    async def answer_question(self, message: types.Message, state: FSMContext, question: str, user_id: int):
+        """Ответ ИИ на вопрос в чат ``message``"""
         # Показываем индикатор загрузки
         loading_msg = await message.answer(AI_THINKING_MESSAGE)
+        # Пока запрос ждёт очереди к GigaChat, в этом сообщении показывается позиция
+        editor = ThrottledEditor(loading_msg, min_interval=AI_STREAM_EDIT_INTERVAL)
+        
+        def on_queue_position(position: int):
+            editor.update(AI_QUEUE_MESSAGE.format(position=position))
         
         try:
-            async with AIClient() as ai_client:
-                # Получаем контекст
-                context = self.context_manager.get_context_for_question(question)
-                
-                # Получаем ответ от ИИ
-                answer = await ai_client.get_answer(question, context)
-                
-                # Получаем предложения похожих вопросов
-                suggestions = await ai_client.get_suggestions(question, context)
+            # Получаем контекст
+            context = self.context_manager.get_context_for_question(question)
+            
+            if AI_STREAMING:
+                answer = await self._answer_streaming(question, context, loading_msg, editor, on_queue_position)
+            else:
+                # Получаем ответ от ИИ и предложения похожих вопросов
+                answer, suggestions = await self.ai_client.get_answer_and_suggestions(
+                    question, context, mode=AI_SUGGESTIONS_MODE, on_queue_position=on_queue_position
+                )
+                await editor.finish()
                 
                 # Удаляем сообщение о загрузке
                 await loading_msg.delete()
                 
-                # Сохраняем взаимодействие
-                await self.database.save_ai_interaction(
-                    user_id=message.from_user.id,
-                    question=question,
-                    answer=answer
+                await message.answer(
+                    self._format_response(answer, suggestions),
+                    reply_markup=self._feedback_keyboard(),
+                    parse_mode="Markdown"
                 )
-                
-                # Формируем ответ с кнопками
-                keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                    [
-                        InlineKeyboardButton(text="👍 Полезно", callback_data="ai_like"),
-                        InlineKeyboardButton(text="👎 Не полезно", callback_data="ai_dislike")
-                    ],
-                    [
-                        InlineKeyboardButton(text="🔄 Задать еще вопрос", callback_data="ai_another")
-                    ]
-                ])
-                
-                response = f"🤖 **Ответ:**\n\n{answer}\n\n"
-                
-                if suggestions:
-                    response += "💡 **Похожие вопросы:**\n"
-                    for i, suggestion in enumerate(suggestions[:3], 1):
-                        response += f"{i}. {suggestion}\n"
-                
-                response += "\nОцени ответ:"
-                
-                await message.answer(response, reply_markup=keyboard, parse_mode="Markdown")
-                
-                # Сохраняем вопрос и ответ в состоянии
-                await state.update_data(last_question=question, last_answer=answer)
-                await state.set_state(UserStates.AI_FEEDBACK)
-                
+            
+            # Сохраняем взаимодействие; хэш контекста нужен для прогрева кэша,
+            # у ошибок его нет, чтобы они не попали в кэш после перезапуска
+            await self.database.save_ai_interaction(
+                user_id=user_id,
+                question=question,
+                answer=answer,
+                context_hash=None if answer.startswith(ERROR_PREFIXES) else context_hash(context)
+            )
+            
+            # Сохраняем вопрос и ответ в состоянии
+            await state.update_data(last_question=question, last_answer=answer)
+            await state.set_state(UserStates.AI_FEEDBACK)
+            
         except Exception as e:
+            await editor.finish()
             await loading_msg.delete()
             await message.answer(AI_ERROR_MESSAGE)
             await state.set_state(UserStates.AI_CHAT)
     
-    async def handle_ai_feedback(self, callback: types.CallbackQuery, state: FSMContext):
+    async def _answer_streaming(self, question: str, context: str, loading_msg: types.Message,
+                                editor: ThrottledEditor,
+                                on_queue_position: QueuePositionCallback) -> str:
+        """Потоковый ответ с прогрессивной правкой сообщения о загрузке"""
+        # Похожие вопросы запрашиваем параллельно с генерацией ответа
+        suggestions_task = asyncio.create_task(self.ai_client.get_suggestions(question, context))
+        
+        answer = ""
+        try:
+            async for chunk in self.ai_client.stream_answer(question, context, on_queue_position):
+                answer += chunk
+                editor.update(f"🤖 {answer} ▌")
+        except BaseException:
+            suggestions_task.cancel()
+            raise
+        finally:
+            await editor.finish()
+        
+        suggestions = await suggestions_task
+        response = self._format_response(answer, suggestions)
+        try:
+            await loading_msg.edit_text(response, reply_markup=self._feedback_keyboard(), parse_mode="Markdown")
+        except TelegramBadRequest:
+            # Разметка в ответе модели может быть незакрытой
+            await loading_msg.edit_text(response, reply_markup=self._feedback_keyboard())
+        return answer
+    
+    def _feedback_keyboard(self) -> InlineKeyboardMarkup:
+        """Кнопки оценки ответа"""
+        return KEYBOARDS.get('ai_feedback', lambda: InlineKeyboardMarkup(inline_keyboard=[
+            [
+                InlineKeyboardButton(text="👍 Полезно", callback_data="ai:like"),
+                InlineKeyboardButton(text="👎 Не полезно", callback_data="ai:dislike")
+            ],
+            [
+                InlineKeyboardButton(text="🔄 Задать еще вопрос", callback_data="ai:another")
+            ]
+        ]))
+    
+    def _format_response(self, answer: str, suggestions: list) -> str:
+        """Текст ответа с похожими вопросами"""
+        response = f"🤖 **Ответ:**\n\n{answer}\n\n"
+        
+        if suggestions:
+            response += "💡 **Похожие вопросы:**\n"
+            for i, suggestion in enumerate(suggestions[:3], 1):
+                response += f"{i}. {suggestion}\n"
+        
+        response += "\nОцени ответ:"
+        return response
+    
+    async def handle_ai_feedback(self, callback: types.CallbackQuery, state: FSMContext, payload: str):
         """Обработка обратной связи по ответу ИИ"""
-        feedback_type = callback.data
+        feedback_type = payload
         
-        if feedback_type == "ai_like":
+        if feedback_type == "like":
             feedback_value = 1
             await callback.answer("👍 Спасибо! Рад, что ответ был полезен!")
-        elif feedback_type == "ai_dislike":
+        elif feedback_type == "dislike":
             feedback_value = 0
             await callback.answer("👎 Спасибо за обратную связь! Буду стараться лучше.")
-        elif feedback_type == "ai_another":
+            # Неудачный ответ больше не отдаём из кэша
+            data = await state.get_data()
+            if self.ai_client.cache is not None and 'last_answer' in data:
+                self.ai_client.cache.evict_answer(data['last_answer'])
+        elif feedback_type == "another":
             await callback.answer("🔄 Задавайте следующий вопрос!")
             await state.set_state(UserStates.AI_CHAT)
             return
+        elif feedback_type == "ask":
+            # Вопрос, написанный вне чата с ИИ: отправляем в модель только после подтверждения
+            data = await state.get_data()
+            question = data.get('pending_question')
+            await callback.answer()
+            await state.set_state(UserStates.AI_CHAT)
+            if question:
+                await state.update_data(pending_question=None)
+                await self.answer_question(callback.message, state, question, callback.from_user.id)
+            else:
+                await callback.message.answer(AI_WELCOME_MESSAGE)
+            return
+        else:
+            await callback.answer()
+            return
         
         # Сохраняем обратную связь
         data = await state.get_data()
@@ -2,30 +2,39 @@ from aiogram import types
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from states.user_states import UserStates
-from data.quiz_data import ATTENTION_QUESTIONS
+from data.quiz_data import ATTENTION_QUESTIONS, QUESTION_INDEX
 from data.messages import ATTENTION_TEST_INTRO
 from utils.database import Database
-import random
+from utils.keyboards import KEYBOARDS, options_keyboard
+from utils.adaptive import AdaptiveEngine
+from utils.telemetry import AnswerRecorder
+from utils.timing import mark, seconds_since
+from config import ADAPTIVE_TEST_LENGTH
 import time
 
+TOPIC = "attention"
+
 class AttentionHandler:
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, adaptive: AdaptiveEngine, recorder: AnswerRecorder):
         self.database = database
+        self.adaptive = adaptive
+        self.recorder = recorder
+        self.adaptive.register(TOPIC, ((question['id'], question.get('difficulty')) for question in ATTENTION_QUESTIONS))
     
     async def start_attention_test(self, message: types.Message, state: FSMContext):
         """Начало теста на внимание"""
         await state.set_state(UserStates.ATTENTION_TEST)
         
-        # Перемешиваем вопросы
-        shuffled_questions = ATTENTION_QUESTIONS.copy()
-        random.shuffle(shuffled_questions)
+        # Вопросы подбираются по одному под уровень пользователя,
+        # в состоянии — только id уже заданных
+        await self.adaptive.prepare(message.chat.id, TOPIC)
         
         # Сохраняем данные теста в состоянии
         await state.update_data(
-            questions=shuffled_questions,
+            order=[],
+            total_questions=min(len(ATTENTION_QUESTIONS), ADAPTIVE_TEST_LENGTH),
             current_question=0,
             correct_answers=0,
-            total_questions=len(shuffled_questions),
             start_time=time.time()
         )
         
@@ -38,48 +47,58 @@ class AttentionHandler:
         """Показ текущего вопроса"""
         data = await state.get_data()
         current_question = data['current_question']
-        questions = data['questions']
+        order = data['order']
+        # Состояния до адаптивного подбора: в order сразу все вопросы теста
+        total_questions = data.get('total_questions', len(order))
         
-        if current_question >= len(questions):
+        if current_question >= total_questions:
             await self.finish_test(message, state)
             return
         
-        question_data = questions[current_question]
+        if current_question >= len(order):
+            question_id = await self.adaptive.next_question(message.chat.id, TOPIC, order)
+            if question_id is None:
+                await self.finish_test(message, state)
+                return
+            order = order + [question_id]
+            await state.update_data(order=order)
         
-        keyboard_buttons = []
-        for i, option in enumerate(question_data['options']):
-            keyboard_buttons.append([
-                InlineKeyboardButton(
-                    text=option, 
-                    callback_data=f"attention_answer_{i}"
-                )
-            ])
+        question_data = QUESTION_INDEX[order[current_question]]
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+        keyboard = KEYBOARDS.get(
+            ('attention', question_data['id']),
+            lambda: options_keyboard('attn_ans', question_data['options'])
+        )
         
-        question_text = f"👁 **Вопрос {current_question + 1} из {len(questions)}**\n\n{question_data['question']}"
+        question_text = f"👁 **Вопрос {current_question + 1} из {total_questions}**\n\n{question_data['question']}"
         
         await message.answer(question_text, reply_markup=keyboard, parse_mode="Markdown")
+        # Отсчёт — с момента, когда вопрос отправлен
+        await state.update_data(shown_at=mark())
     
-    async def handle_answer(self, callback: types.CallbackQuery, state: FSMContext):
+    async def handle_answer(self, callback: types.CallbackQuery, state: FSMContext, payload: str):
         """Обработка ответа на вопрос"""
+        answered_at = mark()
         data = await state.get_data()
         current_question = data['current_question']
-        questions = data['questions']
+        order = data['order']
         correct_answers = data['correct_answers']
         
-        if current_question >= len(questions):
+        if current_question >= len(order):
             await callback.answer("Тест уже завершен!")
             return
         
-        question_data = questions[current_question]
-        user_answer = int(callback.data.replace("attention_answer_", ""))
+        question_data = QUESTION_INDEX[order[current_question]]
+        user_answer = int(payload)
         correct_answer = question_data['correct']
         
         # Проверяем ответ
         is_correct = user_answer == correct_answer
         if is_correct:
             correct_answers += 1
+        self.adaptive.record(callback.from_user.id, TOPIC, is_correct, item_id=question_data['id'])
+        self.recorder.record(callback.from_user.id, TOPIC, question_data['id'], user_answer, is_correct,
+                             latency=seconds_since(data.get('shown_at'), answered_at))
         
         # Обновляем состояние
         await state.update_data(
@@ -94,7 +113,7 @@ class AttentionHandler:
         await callback.answer()
         
         # Показываем следующий вопрос или завершаем тест
-        if current_question + 1 < len(questions):
+        if current_question + 1 < data.get('total_questions', len(order)):
             await self.show_question(callback.message, state)
         else:
             await self.finish_test(callback.message, state)
@@ -103,7 +122,7 @@ class AttentionHandler:
         """Завершение теста"""
         data = await state.get_data()
         correct_answers = data['correct_answers']
-        total_questions = data['total_questions']
+        total_questions = data.get('total_questions', len(data['order']))
         start_time = data['start_time']
         
         completion_time = time.time() - start_time
@@ -140,12 +159,12 @@ class AttentionHandler:
 **Оценка:** {result_text}
         """
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        keyboard = KEYBOARDS.get('attention_finish', lambda: InlineKeyboardMarkup(inline_keyboard=[
             [
-                InlineKeyboardButton(text="🔄 Пройти еще раз", callback_data="attention"),
-                InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_menu")
+                InlineKeyboardButton(text="🔄 Пройти еще раз", callback_data="menu:attention"),
+                InlineKeyboardButton(text="🏠 Главное меню", callback_data="menu:back")
             ]
-        ])
+        ]))
         
         await message.answer(result_message, reply_markup=keyboard, parse_mode="Markdown")
         await state.clear() 
\ No newline at end of file
@@ -2,51 +2,60 @@ from aiogram import types
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from states.user_states import UserStates
-from data.quiz_data import BRAIN_GAMES, BRAIN_GAME_TASKS
+from data.quiz_data import BRAIN_GAMES, BRAIN_GAME_TASKS, QUESTION_INDEX
 from data.messages import BRAIN_GAMES_INTRO
 from utils.database import Database
+from utils.keyboards import KEYBOARDS, options_keyboard
+from utils.task_bank import load_sequence_bank
+from utils.adaptive import AdaptiveEngine, TARGET_OFFSET
+from config import TASK_BANK_PATH, TASK_BANK_SIZE, TASK_BANK_SEED
 import random
 import time
+from typing import Optional
 
 class BrainGamesHandler:
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, adaptive: AdaptiveEngine):
         self.database = database
+        self.adaptive = adaptive
+        self.sequences = load_sequence_bank(TASK_BANK_PATH, TASK_BANK_SIZE, TASK_BANK_SEED)
     
     async def show_brain_games_menu(self, message: types.Message, state: FSMContext):
         """Показ меню игр для мозга"""
         await state.set_state(UserStates.BRAIN_GAMES_SELECTION)
         
+        keyboard = KEYBOARDS.get('brain_games_menu', self._menu_keyboard)
+        
+        await message.answer(BRAIN_GAMES_INTRO, reply_markup=keyboard)
+    
+    @staticmethod
+    def _menu_keyboard() -> InlineKeyboardMarkup:
         keyboard_buttons = []
         for game_id, game_data in BRAIN_GAMES.items():
             keyboard_buttons.append([
                 InlineKeyboardButton(
                     text=f"🧠 {game_data['title']}", 
-                    callback_data=f"brain_game_{game_id}"
+                    callback_data=f"game:{game_id}"
                 )
             ])
-        keyboard_buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")])
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-        
-        await message.answer(BRAIN_GAMES_INTRO, reply_markup=keyboard)
+        keyboard_buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data="menu:back")])
+        return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
-    async def start_brain_game(self, callback: types.CallbackQuery, state: FSMContext):
+    async def start_brain_game(self, callback: types.CallbackQuery, state: FSMContext, payload: str):
         """Начало игры для мозга"""
-        game_id = callback.data.replace("brain_game_", "")
+        game_id = payload
         
         if game_id not in BRAIN_GAMES:
             await callback.answer("Игра не найдена!")
             return
         
-        game_data = BRAIN_GAMES[game_id]
-        
-        # Сохраняем данные игры в состоянии
+        # Сохраняем данные игры в состоянии: описание игры берется по game_id
         await state.update_data(
             game_id=game_id,
-            game_data=game_data,
             current_round=0,
             score=0,
-            total_rounds=5
+            total_rounds=5,
+            task_id=None,
+            task_index=None
         )
         
         await state.set_state(UserStates.BRAIN_GAME_IN_PROGRESS)
@@ -60,65 +69,53 @@ class BrainGamesHandler:
         data = await state.get_data()
         current_round = data['current_round']
         total_rounds = data['total_rounds']
-        game_data = data['game_data']
+        game_data = BRAIN_GAMES[data['game_id']]
         
         if current_round >= total_rounds:
             await self.finish_game(message, state)
             return
         
-        # Генерируем задачу для текущего раунда
-        task = self.generate_task(game_data['type'])
-        
-        # Обновляем состояние с задачей
-        await state.update_data(
-            current_round=current_round + 1,
-            current_task=task
-        )
+        # Генерируем задачу для текущего раунда; последовательности — под уровень пользователя
+        target = None
+        if game_data['type'] == "sequence":
+            target = await self.adaptive.prepare(message.chat.id, "sequence") - TARGET_OFFSET
+        task = self.generate_task(game_data['type'], target)
         
-        keyboard_buttons = []
-        for i, option in enumerate(task['options']):
-            keyboard_buttons.append([
-                InlineKeyboardButton(
-                    text=str(option), 
-                    callback_data=f"brain_answer_{i}"
-                )
-            ])
+        # Задачи из банка храним по id, последовательности — по номеру в банке,
+        # сгенерированные — только варианты и номер ответа
+        if 'id' in task:
+            await state.update_data(current_round=current_round + 1, task_id=task['id'], task_index=None)
+        elif 'index' in task:
+            await state.update_data(current_round=current_round + 1, task_id=None, task_index=task['index'])
+        else:
+            await state.update_data(
+                current_round=current_round + 1,
+                task_id=None,
+                task_index=None,
+                task_options=task['options'],
+                task_correct=task['correct']
+            )
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+        # Варианты задач из банка неизменны — их клавиатуры кэшируются по id;
+        # последовательностей слишком много для кэша, они собираются каждый раз
+        if 'id' in task:
+            keyboard = KEYBOARDS.get(('game', task['id']), lambda: options_keyboard('game_ans', task['options']))
+        else:
+            keyboard = options_keyboard('game_ans', task['options'])
         
         round_text = f"🧠 **Раунд {current_round + 1} из {total_rounds}**\n\n{task['question']}"
         
         await message.answer(round_text, reply_markup=keyboard, parse_mode="Markdown")
     
-    def generate_task(self, game_type: str) -> dict:
-        """Генерация задачи для игры"""
+    def generate_task(self, game_type: str, difficulty: Optional[float] = None) -> dict:
+        """Генерация задачи для игры, при ``difficulty`` — близкой к этой сложности"""
         if game_type == "sequence":
-            # Последовательности чисел
-            sequence = []
-            pattern = random.choice(['arithmetic', 'geometric', 'fibonacci'])
-            
-            if pattern == 'arithmetic':
-                start = random.randint(1, 10)
-                step = random.randint(2, 5)
-                sequence = [start + i * step for i in range(4)]
-                next_num = sequence[-1] + step
-            elif pattern == 'geometric':
-                start = random.randint(1, 5)
-                ratio = random.randint(2, 3)
-                sequence = [start * (ratio ** i) for i in range(4)]
-                next_num = sequence[-1] * ratio
-            else:  # fibonacci
-                sequence = [1, 1, 2, 3]
-                next_num = 5
-            
-            options = [next_num, next_num + random.randint(1, 5), next_num - random.randint(1, 3), next_num * 2]
-            random.shuffle(options)
-            
-            return {
-                'question': f"Найдите следующее число в последовательности:\n{sequence[0]}, {sequence[1]}, {sequence[2]}, {sequence[3]}, ?",
-                'options': options,
-                'correct': options.index(next_num)
-            }
+            # Последовательности из заранее сгенерированного банка
+            if difficulty is None:
+                index = self.sequences.draw()
+            else:
+                index = self.sequences.draw(difficulty - 100, difficulty + 100)
+            return dict(self.sequences.task(index), index=index)
         
         elif game_type == "logic":
             # Логические задачи из quiz_data
@@ -163,31 +160,33 @@ class BrainGamesHandler:
                 'correct': 0
             }
     
-    async def handle_game_answer(self, callback: types.CallbackQuery, state: FSMContext):
+    async def handle_game_answer(self, callback: types.CallbackQuery, state: FSMContext, payload: str):
         """Обработка ответа в игре"""
         data = await state.get_data()
         current_round = data['current_round']
         total_rounds = data['total_rounds']
         score = data['score']
-        current_task = data['current_task']
+        options, correct_answer = self._current_task(data)
         
         if current_round > total_rounds:
             await callback.answer("Игра уже завершена!")
             return
         
-        user_answer = int(callback.data.replace("brain_answer_", ""))
-        correct_answer = current_task['correct']
+        user_answer = int(payload)
         
         # Проверяем ответ
         is_correct = user_answer == correct_answer
         if is_correct:
             score += 1
+        if data.get('task_index') is not None:
+            difficulty = self.sequences.task(data['task_index'])['difficulty']
+            self.adaptive.record(callback.from_user.id, "sequence", is_correct, item_rating=difficulty)
         
         # Обновляем состояние
         await state.update_data(score=score)
         
         # Показываем результат
-        result_text = f"✅ **Правильно!**\n\n{current_task['options'][correct_answer]}" if is_correct else f"❌ **Неправильно!**\n\nПравильный ответ: {current_task['options'][correct_answer]}"
+        result_text = f"✅ **Правильно!**\n\n{options[correct_answer]}" if is_correct else f"❌ **Неправильно!**\n\nПравильный ответ: {options[correct_answer]}"
         
         await callback.message.edit_text(result_text, parse_mode="Markdown")
         await callback.answer()
@@ -198,13 +197,24 @@ class BrainGamesHandler:
         else:
             await self.finish_game(callback.message, state)
     
+    def _current_task(self, data: dict) -> tuple:
+        """Варианты ответа и номер правильного для текущей задачи"""
+        task_id = data.get('task_id')
+        if task_id is not None:
+            task = QUESTION_INDEX[task_id]
+            return task['options'], task['correct']
+        if data.get('task_index') is not None:
+            task = self.sequences.task(data['task_index'])
+            return task['options'], task['correct']
+        return data['task_options'], data['task_correct']
+    
     async def finish_game(self, message: types.Message, state: FSMContext):
         """Завершение игры"""
         data = await state.get_data()
         score = data['score']
         total_rounds = data['total_rounds']
         game_id = data['game_id']
-        game_data = data['game_data']
+        game_data = BRAIN_GAMES[game_id]
         
         # Сохраняем результат
         await self.database.save_test_result(
@@ -235,15 +245,15 @@ class BrainGamesHandler:
 **Оценка:** {result_text}
         """
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        keyboard = KEYBOARDS.get(('game_finish', game_id), lambda: InlineKeyboardMarkup(inline_keyboard=[
             [
-                InlineKeyboardButton(text="🔄 Играть еще раз", callback_data=f"brain_game_{game_id}"),
-                InlineKeyboardButton(text="🧠 Другая игра", callback_data="brain_games")
+                InlineKeyboardButton(text="🔄 Играть еще раз", callback_data=f"game:{game_id}"),
+                InlineKeyboardButton(text="🧠 Другая игра", callback_data="menu:brain_games")
             ],
             [
-                InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_menu")
+                InlineKeyboardButton(text="🏠 Главное меню", callback_data="menu:back")
             ]
-        ])
+        ]))
         
         await message.answer(result_message, reply_markup=keyboard, parse_mode="Markdown")
         await state.clear() 
\ No newline at end of file
@@ -0,0 +1,67 @@
+from aiogram import types
+from aiogram.fsm.context import FSMContext
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from states.user_states import UserStates
+from data.messages import (FALLBACK_SECTION_MESSAGE, FALLBACK_QUESTION_MESSAGE, FALLBACK_IN_TEST_MESSAGE,
+                           FALLBACK_UNKNOWN_MESSAGE)
+from ai.intent import SECTIONS, classify
+from utils.database import Database
+from utils.keyboards import KEYBOARDS
+
+# Состояния, в которых ответ дают кнопками под вопросом
+TEST_STATES = {
+    UserStates.QUIZ_IN_PROGRESS.state,
+    UserStates.ATTENTION_TEST.state,
+    UserStates.SPEED_TEST.state,
+    UserStates.BRAIN_GAME_IN_PROGRESS.state,
+}
+
+class FallbackHandler:
+    """Текстовые сообщения вне чата с ИИ: ответ из меню или FAQ без запроса к модели"""
+    
+    def __init__(self, database: Database):
+        self.database = database
+    
+    async def handle_message(self, message: types.Message, state: FSMContext):
+        """Обработка сообщения, которое не относится к чату с ИИ"""
+        intent = classify(message.text)
+        current_state = await state.get_state()
+        
+        if intent.kind in ('faq', 'smalltalk'):
+            text = intent.answer
+            keyboard = self._section_keyboard(intent.section)
+        elif intent.kind == 'menu':
+            text = FALLBACK_SECTION_MESSAGE.format(section=SECTIONS[intent.section][0])
+            keyboard = self._section_keyboard(intent.section)
+        elif current_state in TEST_STATES:
+            text = FALLBACK_IN_TEST_MESSAGE
+            keyboard = None
+        elif intent.kind == 'question':
+            # Вопрос уходит в модель только по кнопке
+            await state.update_data(pending_question=message.text)
+            text = FALLBACK_QUESTION_MESSAGE
+            keyboard = KEYBOARDS.get('fallback_question', lambda: InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text="🤖 Спросить ИИ", callback_data="ai:ask")],
+                [InlineKeyboardButton(text="🏠 Главное меню", callback_data="menu:back")]
+            ]))
+        else:
+            text = FALLBACK_UNKNOWN_MESSAGE
+            keyboard = self._section_keyboard('back')
+        
+        await message.answer(text, reply_markup=keyboard)
+        
+        # Раньше каждое такое сообщение уходило в GigaChat: журнал нужен для отчёта об экономии
+        if message.text:
+            await self.database.save_ai_interaction(
+                user_id=message.from_user.id,
+                question=message.text,
+                answer=text,
+                source=intent.kind
+            )
+    
+    @staticmethod
+    def _section_keyboard(section: str) -> InlineKeyboardMarkup:
+        title = SECTIONS[section][0]
+        return KEYBOARDS.get(('section', section), lambda: InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=title, callback_data=f"menu:{section}")]
+        ]))
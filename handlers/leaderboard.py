@@ -0,0 +1,83 @@
+from aiogram import types
+from aiogram.fsm.context import FSMContext
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from data.quiz_data import QUIZ_MODULES, BRAIN_GAMES
+from data.messages import LEADERBOARD_MESSAGE, LEADERBOARD_EMPTY_MESSAGE
+from utils.database import Database
+from utils.keyboards import KEYBOARDS
+from utils.leaderboard import Leaderboards, key_percent
+from config import LEADERBOARD_TOP_SIZE
+
+MEDALS = ("🥇", "🥈", "🥉")
+
+class LeaderboardHandler:
+    """Рейтинги по тестам: место пользователя и лучшие участники"""
+    
+    def __init__(self, database: Database, leaderboards: Leaderboards):
+        self.database = database
+        self.leaderboards = leaderboards
+    
+    @staticmethod
+    def test_title(test_type: str) -> str:
+        """Название теста по test_type из test_results"""
+        if test_type == "attention":
+            return "👁 Тест на внимание"
+        if test_type == "speed":
+            return "⚡ Тест на скорость"
+        if test_type.startswith("quiz_") and test_type[5:] in QUIZ_MODULES:
+            return f"📚 {QUIZ_MODULES[test_type[5:]]['title']}"
+        if test_type.startswith("brain_game_") and test_type[11:] in BRAIN_GAMES:
+            return f"🧠 {BRAIN_GAMES[test_type[11:]]['title']}"
+        return test_type
+    
+    async def show_leaderboard(self, message: types.Message, user_id: int):
+        """Место пользователя во всех пройденных тестах"""
+        standings = self.leaderboards.standings(user_id)
+        if not standings:
+            await message.answer(LEADERBOARD_EMPTY_MESSAGE, reply_markup=self._back_keyboard())
+            return
+        
+        lines = [LEADERBOARD_MESSAGE]
+        buttons = []
+        for test_type, standing in sorted(standings.items(), key=lambda item: self.test_title(item[0])):
+            title = self.test_title(test_type)
+            lines.append(
+                f"{title}: {standing.percent}% — {standing.place}-е место из {standing.total}, "
+                f"ты в топ {self._top_percent(standing.top_percent)}%"
+            )
+            buttons.append([InlineKeyboardButton(text=f"🏆 {title}", callback_data=f"lb:{test_type}")])
+        buttons.append([InlineKeyboardButton(text="🏠 Главное меню", callback_data="menu:back")])
+        
+        await message.answer("\n".join(lines), reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons))
+    
+    async def show_top(self, callback: types.CallbackQuery, state: FSMContext, payload: str):
+        """Лучшие участники одного теста"""
+        test_type = payload
+        top = self.leaderboards.top(test_type, LEADERBOARD_TOP_SIZE)
+        names = await self.database.get_user_names([user_id for user_id, _ in top])
+        
+        lines = [f"🏆 {self.test_title(test_type)}\n"]
+        for position, (user_id, key) in enumerate(top, 1):
+            mark = MEDALS[position - 1] if position <= len(MEDALS) else f"{position}."
+            name = names.get(user_id, "Участник")
+            you = " (ты)" if user_id == callback.from_user.id else ""
+            lines.append(f"{mark} {name}{you} — {key_percent(key)}%")
+        
+        standing = self.leaderboards.standing(test_type, callback.from_user.id)
+        if standing is not None and standing.place > len(top):
+            lines.append(f"\nТвоё место: {standing.place} из {standing.total} — {standing.percent}%")
+        
+        await callback.message.answer("\n".join(lines), reply_markup=self._back_keyboard())
+        await callback.answer()
+    
+    @staticmethod
+    def _top_percent(value: float) -> str:
+        # Меньше процента — с одним знаком, чтобы первое место не выглядело как «топ 0%»
+        return f"{max(value, 0.1):.1f}" if value < 1 else str(round(value))
+    
+    @staticmethod
+    def _back_keyboard() -> InlineKeyboardMarkup:
+        return KEYBOARDS.get('leaderboard_back', lambda: InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="🏆 Рейтинг", callback_data="menu:leaderboard")],
+            [InlineKeyboardButton(text="🏠 Главное меню", callback_data="menu:back")]
+        ]))
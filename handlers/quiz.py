@@ -2,55 +2,70 @@ from aiogram import types
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from states.user_states import UserStates
-from data.quiz_data import QUIZ_MODULES
+from data.quiz_data import QUIZ_MODULES, QUESTION_INDEX
 from data.messages import QUIZ_SELECTION_MESSAGE
 from utils.database import Database
-import random
+from utils.keyboards import KEYBOARDS, options_keyboard
+from utils.adaptive import AdaptiveEngine
+from utils.telemetry import AnswerRecorder
+from utils.timing import mark, seconds_since
+from config import ADAPTIVE_TEST_LENGTH
+
+def _topic(module_id: str) -> str:
+    return f"quiz:{module_id}"
 
 class QuizHandler:
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, adaptive: AdaptiveEngine, recorder: AnswerRecorder):
         self.database = database
+        self.adaptive = adaptive
+        self.recorder = recorder
+        for module_id, module_data in QUIZ_MODULES.items():
+            self.adaptive.register(_topic(module_id), (
+                (question['id'], question.get('difficulty')) for question in module_data['questions']
+            ))
     
     async def show_quiz_selection(self, message: types.Message, state: FSMContext):
         """Показ выбора модуля для квиза"""
         await state.set_state(UserStates.QUIZ_SELECTION)
         
+        keyboard = KEYBOARDS.get('quiz_selection', self._selection_keyboard)
+        
+        await message.answer(QUIZ_SELECTION_MESSAGE, reply_markup=keyboard)
+    
+    @staticmethod
+    def _selection_keyboard() -> InlineKeyboardMarkup:
         keyboard_buttons = []
         for module_id, module_data in QUIZ_MODULES.items():
             keyboard_buttons.append([
                 InlineKeyboardButton(
                     text=f"📚 {module_data['title']}", 
-                    callback_data=f"quiz_module_{module_id}"
+                    callback_data=f"quiz:{module_id}"
                 )
             ])
-        keyboard_buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")])
-        
-        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-        
-        await message.answer(QUIZ_SELECTION_MESSAGE, reply_markup=keyboard)
+        keyboard_buttons.append([InlineKeyboardButton(text="🔙 Назад", callback_data="menu:back")])
+        return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
-    async def start_quiz(self, callback: types.CallbackQuery, state: FSMContext):
+    async def start_quiz(self, callback: types.CallbackQuery, state: FSMContext, payload: str):
         """Начало квиза по выбранному модулю"""
-        module_id = callback.data.replace("quiz_module_", "")
+        module_id = payload
         
         if module_id not in QUIZ_MODULES:
             await callback.answer("Модуль не найден!")
             return
         
         module_data = QUIZ_MODULES[module_id]
-        questions = module_data['questions']
         
-        # Перемешиваем вопросы
-        shuffled_questions = questions.copy()
-        random.shuffle(shuffled_questions)
+        # Вопросы подбираются по одному под уровень пользователя,
+        # в состоянии — только id уже заданных
+        await self.adaptive.prepare(callback.from_user.id, _topic(module_id))
         
         # Сохраняем данные квиза в состоянии
         await state.update_data(
             quiz_module=module_id,
-            questions=shuffled_questions,
+            order=[],
+            total_questions=min(len(module_data['questions']), ADAPTIVE_TEST_LENGTH),
             current_question=0,
-            correct_answers=0,
-            total_questions=len(shuffled_questions)
+            correct_answers=0
         )
         
         await state.set_state(UserStates.QUIZ_IN_PROGRESS)
@@ -63,48 +78,60 @@ class QuizHandler:
         """Показ текущего вопроса"""
         data = await state.get_data()
         current_question = data['current_question']
-        questions = data['questions']
+        order = data['order']
+        # Состояния до адаптивного подбора: в order сразу все вопросы теста
+        total_questions = data.get('total_questions', len(order))
         
-        if current_question >= len(questions):
+        if current_question >= total_questions:
             await self.finish_quiz(message, state)
             return
         
-        question_data = questions[current_question]
+        if current_question >= len(order):
+            question_id = await self.adaptive.next_question(message.chat.id, _topic(data['quiz_module']), order)
+            if question_id is None:
+                await self.finish_quiz(message, state)
+                return
+            order = order + [question_id]
+            await state.update_data(order=order)
         
-        keyboard_buttons = []
-        for i, option in enumerate(question_data['options']):
-            keyboard_buttons.append([
-                InlineKeyboardButton(
-                    text=f"{chr(97 + i)}) {option}", 
-                    callback_data=f"quiz_answer_{i}"
-                )
-            ])
+        question_data = QUESTION_INDEX[order[current_question]]
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+        # Клавиатура вопроса одна для всех пользователей: строится один раз на id
+        keyboard = KEYBOARDS.get(
+            ('quiz', question_data['id']),
+            lambda: options_keyboard('quiz_ans', question_data['options'], labeled=True)
+        )
         
-        question_text = f"📚 **Вопрос {current_question + 1} из {len(questions)}**\n\n{question_data['question']}"
+        question_text = f"📚 **Вопрос {current_question + 1} из {total_questions}**\n\n{question_data['question']}"
         
         await message.answer(question_text, reply_markup=keyboard, parse_mode="Markdown")
+        # Отсчёт — с момента, когда вопрос отправлен
+        await state.update_data(shown_at=mark())
     
-    async def handle_answer(self, callback: types.CallbackQuery, state: FSMContext):
+    async def handle_answer(self, callback: types.CallbackQuery, state: FSMContext, payload: str):
         """Обработка ответа на вопрос"""
+        answered_at = mark()
         data = await state.get_data()
         current_question = data['current_question']
-        questions = data['questions']
+        order = data['order']
         correct_answers = data['correct_answers']
         
-        if current_question >= len(questions):
+        if current_question >= len(order):
             await callback.answer("Квиз уже завершен!")
             return
         
-        question_data = questions[current_question]
-        user_answer = int(callback.data.replace("quiz_answer_", ""))
+        question_data = QUESTION_INDEX[order[current_question]]
+        user_answer = int(payload)
         correct_answer = question_data['correct']
         
         # Проверяем ответ
         is_correct = user_answer == correct_answer
         if is_correct:
             correct_answers += 1
+        self.adaptive.record(callback.from_user.id, _topic(data['quiz_module']), is_correct,
+                             item_id=question_data['id'])
+        self.recorder.record(callback.from_user.id, f"quiz_{data['quiz_module']}", question_data['id'],
+                             user_answer, is_correct, latency=seconds_since(data.get('shown_at'), answered_at))
         
         # Обновляем состояние
         await state.update_data(
@@ -119,7 +146,7 @@ class QuizHandler:
         await callback.answer()
         
         # Показываем следующий вопрос или завершаем квиз
-        if current_question + 1 < len(questions):
+        if current_question + 1 < data.get('total_questions', len(order)):
             await self.show_question(callback.message, state)
         else:
             await self.finish_quiz(callback.message, state)
@@ -128,7 +155,7 @@ class QuizHandler:
         """Завершение квиза"""
         data = await state.get_data()
         correct_answers = data['correct_answers']
-        total_questions = data['total_questions']
+        total_questions = data.get('total_questions', len(data['order']))
         module_id = data['quiz_module']
         
         # Сохраняем результат
@@ -161,15 +188,15 @@ class QuizHandler:
 Модуль: {QUIZ_MODULES[module_id]['title']}
         """
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        keyboard = KEYBOARDS.get(('quiz_finish', module_id), lambda: InlineKeyboardMarkup(inline_keyboard=[
             [
-                InlineKeyboardButton(text="🔄 Пройти еще раз", callback_data=f"quiz_module_{module_id}"),
-                InlineKeyboardButton(text="📚 Другой модуль", callback_data="quiz")
+                InlineKeyboardButton(text="🔄 Пройти еще раз", callback_data=f"quiz:{module_id}"),
+                InlineKeyboardButton(text="📚 Другой модуль", callback_data="menu:quiz")
             ],
             [
-                InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_menu")
+                InlineKeyboardButton(text="🏠 Главное меню", callback_data="menu:back")
             ]
-        ])
+        ]))
         
         await message.answer(result_message, reply_markup=keyboard, parse_mode="Markdown")
         await state.clear() 
\ No newline at end of file
@@ -1,9 +1,13 @@
+from datetime import datetime
 from aiogram import types
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from states.user_states import UserStates
-from data.messages import REMINDER_SETUP_MESSAGE, REMINDER_CONFIRMED_MESSAGE, REMINDER_CANCELLED_MESSAGE
+from data.messages import (REMINDER_SETUP_MESSAGE, REMINDER_CONFIRMED_MESSAGE, REMINDER_CANCELLED_MESSAGE,
+                           REMINDER_SCHEDULE_MESSAGE, REMINDER_TIME_MESSAGE, REMINDER_TIMEZONE_MESSAGE)
 from utils.database import Database
+from utils.keyboards import KEYBOARDS
+from utils.reminder_schedule import SCHEDULES, TIMEZONES, REMINDER_TIMES, next_reminder_at, get_zone
 
 class RemindersHandler:
     def __init__(self, database: Database):
@@ -13,28 +17,50 @@ class RemindersHandler:
         """Показ меню настроек напоминаний"""
         await state.set_state(UserStates.REMINDER_SETUP)
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📅 Раз в день", callback_data="reminder_daily")],
-            [InlineKeyboardButton(text="📅 Раз в 2 дня", callback_data="reminder_2days")],
-            [InlineKeyboardButton(text="📅 По понедельникам и четвергам", callback_data="reminder_mon_thu")],
-            [InlineKeyboardButton(text="📅 Только по выходным", callback_data="reminder_weekends")],
-            [InlineKeyboardButton(text="❌ Отменить все напоминания", callback_data="reminder_cancel")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")]
-        ])
+        keyboard = KEYBOARDS.get('reminder_menu', lambda: InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="📅 Раз в день", callback_data="rem:daily")],
+            [InlineKeyboardButton(text="📅 Раз в 2 дня", callback_data="rem:2days")],
+            [InlineKeyboardButton(text="📅 По понедельникам и четвергам", callback_data="rem:mon_thu")],
+            [InlineKeyboardButton(text="📅 Только по выходным", callback_data="rem:weekends")],
+            [InlineKeyboardButton(text="❌ Отменить все напоминания", callback_data="rem:cancel")],
+            [InlineKeyboardButton(text="🔙 Назад", callback_data="menu:back")]
+        ]))
         
         await message.answer(REMINDER_SETUP_MESSAGE, reply_markup=keyboard)
     
-    async def handle_reminder_callback(self, callback: types.CallbackQuery, state: FSMContext):
+    async def handle_reminder_callback(self, callback: types.CallbackQuery, state: FSMContext, payload: str):
         """Обработка callback кнопок напоминаний"""
-        action = callback.data
+        action = payload
         
-        if action == "back_to_menu":
-            await state.clear()
-            await callback.message.delete()
+        if action == "time":
+            keyboard = KEYBOARDS.get('reminder_times', lambda: self._options_keyboard(
+                [(t, f"rem:at_{t}") for t in REMINDER_TIMES], columns=4
+            ))
+            await callback.message.edit_text(REMINDER_TIME_MESSAGE, reply_markup=keyboard)
             await callback.answer()
-            return "back_to_menu"
+            return
         
-        elif action == "reminder_cancel":
+        elif action == "tz":
+            keyboard = KEYBOARDS.get('reminder_zones', lambda: self._options_keyboard(
+                [(name, f"rem:zone_{zone}") for zone, name in TIMEZONES.items()], columns=2
+            ))
+            await callback.message.edit_text(REMINDER_TIMEZONE_MESSAGE, reply_markup=keyboard)
+            await callback.answer()
+            return
+        
+        elif action.startswith("at_"):
+            reminder_time = action[len("at_"):]
+            if reminder_time in REMINDER_TIMES:
+                await self.database.set_reminder_time(callback.from_user.id, reminder_time)
+            await self._show_schedule(callback, REMINDER_CONFIRMED_MESSAGE)
+        
+        elif action.startswith("zone_"):
+            zone = action[len("zone_"):]
+            if zone in TIMEZONES:
+                await self.database.set_timezone(callback.from_user.id, zone)
+            await self._show_schedule(callback, REMINDER_CONFIRMED_MESSAGE)
+        
+        elif action == "cancel":
             # Отключаем напоминания
             await self.database.set_reminder(
                 user_id=callback.from_user.id,
@@ -46,14 +72,7 @@ class RemindersHandler:
         
         else:
             # Устанавливаем напоминания
-            frequency_map = {
-                "reminder_daily": "daily",
-                "reminder_2days": "2days", 
-                "reminder_mon_thu": "mon_thu",
-                "reminder_weekends": "weekends"
-            }
-            
-            frequency = frequency_map.get(action, "daily")
+            frequency = action if action in ("daily", "2days", "mon_thu", "weekends") else "daily"
             
             await self.database.set_reminder(
                 user_id=callback.from_user.id,
@@ -61,7 +80,47 @@ class RemindersHandler:
                 enabled=True
             )
             
-            await callback.message.edit_text(REMINDER_CONFIRMED_MESSAGE)
+            await self._show_schedule(callback, REMINDER_CONFIRMED_MESSAGE)
+        
+        await state.clear()
+    
+    async def _show_schedule(self, callback: types.CallbackQuery, text: str):
+        """Пересчёт следующего напоминания и показ расписания с кнопками настройки"""
+        settings = await self.database.get_reminder_settings(callback.from_user.id)
+        if settings is None or not settings['enabled']:
+            await callback.message.edit_text(REMINDER_SETUP_MESSAGE)
             await callback.answer()
+            return
+        
+        next_at = next_reminder_at(settings['user_id'], settings['reminder_frequency'], settings['timezone'],
+                                   settings['reminder_time'], datetime.utcnow())
+        await self.database.schedule_reminders([(settings['user_id'], next_at)])
         
-        await state.clear() 
\ No newline at end of file
+        schedule = SCHEDULES.get(settings['reminder_frequency'])
+        if settings['reminder_time']:
+            reminder_time = settings['reminder_time']
+        elif schedule is not None:
+            reminder_time = f"около {schedule.default_time:%H:%M}"
+        else:
+            reminder_time = "по умолчанию"
+        zone = get_zone(settings['timezone']).key
+        
+        keyboard = KEYBOARDS.get('reminder_schedule', lambda: InlineKeyboardMarkup(inline_keyboard=[
+            [
+                InlineKeyboardButton(text="🕘 Время", callback_data="rem:time"),
+                InlineKeyboardButton(text="🌍 Часовой пояс", callback_data="rem:tz")
+            ],
+            [InlineKeyboardButton(text="🔙 Назад", callback_data="menu:back")]
+        ]))
+        await callback.message.edit_text(
+            text + REMINDER_SCHEDULE_MESSAGE.format(time=reminder_time, zone=TIMEZONES.get(zone, zone)),
+            reply_markup=keyboard
+        )
+        await callback.answer()
+    
+    @staticmethod
+    def _options_keyboard(options, columns: int) -> InlineKeyboardMarkup:
+        """Кнопки выбора по ``columns`` в ряд"""
+        buttons = [InlineKeyboardButton(text=text, callback_data=data) for text, data in options]
+        rows = [buttons[i:i + columns] for i in range(0, len(buttons), columns)]
+        return InlineKeyboardMarkup(inline_keyboard=rows) 
\ No newline at end of file
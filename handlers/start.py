@@ -4,6 +4,7 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from states.user_states import UserStates
 from data.messages import WELCOME_MESSAGE, HELP_MESSAGE
 from utils.database import Database
+from utils.keyboards import KEYBOARDS
 
 class StartHandler:
     def __init__(self, database: Database):
@@ -27,25 +28,30 @@ class StartHandler:
     
     async def show_main_menu(self, message: types.Message):
         """Показ главного меню"""
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        keyboard = KEYBOARDS.get('main_menu', self._main_menu_keyboard)
+        
+        await message.answer(WELCOME_MESSAGE, reply_markup=keyboard)
+    
+    @staticmethod
+    def _main_menu_keyboard() -> InlineKeyboardMarkup:
+        return InlineKeyboardMarkup(inline_keyboard=[
             [
-                InlineKeyboardButton(text="📚 Тест-квиз", callback_data="quiz"),
-                InlineKeyboardButton(text="👁 Тест на внимание", callback_data="attention")
+                InlineKeyboardButton(text="📚 Тест-квиз", callback_data="menu:quiz"),
+                InlineKeyboardButton(text="👁 Тест на внимание", callback_data="menu:attention")
             ],
             [
-                InlineKeyboardButton(text="⚡ Тест на скорость", callback_data="speed"),
-                InlineKeyboardButton(text="🧠 Разминка мозга", callback_data="brain_games")
+                InlineKeyboardButton(text="⚡ Тест на скорость", callback_data="menu:speed"),
+                InlineKeyboardButton(text="🧠 Разминка мозга", callback_data="menu:brain_games")
             ],
             [
-                InlineKeyboardButton(text="🤖 ИИ помощник", callback_data="ai_assistant"),
-                InlineKeyboardButton(text="⏰ Напоминания", callback_data="reminders")
+                InlineKeyboardButton(text="🤖 ИИ помощник", callback_data="menu:ai_assistant"),
+                InlineKeyboardButton(text="⏰ Напоминания", callback_data="menu:reminders")
             ],
             [
-                InlineKeyboardButton(text="❓ Помощь", callback_data="help")
+                InlineKeyboardButton(text="🏆 Рейтинг", callback_data="menu:leaderboard"),
+                InlineKeyboardButton(text="❓ Помощь", callback_data="menu:help")
             ]
         ])
-        
-        await message.answer(WELCOME_MESSAGE, reply_markup=keyboard)
     
     async def help_command(self, message: types.Message, state: FSMContext):
         """Обработка команды /help"""
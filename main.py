@@ -1,13 +1,18 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher, types
-from aiogram.fsm.storage.memory import MemoryStorage
+import signal
+from contextlib import suppress
+from aiogram import Bot, Dispatcher, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.filters import Command
+from aiogram.filters import Command, StateFilter
 
-from config import BOT_TOKEN
+from config import (BOT_TOKEN, DATABASE_URL, FSM_STORAGE, FSM_STATE_TTL, BOT_MODE, WEBHOOK_URL, WEBHOOK_PATH,
+                    WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE,
+                    WEBHOOK_DRAIN_TIMEOUT, ADAPTIVE_FLUSH_INTERVAL, ANSWER_EVENTS_BUFFER,
+                    ANSWER_EVENTS_BATCH, ANSWER_EVENTS_FLUSH_INTERVAL, LEADERBOARD_FLUSH_INTERVAL,
+                    LEADERBOARD_TOP_SIZE)
 from handlers.start import StartHandler
 from handlers.quiz import QuizHandler
 from handlers.attention import AttentionHandler
@@ -15,8 +20,18 @@ from handlers.speed import SpeedHandler
 from handlers.brain_games import BrainGamesHandler
 from handlers.ai_assistant import AIAssistantHandler
 from handlers.reminders import RemindersHandler
+from handlers.fallback import FallbackHandler
+from handlers.leaderboard import LeaderboardHandler
+from states.user_states import UserStates
+from utils.adaptive import AdaptiveEngine
+from utils.telemetry import AnswerRecorder
+from utils.leaderboard import Leaderboards
 from utils.database import Database
+from utils.fsm_storage import create_fsm_storage
+from utils.keyboards import CachedMarkupSession
+from utils.callback_router import CallbackRouter
 from utils.scheduler import Scheduler
+from utils.webhook import WebhookServer
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -24,19 +39,30 @@ logger = logging.getLogger(__name__)
 
 class BotApp:
     def __init__(self):
-        self.bot = Bot(token=BOT_TOKEN)
-        self.dp = Dispatcher(storage=MemoryStorage())
-        self.database = Database()
+        # Готовые клавиатуры из реестра уходят в Telegram уже сериализованными
+        self.bot = Bot(token=BOT_TOKEN, session=CachedMarkupSession())
+        self.database = Database(DATABASE_URL)
+        self.dp = Dispatcher(storage=create_fsm_storage(FSM_STORAGE, self.database, FSM_STATE_TTL))
         self.scheduler = Scheduler(self.bot, self.database)
+        self.adaptive = AdaptiveEngine(self.database, flush_interval=ADAPTIVE_FLUSH_INTERVAL)
+        self.answer_recorder = AnswerRecorder(self.database, capacity=ANSWER_EVENTS_BUFFER,
+                                              batch_size=ANSWER_EVENTS_BATCH,
+                                              flush_interval=ANSWER_EVENTS_FLUSH_INTERVAL)
+        # Место в рейтинге обновляется с каждым сохранённым результатом теста
+        self.leaderboards = Leaderboards(self.database, flush_interval=LEADERBOARD_FLUSH_INTERVAL,
+                                         top_size=LEADERBOARD_TOP_SIZE)
+        self.database.result_listeners.append(self.leaderboards.on_result)
         
         # Инициализация обработчиков
         self.start_handler = StartHandler(self.database)
-        self.quiz_handler = QuizHandler(self.database)
-        self.attention_handler = AttentionHandler(self.database)
-        self.speed_handler = SpeedHandler(self.database)
-        self.brain_games_handler = BrainGamesHandler(self.database)
+        self.quiz_handler = QuizHandler(self.database, self.adaptive, self.answer_recorder)
+        self.attention_handler = AttentionHandler(self.database, self.adaptive, self.answer_recorder)
+        self.speed_handler = SpeedHandler(self.database, self.adaptive, self.answer_recorder)
+        self.brain_games_handler = BrainGamesHandler(self.database, self.adaptive)
         self.ai_assistant_handler = AIAssistantHandler(self.database)
         self.reminders_handler = RemindersHandler(self.database)
+        self.fallback_handler = FallbackHandler(self.database)
+        self.leaderboard_handler = LeaderboardHandler(self.database, self.leaderboards)
         
         self.setup_handlers()
     
@@ -47,39 +73,53 @@ class BotApp:
         self.dp.message.register(self.start_handler.help_command, Command("help"))
         self.dp.message.register(self.start_handler.menu_command, Command("menu"))
         
-        # Обработка callback'ов главного меню
-        self.dp.callback_query.register(self.handle_main_menu_callback, lambda c: c.data in [
-            "quiz", "attention", "speed", "brain_games", "ai_assistant", "reminders", "help", "back_to_menu"
-        ])
+        # Все кнопки — через один обработчик с таблицей префиксов
+        self.callback_router = self.build_callback_router()
+        self.dp.callback_query.register(self.callback_router.dispatch)
         
-        # Обработка callback'ов квиза
-        self.dp.callback_query.register(self.quiz_handler.start_quiz, lambda c: c.data.startswith("quiz_module_"))
-        self.dp.callback_query.register(self.quiz_handler.handle_answer, lambda c: c.data.startswith("quiz_answer_"))
+        # Вопросы к ИИ — только в чате с ИИ помощником
+        self.dp.message.register(
+            self.ai_assistant_handler.handle_ai_question,
+            StateFilter(UserStates.AI_CHAT, UserStates.AI_FEEDBACK),
+            F.text
+        )
         
-        # Обработка callback'ов теста на внимание
-        self.dp.callback_query.register(self.attention_handler.handle_answer, lambda c: c.data.startswith("attention_answer_"))
-        
-        # Обработка callback'ов теста на скорость
-        self.dp.callback_query.register(self.speed_handler.handle_answer, lambda c: c.data.startswith("speed_answer_"))
-        
-        # Обработка callback'ов игр для мозга
-        self.dp.callback_query.register(self.brain_games_handler.start_brain_game, lambda c: c.data.startswith("brain_game_"))
-        self.dp.callback_query.register(self.brain_games_handler.handle_game_answer, lambda c: c.data.startswith("brain_answer_"))
-        
-        # Обработка callback'ов ИИ помощника
-        self.dp.callback_query.register(self.ai_assistant_handler.handle_ai_feedback, lambda c: c.data.startswith("ai_"))
-        
-        # Обработка callback'ов напоминаний
-        self.dp.callback_query.register(self.reminders_handler.handle_reminder_callback, lambda c: c.data.startswith("reminder_"))
-        
-        # Обработка текстовых сообщений (для ИИ помощника)
-        self.dp.message.register(self.ai_assistant_handler.handle_ai_question)
+        # Остальные сообщения разбираются локально, без запросов к модели
+        self.dp.message.register(self.fallback_handler.handle_message)
     
-    async def handle_main_menu_callback(self, callback: types.CallbackQuery, state: FSMContext):
+    def build_callback_router(self) -> CallbackRouter:
+        """Таблица ``префикс -> обработчик`` для callback_data вида ``префикс:данные``"""
+        router = CallbackRouter()
+        router.route("menu", self.handle_main_menu_callback)
+        router.route("quiz", self.quiz_handler.start_quiz)
+        router.route("quiz_ans", self.quiz_handler.handle_answer)
+        router.route("attn_ans", self.attention_handler.handle_answer)
+        router.route("speed_ans", self.speed_handler.handle_answer)
+        router.route("game", self.brain_games_handler.start_brain_game)
+        router.route("game_ans", self.brain_games_handler.handle_game_answer)
+        router.route("ai", self.ai_assistant_handler.handle_ai_feedback)
+        router.route("rem", self.reminders_handler.handle_reminder_callback)
+        router.route("lb", self.leaderboard_handler.show_top)
+        
+        # Кнопки старого формата в уже отправленных сообщениях
+        for action in ("quiz", "attention", "speed", "brain_games", "ai_assistant", "reminders", "help"):
+            router.legacy(action, "menu", action)
+        router.legacy("back_to_menu", "menu", "back")
+        router.legacy("quiz_module_", "quiz")
+        router.legacy("quiz_answer_", "quiz_ans")
+        router.legacy("attention_answer_", "attn_ans")
+        router.legacy("speed_answer_", "speed_ans")
+        router.legacy("brain_game_", "game")
+        router.legacy("brain_answer_", "game_ans")
+        router.legacy("ai_", "ai")
+        router.legacy("reminder_", "rem")
+        return router
+    
+    async def handle_main_menu_callback(self, callback: types.CallbackQuery, state: FSMContext, payload: str):
         """Обработка callback'ов главного меню"""
-        action = callback.data
+        action = payload
         
-        if action == "back_to_menu":
+        if action == "back":
             await state.clear()
             await self.start_handler.show_main_menu(callback.message)
             await callback.answer()
@@ -98,6 +138,8 @@ class BotApp:
             await self.ai_assistant_handler.start_ai_chat(callback.message, state)
         elif action == "reminders":
             await self.reminders_handler.show_reminder_menu(callback.message, state)
+        elif action == "leaderboard":
+            await self.leaderboard_handler.show_leaderboard(callback.message, callback.from_user.id)
         elif action == "help":
             await self.start_handler.help_command(callback.message, state)
         
@@ -109,16 +151,55 @@ class BotApp:
         
         # Инициализация базы данных
         await self.database.init_db()
+        await self.adaptive.load()
+        await self.leaderboards.load()
+        await self.ai_assistant_handler.warm_cache()
         
         # Запуск планировщика напоминаний
         await self.scheduler.start()
         
         try:
-            await self.dp.start_polling(self.bot)
+            if BOT_MODE == 'webhook':
+                await self.run_webhook()
+            else:
+                # Оставшийся от webhook-режима адрес мешает getUpdates
+                await self.bot.delete_webhook()
+                await self.dp.start_polling(self.bot)
         finally:
             await self.scheduler.stop()
+            await self.ai_assistant_handler.ai_client.close()
+            await self.adaptive.close()
+            await self.answer_recorder.close()
+            await self.leaderboards.close()
+            await self.database.close()
             await self.bot.session.close()
 
+    async def run_webhook(self):
+        """Приём обновлений через webhook до SIGINT/SIGTERM"""
+        server = WebhookServer(
+            self.bot, self.dp,
+            path=WEBHOOK_PATH,
+            secret=WEBHOOK_SECRET,
+            workers=WEBHOOK_WORKERS,
+            queue_size=WEBHOOK_QUEUE_SIZE,
+            drain_timeout=WEBHOOK_DRAIN_TIMEOUT
+        )
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # На Windows обработчики сигналов не поддерживаются
+            with suppress(NotImplementedError):
+                loop.add_signal_handler(sig, stop.set)
+        
+        await self.dp.emit_startup(bot=self.bot)
+        await server.start(WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_URL)
+        try:
+            await stop.wait()
+        finally:
+            logger.info("Остановка webhook: дорабатываем принятые обновления...")
+            await server.stop()
+            await self.dp.emit_shutdown(bot=self.bot)
+
 if __name__ == "__main__":
     app = BotApp()
     asyncio.run(app.start()) 
\ No newline at end of file
@@ -0,0 +1,267 @@
+import asyncio
+import itertools
+import logging
+import math
+import random
+from collections import OrderedDict
+from typing import Collection, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+INITIAL_RATING = 1000.0
+MIN_RATING = 0.0
+MAX_RATING = 3000.0
+
+# Вопрос подбирается так, чтобы пользователь отвечал верно примерно в 70% случаев:
+# по формуле Эло это вопрос на ~147 пунктов легче его рейтинга
+TARGET_SUCCESS = 0.7
+TARGET_OFFSET = 400 * math.log10(TARGET_SUCCESS / (1 - TARGET_SUCCESS))
+
+
+def expected_score(user_rating: float, item_rating: float) -> float:
+    """Вероятность верного ответа по формуле Эло"""
+    return 1 / (1 + 10 ** ((item_rating - user_rating) / 400))
+
+
+def _k_factor(answers: int, k_max: float, k_min: float) -> float:
+    """Шаг обновления: большой, пока ответов мало, затем уменьшается"""
+    return max(k_min, k_max / math.sqrt(1 + answers / 10))
+
+
+def _clamp(rating: float) -> float:
+    return min(MAX_RATING, max(MIN_RATING, rating))
+
+
+class DifficultyIndex:
+    """Вопросы одной темы в корзинах по рейтингу сложности.
+
+    Корзин не больше (MAX_RATING - MIN_RATING) / bucket_width, поэтому
+    перенос вопроса после ответа — O(1) (удаление перестановкой с последним),
+    а выбор — обход соседних корзин от целевой, не зависящий от числа вопросов.
+    """
+
+    def __init__(self, bucket_width: float = 50):
+        self.bucket_width = bucket_width
+        self._buckets: Dict[int, List[int]] = {}
+        self._positions: Dict[int, Tuple[int, int]] = {}
+        self._last_bucket = self._bucket(MAX_RATING)
+
+    def _bucket(self, rating: float) -> int:
+        return int(_clamp(rating) // self.bucket_width)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._positions
+
+    def add(self, item_id: int, rating: float):
+        bucket = self._bucket(rating)
+        items = self._buckets.setdefault(bucket, [])
+        self._positions[item_id] = (bucket, len(items))
+        items.append(item_id)
+
+    def remove(self, item_id: int):
+        bucket, index = self._positions.pop(item_id)
+        items = self._buckets[bucket]
+        last = items.pop()
+        if last != item_id:
+            items[index] = last
+            self._positions[last] = (bucket, index)
+        if not items:
+            del self._buckets[bucket]
+
+    def move(self, item_id: int, rating: float):
+        """Обновление рейтинга вопроса: перенос, только если сменилась корзина"""
+        if self._positions[item_id][0] != self._bucket(rating):
+            self.remove(item_id)
+            self.add(item_id, rating)
+
+    def pick(self, rating: float, exclude: Collection[int] = ()) -> Optional[int]:
+        """Случайный вопрос из ближайшей к ``rating`` корзины, кроме ``exclude``"""
+        target = self._bucket(rating)
+        for distance in range(self._last_bucket + 1):
+            for bucket in ((target,) if distance == 0 else (target - distance, target + distance)):
+                items = self._buckets.get(bucket)
+                if not items:
+                    continue
+                # Исключённых мало (вопросы текущего теста): обычно хватает пары попыток
+                for _ in range(4):
+                    item_id = random.choice(items)
+                    if item_id not in exclude:
+                        return item_id
+                candidates = [item_id for item_id in items if item_id not in exclude]
+                if candidates:
+                    return random.choice(candidates)
+        return None
+
+
+class AdaptiveEngine:
+    """Подбор вопросов по уровню пользователя (рейтинги Эло).
+
+    У пользователя — рейтинг навыка по каждой теме (модуль квиза, внимание,
+    скорость), у вопроса — рейтинг сложности. После каждого ответа оба
+    обновляются за O(1), следующий вопрос выбирается из индекса по корзинам
+    сложности. Рейтинг навыка читается из базы один раз в начале теста,
+    изменения пишутся отложенно пачками раз в ``flush_interval`` секунд —
+    обработчик ответа базу не ждёт.
+    """
+
+    def __init__(self, database: Database, flush_interval: float = 5.0,
+                 max_cached_skills: int = 100_000, bucket_width: float = 50):
+        self.database = database
+        self.flush_interval = flush_interval
+        self.max_cached_skills = max_cached_skills
+        self.bucket_width = bucket_width
+        self._indexes: Dict[str, DifficultyIndex] = {}
+        # item_id -> [рейтинг, ответов]; (user_id, topic) -> [рейтинг, ответов]
+        self._items: Dict[int, list] = {}
+        self._item_topics: Dict[int, str] = {}
+        self._skills: 'OrderedDict[Tuple[int, str], list]' = OrderedDict()
+        self._dirty_items: Set[int] = set()
+        self._dirty_skills: Set[Tuple[int, str]] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def register(self, topic: str, items: Iterable[Tuple[int, Optional[float]]]):
+        """Вопросы темы: (id, начальная сложность или None)"""
+        index = self._indexes.setdefault(topic, DifficultyIndex(self.bucket_width))
+        for item_id, difficulty in items:
+            rating = INITIAL_RATING if difficulty is None else float(difficulty)
+            self._items[item_id] = [rating, 0]
+            self._item_topics[item_id] = topic
+            index.add(item_id, rating)
+
+    async def load(self):
+        """Рейтинги сложности, накопленные в базе"""
+        loaded = 0
+        for item_id, rating, answers in await self.database.get_item_ratings():
+            item = self._items.get(item_id)
+            if item is None:
+                continue
+            item[0], item[1] = rating, answers
+            self._indexes[self._item_topics[item_id]].move(item_id, rating)
+            loaded += 1
+        logger.info(f"Загружены рейтинги сложности: {loaded} вопросов")
+
+    async def prepare(self, user_id: int, topic: str) -> float:
+        """Рейтинг навыка пользователя в памяти перед началом теста"""
+        key = (user_id, topic)
+        skill = self._skills.get(key)
+        if skill is None:
+            try:
+                row = await self.database.get_skill_rating(user_id, topic)
+            except Exception as e:
+                logger.error(f"Ошибка чтения рейтинга навыка: {e}")
+                row = None
+            # Пока читали, рейтинг мог появиться: например, ответ на вопрос прошлого теста
+            skill = self._skills.get(key)
+            if skill is None:
+                skill = self._skills[key] = [row[0], row[1]] if row else [INITIAL_RATING, 0]
+                self._evict()
+        self._skills.move_to_end(key)
+        return skill[0]
+
+    def _evict(self):
+        """Вытеснение давно не использованных рейтингов, уже записанных в базу"""
+        excess = len(self._skills) - self.max_cached_skills
+        if excess <= 0:
+            return
+        stale = [key for key in itertools.islice(self._skills, excess) if key not in self._dirty_skills]
+        for key in stale:
+            del self._skills[key]
+
+    def _skill(self, user_id: int, topic: str) -> list:
+        key = (user_id, topic)
+        skill = self._skills.get(key)
+        if skill is None:
+            # Тест начат до перезапуска: рейтинг из базы не прочитан, начинаем с начального
+            skill = self._skills[key] = [INITIAL_RATING, 0]
+        else:
+            self._skills.move_to_end(key)
+        return skill
+
+    def rating(self, user_id: int, topic: str) -> float:
+        return self._skill(user_id, topic)[0]
+
+    def next_item(self, user_id: int, topic: str, exclude: Collection[int] = ()) -> Optional[int]:
+        """Вопрос темы под уровень пользователя, кроме уже заданных"""
+        index = self._indexes.get(topic)
+        if index is None:
+            return None
+        return index.pick(self._skill(user_id, topic)[0] - TARGET_OFFSET, exclude)
+
+    async def next_question(self, user_id: int, topic: str, exclude: Collection[int] = ()) -> Optional[int]:
+        """То же, что ``next_item``, но с чтением рейтинга из базы, если его ещё нет в памяти"""
+        await self.prepare(user_id, topic)
+        return self.next_item(user_id, topic, exclude)
+
+    def record(self, user_id: int, topic: str, correct: bool, item_id: Optional[int] = None,
+               item_rating: Optional[float] = None) -> float:
+        """Обновление рейтингов после ответа; возвращает новый рейтинг пользователя.
+
+        Вопросы из индекса передаются по ``item_id`` — их сложность тоже
+        уточняется; для задач с постоянной сложностью (банк последовательностей)
+        передаётся ``item_rating``.
+        """
+        skill = self._skill(user_id, topic)
+        item = self._items.get(item_id) if item_id is not None else None
+        if item is not None:
+            item_rating = item[0]
+        elif item_rating is None:
+            item_rating = INITIAL_RATING
+
+        surprise = (1.0 if correct else 0.0) - expected_score(skill[0], item_rating)
+        skill[0] = _clamp(skill[0] + _k_factor(skill[1], 64, 16) * surprise)
+        skill[1] += 1
+        self._dirty_skills.add((user_id, topic))
+
+        if item is not None:
+            item[0] = _clamp(item[0] - _k_factor(item[1], 32, 4) * surprise)
+            item[1] += 1
+            self._indexes[self._item_topics[item_id]].move(item_id, item[0])
+            self._dirty_items.add(item_id)
+
+        self._start_flush_task()
+        return skill[0]
+
+    def _start_flush_task(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def flush(self):
+        """Запись изменившихся рейтингов в базу"""
+        if not self._dirty_skills and not self._dirty_items:
+            return
+        dirty_skills, self._dirty_skills = self._dirty_skills, set()
+        dirty_items, self._dirty_items = self._dirty_items, set()
+        skills = [(user_id, topic, *self._skills[(user_id, topic)]) for user_id, topic in dirty_skills]
+        items = [(item_id, *self._items[item_id]) for item_id in dirty_items]
+        try:
+            if skills:
+                await self.database.save_skill_ratings(skills)
+            if items:
+                await self.database.save_item_ratings(items)
+        except BaseException as e:
+            # Запишем со следующей пачкой; вытесненный за это время рейтинг возвращаем.
+            # Отмену из close() тоже ловим: иначе взятые рейтинги пропадут при остановке
+            for user_id, topic, rating, answers in skills:
+                self._skills.setdefault((user_id, topic), [rating, answers])
+            self._dirty_skills |= dirty_skills
+            self._dirty_items |= dirty_items
+            if not isinstance(e, Exception):
+                raise
+            logger.error(f"Ошибка записи рейтингов: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
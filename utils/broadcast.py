@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List
+
+from aiogram.exceptions import (TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError,
+                                TelegramRetryAfter, TelegramServerError)
+from utils.database import Database
+from utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SENT = 'sent'
+FAILED = 'failed'
+BLOCKED = 'blocked'
+
+
+class BroadcastEngine:
+    """Рассылка напоминаний с учётом лимитов Telegram.
+
+    Пачка получателей отправляется параллельно: не больше ``rate``
+    сообщений в секунду на весь бот и не чаще раза в ``per_chat_interval``
+    секунд в один чат. ``RetryAfter`` приостанавливает все отправки,
+    заблокировавшим бота напоминания отключаются. Пачки по ``page_size``
+    набирает диспетчер напоминаний планировщика.
+    """
+
+    def __init__(self, bot, database: Database, rate: float = 30, concurrency: int = 20,
+                 page_size: int = 500, per_chat_interval: float = 1.0, max_attempts: int = 3):
+        self.bot = bot
+        self.database = database
+        # Без запаса: иначе в одну секунду может уйти до 2 * rate сообщений
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.page_size = page_size
+        self.per_chat_interval = per_chat_interval
+        self.max_attempts = max_attempts
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._paused_until = 0.0
+        self._chat_next: Dict[int, float] = {}
+        self.retry_after_hits = 0
+
+    async def send_batch(self, user_ids: List[int], text_factory: Callable[[int], str],
+                         reply_markup: Any = None) -> List[str]:
+        """Параллельная отправка пачке получателей; результат для каждого — SENT, FAILED или BLOCKED"""
+        outcomes = await asyncio.gather(*(
+            self._deliver(user_id, text_factory(user_id), reply_markup) for user_id in user_ids
+        ))
+
+        blocked = [user_id for user_id, outcome in zip(user_ids, outcomes) if outcome == BLOCKED]
+        if blocked:
+            await self.database.disable_reminders(blocked)
+        self._forget_idle_chats()
+        return list(outcomes)
+
+    async def _wait_turn(self, chat_id: int):
+        """Ожидание глобального лимита, паузы после RetryAfter и лимита чата"""
+        await self.bucket.acquire()
+        while True:
+            ready_at = max(self._paused_until, self._chat_next.get(chat_id, 0.0))
+            delay = ready_at - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        self._chat_next[chat_id] = time.monotonic() + self.per_chat_interval
+
+    def _forget_idle_chats(self):
+        now = time.monotonic()
+        self._chat_next = {chat_id: ready_at for chat_id, ready_at in self._chat_next.items() if ready_at > now}
+
+    async def _deliver(self, chat_id: int, text: str, reply_markup: Any) -> str:
+        """Отправка одному получателю с повторами; результат — SENT, FAILED или BLOCKED"""
+        async with self._semaphore:
+            for attempt in range(self.max_attempts):
+                await self._wait_turn(chat_id)
+                try:
+                    await self.bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
+                    return SENT
+                except TelegramRetryAfter as e:
+                    # Флуд-контроль действует на весь бот: приостанавливаем все отправки
+                    self.retry_after_hits += 1
+                    self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                except TelegramForbiddenError:
+                    return BLOCKED
+                except TelegramBadRequest as e:
+                    if 'chat not found' in str(e).lower():
+                        return BLOCKED
+                    logger.warning(f"Напоминание пользователю {chat_id} не отправлено: {e}")
+                    return FAILED
+                except (TelegramNetworkError, TelegramServerError) as e:
+                    logger.warning(f"Сбой отправки пользователю {chat_id}, попытка {attempt + 1}: {e}")
+                    await asyncio.sleep(2 ** attempt)
+                except Exception as e:
+                    logger.error(f"Ошибка отправки напоминания пользователю {chat_id}: {e}")
+                    return FAILED
+            return FAILED
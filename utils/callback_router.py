@@ -0,0 +1,73 @@
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import types
+from aiogram.fsm.context import FSMContext
+
+logger = logging.getLogger(__name__)
+
+# Обработчик callback'а: (callback, state, payload)
+CallbackHandler = Callable[[types.CallbackQuery, FSMContext, str], Awaitable[object]]
+
+SEPARATOR = ':'
+
+
+class CallbackRouter:
+    """Маршрутизация нажатий кнопок по префиксу ``callback_data``.
+
+    Данные вида ``префикс:данные`` разбираются один раз, обработчик ищется
+    в словаре — вместо последовательной проверки фильтров всех обработчиков.
+    Для кнопок в уже отправленных сообщениях старого формата (``quiz_answer_2``)
+    есть таблица соответствий: точные значения и старые префиксы.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, CallbackHandler] = {}
+        self._legacy_exact: Dict[str, Tuple[str, str]] = {}
+        self._legacy_prefixes: List[Tuple[str, str]] = []
+        self.unmatched = 0
+
+    def route(self, prefix: str, handler: CallbackHandler):
+        if SEPARATOR in prefix:
+            raise ValueError(f"Префикс не может содержать '{SEPARATOR}': {prefix}")
+        self._routes[prefix] = handler
+
+    def legacy(self, old: str, prefix: str, payload: Optional[str] = None):
+        """Старый формат: с ``payload`` — точное значение ``old``, без — префикс ``old`` с данными после него"""
+        if payload is not None:
+            self._legacy_exact[old] = (prefix, payload)
+        else:
+            # Длинные префиксы первыми: 'ai_assistant' не должен уйти в 'ai_'
+            self._legacy_prefixes.append((old, prefix))
+            self._legacy_prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+
+    def resolve(self, data: Optional[str]) -> Optional[Tuple[CallbackHandler, str]]:
+        """Обработчик и данные для ``callback_data``; None — кнопка неизвестна"""
+        if not data:
+            return None
+        prefix, separator, payload = data.partition(SEPARATOR)
+        if separator:
+            handler = self._routes.get(prefix)
+            if handler is not None:
+                return handler, payload
+
+        legacy = self._legacy_exact.get(data)
+        if legacy is None:
+            for old, new_prefix in self._legacy_prefixes:
+                if data.startswith(old):
+                    legacy = (new_prefix, data[len(old):])
+                    break
+        if legacy is not None and legacy[0] in self._routes:
+            return self._routes[legacy[0]], legacy[1]
+        return None
+
+    async def dispatch(self, callback: types.CallbackQuery, state: FSMContext):
+        """Единственный обработчик callback_query в диспетчере"""
+        resolved = self.resolve(callback.data)
+        if resolved is None:
+            self.unmatched += 1
+            logger.debug(f"Неизвестная кнопка: {callback.data!r}")
+            await callback.answer()
+            return
+        handler, payload = resolved
+        await handler(callback, state, payload)
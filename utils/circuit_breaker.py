@@ -0,0 +1,47 @@
+import time
+from typing import Optional
+
+
+class CircuitBreaker:
+    """Предохранитель для внешнего сервиса.
+
+    После ``failure_threshold`` сбоев подряд цепь размыкается, и запросы
+    сразу отклоняются. Через ``reset_timeout`` секунд пропускается один
+    пробный запрос: успех замыкает цепь, сбой снова размыкает её.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос сейчас"""
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            # Пробный запрос; следующий пробный — не раньше чем через reset_timeout
+            self._opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self._opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self._opened_at is None:
+                self.opened += 1
+            self._opened_at = time.monotonic()
@@ -1,173 +1,351 @@
-import sqlite3
-import asyncio
-from typing import Optional, List, Dict, Any
+import time
+from typing import Optional, List, Dict, Any, Tuple, Callable
 from datetime import datetime
+from utils.db_backends import BaseBackend, create_backend
+from utils.migrations import apply_migrations
+
 
 class Database:
-    def __init__(self, db_path: str = "mind_bot.db"):
-        self.db_path = db_path
-    
+    def __init__(self, database_url: str = "sqlite:///mind_bot.db",
+                 backend: Optional[BaseBackend] = None):
+        self.database_url = database_url
+        self.backend = backend or create_backend(database_url)
+        # Вызываются после каждого save_test_result с теми же аргументами (рейтинги)
+        self.result_listeners: List[Callable[..., None]] = []
+
+    @property
+    def dialect(self) -> str:
+        return self.backend.dialect
+
     async def init_db(self):
         """Асинхронная инициализация базы данных"""
-        await asyncio.get_event_loop().run_in_executor(
-            None, self.init_database
-        )
-    
-    def init_database(self):
-        """Инициализация базы данных"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Таблица пользователей
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                reminder_frequency TEXT DEFAULT 'none',
-                reminder_enabled BOOLEAN DEFAULT FALSE
-            )
-        ''')
-        
-        # Таблица результатов тестов
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS test_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                test_type TEXT,
-                score INTEGER,
-                total_questions INTEGER,
-                completion_time REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-        
-        # Таблица взаимодействий с ИИ
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS ai_interactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                question TEXT,
-                answer TEXT,
-                feedback INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    async def add_user(self, user_id: int, username: str = None, 
+        await self.backend.connect()
+        await apply_migrations(self.backend)
+
+    async def close(self):
+        """Сброс очереди записи и закрытие соединений"""
+        await self.backend.close()
+
+    def _age_seconds_sql(self, column: str) -> str:
+        """SQL-выражение: сколько секунд прошло с момента в колонке TIMESTAMP"""
+        if self.dialect == 'postgres':
+            return f'EXTRACT(EPOCH FROM (LOCALTIMESTAMP - {column}))'
+        return f"(julianday('now') - julianday({column})) * 86400"
+
+    def _timestamp(self, value: Optional[datetime]):
+        """Параметр для колонки TIMESTAMP: SQLite хранит время строкой, как CURRENT_TIMESTAMP"""
+        if value is None or self.dialect == 'postgres':
+            return value
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+
+    @staticmethod
+    def _parse_timestamp(value) -> Optional[datetime]:
+        if value is None or isinstance(value, datetime):
+            return value
+        return datetime.fromisoformat(value)
+
+    async def add_user(self, user_id: int, username: str = None,
                       first_name: str = None, last_name: str = None):
         """Добавление нового пользователя"""
-        await asyncio.get_event_loop().run_in_executor(
-            None, self._add_user_sync, user_id, username, first_name, last_name
-        )
-    
-    def _add_user_sync(self, user_id: int, username: str = None, 
-                      first_name: str = None, last_name: str = None):
-        """Синхронное добавление пользователя"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR IGNORE INTO users (user_id, username, first_name, last_name)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, username, first_name, last_name))
-        
-        conn.commit()
-        conn.close()
-    
-    async def save_test_result(self, user_id: int, test_type: str, 
-                             score: int, total_questions: int, 
-                             completion_time: float = None):
-        """Сохранение результата теста"""
-        await asyncio.get_event_loop().run_in_executor(
-            None, self._save_test_result_sync, user_id, test_type, 
-            score, total_questions, completion_time
-        )
-    
-    def _save_test_result_sync(self, user_id: int, test_type: str, 
-                             score: int, total_questions: int, 
-                             completion_time: float = None):
-        """Синхронное сохранение результата теста"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO test_results (user_id, test_type, score, total_questions, completion_time)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, test_type, score, total_questions, completion_time))
-        
-        conn.commit()
-        conn.close()
-    
-    async def save_ai_interaction(self, user_id: int, question: str, 
-                                answer: str, feedback: int = None):
-        """Сохранение взаимодействия с ИИ"""
-        await asyncio.get_event_loop().run_in_executor(
-            None, self._save_ai_interaction_sync, user_id, question, answer, feedback
-        )
-    
-    def _save_ai_interaction_sync(self, user_id: int, question: str, 
-                                answer: str, feedback: int = None):
-        """Синхронное сохранение взаимодействия с ИИ"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO ai_interactions (user_id, question, answer, feedback)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, question, answer, feedback))
-        
-        conn.commit()
-        conn.close()
-    
+        if self.dialect == 'postgres':
+            sql = '''
+                INSERT INTO users (user_id, username, first_name, last_name)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id) DO NOTHING
+            '''
+        else:
+            sql = '''
+                INSERT OR IGNORE INTO users (user_id, username, first_name, last_name)
+                VALUES (?, ?, ?, ?)
+            '''
+        await self.backend.execute(sql, (user_id, username, first_name, last_name))
+
+    async def save_test_result(self, user_id: int, test_type: str,
+                             score: int, total_questions: int,
+                             completion_time: float = None,
+                             response_p50: float = None, response_p90: float = None):
+        """Сохранение результата теста; перцентили — времени ответа на вопрос, в секундах"""
+        await self.backend.execute('''
+            INSERT INTO test_results (user_id, test_type, score, total_questions, completion_time,
+                                      response_p50, response_p90)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, test_type, score, total_questions, completion_time, response_p50, response_p90))
+        for listener in self.result_listeners:
+            listener(user_id=user_id, test_type=test_type, score=score,
+                     total_questions=total_questions, completion_time=completion_time)
+
+    async def save_ai_interaction(self, user_id: int, question: str,
+                                answer: str, feedback: int = None,
+                                context_hash: str = None, source: str = 'llm'):
+        """Сохранение взаимодействия с ИИ; ``source`` — кто ответил: llm или локальный классификатор"""
+        await self.backend.execute('''
+            INSERT INTO ai_interactions (user_id, question, answer, feedback, context_hash, source)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, question, answer, feedback, context_hash, source))
+
+    async def get_cacheable_ai_answers(self, limit: int = 1000) -> List[Tuple[str, str, str, float]]:
+        """Последние ответы ИИ для прогрева кэша: (вопрос, ответ, хэш контекста, возраст в секундах).
+
+        Ответы, получившие 👎, пропускаются.
+        """
+        rows = await self.backend.fetchall(f'''
+            SELECT question, answer, context_hash, {self._age_seconds_sql('created_at')}
+            FROM ai_interactions
+            WHERE context_hash IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM ai_interactions AS disliked
+                  WHERE disliked.feedback = 0 AND disliked.answer = ai_interactions.answer
+              )
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (limit,))
+        return [(row[0], row[1], row[2], float(row[3])) for row in rows]
+
     async def set_reminder(self, user_id: int, frequency: str, enabled: bool = True):
         """Установка напоминаний для пользователя"""
-        await asyncio.get_event_loop().run_in_executor(
-            None, self._set_reminder_sync, user_id, frequency, enabled
-        )
-    
-    def _set_reminder_sync(self, user_id: int, frequency: str, enabled: bool = True):
-        """Синхронная установка напоминаний"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        await self.backend.execute('''
             UPDATE users SET reminder_frequency = ?, reminder_enabled = ?
             WHERE user_id = ?
         ''', (frequency, enabled, user_id))
-        
-        conn.commit()
-        conn.close()
-    
-    async def get_users_with_reminders(self) -> List[Dict[str, Any]]:
-        """Получение пользователей с активными напоминаниями"""
-        return await asyncio.get_event_loop().run_in_executor(
-            None, self._get_users_with_reminders_sync
-        )
-    
-    def _get_users_with_reminders_sync(self) -> List[Dict[str, Any]]:
-        """Синхронное получение пользователей с напоминаниями"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT user_id, reminder_frequency FROM users 
-            WHERE reminder_enabled = TRUE
-        ''')
-        
-        users = []
-        for row in cursor.fetchall():
-            users.append({
-                'user_id': row[0],
-                'reminder_frequency': row[1]
-            })
-        
-        conn.close()
-        return users 
\ No newline at end of file
+
+    async def set_reminder_time(self, user_id: int, reminder_time: Optional[str]):
+        """Предпочитаемое время напоминаний 'ЧЧ:ММ' (None — время по умолчанию)"""
+        await self.backend.execute('''
+            UPDATE users SET reminder_time = ? WHERE user_id = ?
+        ''', (reminder_time, user_id))
+
+    async def set_timezone(self, user_id: int, timezone: Optional[str]):
+        """Часовой пояс пользователя, например 'Asia/Novosibirsk'"""
+        await self.backend.execute('''
+            UPDATE users SET timezone = ? WHERE user_id = ?
+        ''', (timezone, user_id))
+
+    async def get_reminder_settings(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Настройки напоминаний пользователя"""
+        rows = await self.backend.fetchall('''
+            SELECT user_id, reminder_frequency, timezone, reminder_time, next_reminder_at, reminder_enabled
+            FROM users WHERE user_id = ?
+        ''', (user_id,))
+        if not rows:
+            return None
+        settings = self._reminder_row(rows[0])
+        settings['enabled'] = bool(rows[0][5])
+        return settings
+
+    async def schedule_reminders(self, schedule: List[Tuple[int, Optional[datetime]]]):
+        """Время следующего напоминания (UTC) для пар (user_id, время)"""
+        await self.backend.executemany('''
+            UPDATE users SET next_reminder_at = ? WHERE user_id = ?
+        ''', [(self._timestamp(next_at), user_id) for user_id, next_at in schedule])
+
+    async def get_due_reminders(self, now: datetime, limit: int = 500) -> List[Dict[str, Any]]:
+        """Пользователи, чьё напоминание наступило к ``now`` (UTC), в порядке очереди"""
+        rows = await self.backend.fetchall('''
+            SELECT user_id, reminder_frequency, timezone, reminder_time, next_reminder_at FROM users
+            WHERE reminder_enabled = TRUE AND next_reminder_at <= ?
+            ORDER BY next_reminder_at
+            LIMIT ?
+        ''', (self._timestamp(now), limit))
+        return [self._reminder_row(row) for row in rows]
+
+    async def get_unscheduled_reminders(self, after_user_id: int = 0,
+                                        limit: int = 500) -> List[Dict[str, Any]]:
+        """Включённые напоминания без рассчитанного времени (после миграции), страница по user_id"""
+        rows = await self.backend.fetchall('''
+            SELECT user_id, reminder_frequency, timezone, reminder_time, next_reminder_at FROM users
+            WHERE reminder_enabled = TRUE AND next_reminder_at IS NULL AND user_id > ?
+            ORDER BY user_id
+            LIMIT ?
+        ''', (after_user_id, limit))
+        return [self._reminder_row(row) for row in rows]
+
+    def _reminder_row(self, row) -> Dict[str, Any]:
+        return {
+            'user_id': row[0],
+            'reminder_frequency': row[1],
+            'timezone': row[2],
+            'reminder_time': row[3],
+            'next_reminder_at': self._parse_timestamp(row[4])
+        }
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float, now: float) -> bool:
+        """Захват или продление аренды ``name`` до ``now + ttl`` (время в секундах epoch).
+
+        Удаётся, если аренда свободна, истекла или уже принадлежит ``owner``;
+        проверка и запись — одно выражение, поэтому гонки между экземплярами нет.
+        """
+        rowcount = await self.backend.execute('''
+            INSERT INTO scheduler_leases (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE scheduler_leases.owner = excluded.owner OR scheduler_leases.expires_at < ?
+        ''', (name, owner, now + ttl, now))
+        return rowcount > 0
+
+    async def release_lease(self, name: str, owner: str):
+        """Досрочное освобождение аренды, чтобы другой экземпляр не ждал её истечения"""
+        await self.backend.execute('''
+            UPDATE scheduler_leases SET expires_at = 0 WHERE name = ? AND owner = ?
+        ''', (name, owner))
+
+    async def disable_reminders(self, user_ids: List[int]):
+        """Отключение напоминаний, например у заблокировавших бота"""
+        await self.backend.executemany('''
+            UPDATE users SET reminder_enabled = FALSE WHERE user_id = ?
+        ''', [(user_id,) for user_id in user_ids])
+
+    async def get_ai_usage_stats(self, days: int = 7) -> Dict[str, int]:
+        """Число сообщений по источнику ответа за последние ``days`` дней (без записей с оценками)"""
+        rows = await self.backend.fetchall(f'''
+            SELECT source, COUNT(*) FROM ai_interactions
+            WHERE feedback IS NULL AND {self._age_seconds_sql('created_at')} <= ?
+            GROUP BY source
+        ''', (days * 86400,))
+        return {row[0]: row[1] for row in rows}
+
+    async def get_llm_questions(self, days: int = 7, limit: int = 10000) -> List[str]:
+        """Вопросы, на которые за последние ``days`` дней отвечала модель"""
+        rows = await self.backend.fetchall(f'''
+            SELECT question FROM ai_interactions
+            WHERE source = 'llm' AND feedback IS NULL AND {self._age_seconds_sql('created_at')} <= ?
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (days * 86400, limit))
+        return [row[0] for row in rows]
+
+    async def save_answer_events(self, events: List[Tuple[int, str, int, int, bool, Optional[int], float]]):
+        """Пачка ответов на вопросы: (user_id, test_type, question_id, chosen, correct, latency_ms, created_at)"""
+        await self.backend.executemany('''
+            INSERT INTO answer_events (user_id, test_type, question_id, chosen, correct, latency_ms, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', events)
+
+    async def get_question_stats(self, days: int = 30, test_type: str = None) -> List[Dict[str, Any]]:
+        """Статистика по вопросам за последние ``days`` дней: ответы, доля верных, среднее время"""
+        sql = '''
+            SELECT question_id, test_type, COUNT(*),
+                   AVG(CASE WHEN correct THEN 1.0 ELSE 0.0 END), AVG(latency_ms)
+            FROM answer_events
+            WHERE created_at >= ?
+        '''
+        params = [time.time() - days * 86400]
+        if test_type is not None:
+            sql += ' AND test_type = ?'
+            params.append(test_type)
+        sql += ' GROUP BY question_id, test_type ORDER BY question_id'
+        rows = await self.backend.fetchall(sql, params)
+        return [
+            {
+                'question_id': row[0],
+                'test_type': row[1],
+                'answers': row[2],
+                'accuracy': row[3],
+                'avg_latency_ms': row[4]
+            }
+            for row in rows
+        ]
+
+    async def get_skill_rating(self, user_id: int, topic: str) -> Optional[Tuple[float, int]]:
+        """Рейтинг навыка пользователя по теме и число ответов, по которым он посчитан"""
+        rows = await self.backend.fetchall('''
+            SELECT rating, answers FROM skill_ratings WHERE user_id = ? AND topic = ?
+        ''', (user_id, topic))
+        return (rows[0][0], rows[0][1]) if rows else None
+
+    async def save_skill_ratings(self, ratings: List[Tuple[int, str, float, int]]):
+        """Пачка рейтингов навыков: (user_id, topic, rating, answers)"""
+        await self.backend.executemany('''
+            INSERT INTO skill_ratings (user_id, topic, rating, answers) VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id, topic) DO UPDATE SET rating = excluded.rating, answers = excluded.answers
+        ''', ratings)
+
+    async def get_item_ratings(self) -> List[Tuple[int, float, int]]:
+        """Рейтинги сложности всех вопросов: (item_id, rating, answers)"""
+        return await self.backend.fetchall('SELECT item_id, rating, answers FROM item_ratings')
+
+    async def save_item_ratings(self, ratings: List[Tuple[int, float, int]]):
+        """Пачка рейтингов сложности вопросов: (item_id, rating, answers)"""
+        await self.backend.executemany('''
+            INSERT INTO item_ratings (item_id, rating, answers) VALUES (?, ?, ?)
+            ON CONFLICT (item_id) DO UPDATE SET rating = excluded.rating, answers = excluded.answers
+        ''', ratings)
+
+    async def get_leaderboard_entries(self, since: float = 0.0) -> List[Tuple[str, int, int]]:
+        """Лучшие результаты, изменённые после ``since``: (test_type, user_id, best_key)"""
+        return await self.backend.fetchall('''
+            SELECT test_type, user_id, best_key FROM leaderboard_entries WHERE updated_at >= ?
+        ''', (since,))
+
+    async def save_leaderboard_entries(self, entries: List[Tuple[str, int, int]], updated_at: float):
+        """Пачка лучших результатов; остаётся больший ключ — его мог записать другой экземпляр"""
+        greatest = 'GREATEST' if self.dialect == 'postgres' else 'MAX'
+        await self.backend.executemany(f'''
+            INSERT INTO leaderboard_entries (test_type, user_id, best_key, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (test_type, user_id) DO UPDATE
+            SET best_key = {greatest}(leaderboard_entries.best_key, excluded.best_key),
+                updated_at = excluded.updated_at
+        ''', [(test_type, user_id, key, updated_at) for test_type, user_id, key in entries])
+
+    async def get_user_names(self, user_ids: List[int]) -> Dict[int, str]:
+        """Имена для отображения: first_name, иначе username"""
+        if not user_ids:
+            return {}
+        placeholders = ', '.join('?' * len(user_ids))
+        rows = await self.backend.fetchall(f'''
+            SELECT user_id, first_name, username FROM users WHERE user_id IN ({placeholders})
+        ''', list(user_ids))
+        return {row[0]: row[1] or row[2] for row in rows if row[1] or row[2]}
+
+    async def get_user_test_results(self, user_id: int, test_type: str = None,
+                                    limit: int = 10) -> List[Dict[str, Any]]:
+        """Последние результаты пользователя, при необходимости по типу теста"""
+        if test_type is None:
+            rows = await self.backend.fetchall('''
+                SELECT test_type, score, total_questions, completion_time, created_at,
+                       response_p50, response_p90
+                FROM test_results
+                WHERE user_id = ?
+                ORDER BY created_at DESC
+                LIMIT ?
+            ''', (user_id, limit))
+        else:
+            rows = await self.backend.fetchall('''
+                SELECT test_type, score, total_questions, completion_time, created_at,
+                       response_p50, response_p90
+                FROM test_results
+                WHERE user_id = ? AND test_type = ?
+                ORDER BY created_at DESC
+                LIMIT ?
+            ''', (user_id, test_type, limit))
+
+        return [
+            {
+                'test_type': row[0],
+                'score': row[1],
+                'total_questions': row[2],
+                'completion_time': row[3],
+                'created_at': row[4],
+                'response_p50': row[5],
+                'response_p90': row[6]
+            }
+            for row in rows
+        ]
+
+    async def get_user_ai_interactions(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Последние вопросы пользователя к ИИ"""
+        rows = await self.backend.fetchall('''
+            SELECT question, answer, feedback, created_at
+            FROM ai_interactions
+            WHERE user_id = ?
+            ORDER BY created_at DESC
+            LIMIT ?
+        ''', (user_id, limit))
+
+        return [
+            {
+                'question': row[0],
+                'answer': row[1],
+                'feedback': row[2],
+                'created_at': row[3]
+            }
+            for row in rows
+        ]
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Маркер «значение не менялось» для отложенной записи
+_UNSET = object()
+
+_UPSERT_STATE = '''
+    INSERT INTO fsm_states (storage_key, state, data, updated_at) VALUES (?, ?, '{}', ?)
+    ON CONFLICT (storage_key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at
+'''
+_UPSERT_DATA = '''
+    INSERT INTO fsm_states (storage_key, state, data, updated_at) VALUES (?, NULL, ?, ?)
+    ON CONFLICT (storage_key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+'''
+_UPSERT_BOTH = '''
+    INSERT INTO fsm_states (storage_key, state, data, updated_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT (storage_key) DO UPDATE
+    SET state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+'''
+
+
+def _dumps(data: Mapping[str, Any]) -> str:
+    """Компактная сериализация данных состояния"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class DatabaseStorage(BaseStorage):
+    """FSM-хранилище в таблице fsm_states той же базы, что и Database.
+
+    Запись отложенная: изменения копятся в памяти и раз в ``flush_interval``
+    секунд уходят в базу пачкой. Свои ещё не записанные изменения процесс
+    читает из памяти, остальное — из базы, поэтому несколько воркеров
+    на общей базе видят одно состояние. Сессии, не менявшиеся дольше
+    ``state_ttl`` секунд, считаются брошенными и удаляются.
+    """
+
+    def __init__(self, database: Database, state_ttl: int = 86400,
+                 flush_interval: float = 0.05, cleanup_interval: float = 600):
+        self.database = database
+        self.state_ttl = state_ttl
+        self.flush_interval = flush_interval
+        self.cleanup_interval = cleanup_interval
+        # storage_key -> [state, data_json]; _UNSET означает «не менялось»
+        self._pending: Dict[str, list] = {}
+        # Пачка, которая сейчас пишется в базу: читается, пока не закоммичена
+        self._inflight: Dict[str, list] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return (f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:"
+                f"{key.business_connection_id or ''}:{key.destiny}")
+
+    def _start_tasks(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    def _mark(self, key: StorageKey, index: int, value):
+        self._start_tasks()
+        entry = self._pending.setdefault(self._key(key), [_UNSET, _UNSET])
+        entry[index] = value
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._mark(key, 0, state.state if isinstance(state, State) else state)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        self._mark(key, 1, _dumps(data))
+
+    async def _load(self, storage_key: str):
+        """Чтение строки из базы с учётом TTL"""
+        rows = await self.database.backend.fetchall('''
+            SELECT state, data FROM fsm_states
+            WHERE storage_key = ? AND updated_at >= ?
+        ''', (storage_key, time.time() - self.state_ttl))
+        return rows[0] if rows else (None, None)
+
+    def _unflushed(self, storage_key: str, index: int):
+        """Значение, ещё не записанное в базу этим процессом"""
+        for pending in (self._pending, self._inflight):
+            entry = pending.get(storage_key)
+            if entry is not None and entry[index] is not _UNSET:
+                return entry[index]
+        return _UNSET
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        storage_key = self._key(key)
+        state = self._unflushed(storage_key, 0)
+        if state is _UNSET:
+            state, _ = await self._load(storage_key)
+        return state
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        storage_key = self._key(key)
+        raw = self._unflushed(storage_key, 1)
+        if raw is _UNSET:
+            _, raw = await self._load(storage_key)
+        return json.loads(raw) if raw else {}
+
+    async def flush(self):
+        """Запись накопленных изменений в базу"""
+        if not self._pending or self._inflight:
+            return
+        pending, self._pending = self._pending, {}
+        self._inflight = pending
+        now = time.time()
+
+        state_rows, data_rows, both_rows = [], [], []
+        for storage_key, (state, data) in pending.items():
+            if data is _UNSET:
+                state_rows.append((storage_key, state, now))
+            elif state is _UNSET:
+                data_rows.append((storage_key, data, now))
+            else:
+                both_rows.append((storage_key, state, data, now))
+
+        writes = []
+        backend = self.database.backend
+        for sql, rows in ((_UPSERT_STATE, state_rows), (_UPSERT_DATA, data_rows), (_UPSERT_BOTH, both_rows)):
+            if rows:
+                writes.append(backend.executemany(sql, rows))
+
+        try:
+            await asyncio.gather(*writes)
+        except BaseException as e:
+            # Возвращаем незаписанное, если его не успели перезаписать
+            for storage_key, entry in pending.items():
+                current = self._pending.setdefault(storage_key, [_UNSET, _UNSET])
+                for index in (0, 1):
+                    if current[index] is _UNSET:
+                        current[index] = entry[index]
+            if not isinstance(e, Exception):
+                raise
+            logger.error(f"Ошибка записи FSM-состояний: {e}")
+        finally:
+            self._inflight = {}
+
+    async def cleanup(self) -> int:
+        """Удаление брошенных сессий старше TTL"""
+        return await self.database.backend.execute(
+            'DELETE FROM fsm_states WHERE updated_at < ?',
+            (time.time() - self.state_ttl,)
+        )
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _cleanup_loop(self):
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            try:
+                removed = await self.cleanup()
+                if removed:
+                    logger.info(f"Удалено брошенных FSM-сессий: {removed}")
+            except Exception as e:
+                logger.error(f"Ошибка очистки FSM-состояний: {e}")
+
+    async def close(self) -> None:
+        tasks = [task for task in (self._flush_task, self._cleanup_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._flush_task = self._cleanup_task = None
+        await self.flush()
+
+
+def create_fsm_storage(option: str, database: Database, state_ttl: int = 86400) -> BaseStorage:
+    """Выбор FSM-хранилища: memory, database или redis://host:port/db"""
+    if option == 'memory':
+        return MemoryStorage()
+    if option == 'database':
+        return DatabaseStorage(database, state_ttl=state_ttl)
+    if option.startswith(('redis://', 'rediss://')):
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage.from_url(option, state_ttl=state_ttl, data_ttl=state_ttl)
+
+    raise ValueError(f"Неизвестное FSM-хранилище: {option}")
@@ -0,0 +1,86 @@
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiohttp import FormData
+
+
+class KeyboardRegistry:
+    """Готовые клавиатуры, построенные один раз.
+
+    Статичные меню и клавиатуры вопросов по id не меняются между
+    пользователями: модель собирается при первом обращении и дальше
+    переиспользуется (объекты aiogram неизменяемые). Для них же хранится
+    сериализованный JSON — его подставляет ``CachedMarkupSession``.
+    """
+
+    def __init__(self):
+        self._markups: Dict[Hashable, InlineKeyboardMarkup] = {}
+        # id(клавиатуры) -> JSON; объекты живут в _markups, поэтому id не переиспользуются
+        self._serialized: Dict[int, Optional[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, factory: Callable[[], InlineKeyboardMarkup]) -> InlineKeyboardMarkup:
+        markup = self._markups.get(key)
+        if markup is not None:
+            self.hits += 1
+            return markup
+        self.misses += 1
+        markup = self._markups[key] = factory()
+        self._serialized[id(markup)] = None
+        return markup
+
+    def is_cached(self, markup: object) -> bool:
+        return id(markup) in self._serialized
+
+    def serialized(self, markup: InlineKeyboardMarkup, dumps: Callable[[InlineKeyboardMarkup], str]) -> str:
+        """JSON клавиатуры из реестра; считается один раз через ``dumps``"""
+        value = self._serialized.get(id(markup))
+        if value is None:
+            value = self._serialized[id(markup)] = dumps(markup)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._markups)
+
+
+KEYBOARDS = KeyboardRegistry()
+
+
+def options_keyboard(prefix: str, options: Sequence, labeled: bool = False) -> InlineKeyboardMarkup:
+    """Варианты ответа по одному в ряд с callback_data ``prefix:индекс``"""
+    rows: List[List[InlineKeyboardButton]] = []
+    for i, option in enumerate(options):
+        text = f"{chr(97 + i)}) {option}" if labeled else str(option)
+        rows.append([InlineKeyboardButton(text=text, callback_data=f"{prefix}:{i}")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+class CachedMarkupSession(AiohttpSession):
+    """Сессия aiogram, которая не сериализует заново клавиатуры из реестра"""
+
+    def __init__(self, registry: KeyboardRegistry = KEYBOARDS, **kwargs):
+        super().__init__(**kwargs)
+        self.registry = registry
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod) -> FormData:
+        markup = getattr(method, 'reply_markup', None)
+        if markup is None or not self.registry.is_cached(markup):
+            return super().build_form_data(bot, method)
+
+        form = FormData(quote_fields=False)
+        files = {}
+        for key, value in method.model_dump(warnings=False, exclude={'reply_markup'}).items():
+            value = self.prepare_value(value, bot=bot, files=files)
+            if not value:
+                continue
+            form.add_field(key, value)
+        form.add_field('reply_markup', self.registry.serialized(
+            markup, lambda item: self.prepare_value(item, bot=bot, files=files)
+        ))
+        for key, value in files.items():
+            form.add_field(key, value.read(bot), filename=value.filename or key)
+        return form
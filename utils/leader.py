@@ -0,0 +1,63 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """Лидерство среди экземпляров бота на общей базе.
+
+    Лидер — владелец строки ``name`` в ``scheduler_leases``. Аренду нужно
+    продлевать чаще, чем раз в ``ttl`` секунд; если лидер упал, через ``ttl``
+    секунд её забирает другой экземпляр. Локально лидерство считается
+    потерянным чуть раньше срока в базе, чтобы два экземпляра не считали
+    себя лидерами одновременно.
+    """
+
+    def __init__(self, database: Database, name: str = 'scheduler', ttl: float = 90,
+                 owner: Optional[str] = None, safety_margin: float = 5.0):
+        self.database = database
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.safety_margin = safety_margin
+        self._valid_until = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    async def acquire(self) -> bool:
+        """Захват или продление аренды; False — лидер другой экземпляр или база недоступна"""
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            held = await self.database.acquire_lease(self.name, self.owner, self.ttl, time.time())
+        except Exception as e:
+            logger.error(f"Не удалось продлить аренду {self.name}: {e}")
+            held = False
+
+        if held:
+            self._valid_until = started + self.ttl - self.safety_margin
+            if not was_leader:
+                logger.info(f"Экземпляр {self.owner} стал лидером {self.name}")
+        else:
+            self._valid_until = 0.0
+            if was_leader:
+                logger.warning(f"Экземпляр {self.owner} потерял лидерство {self.name}")
+        return held
+
+    async def release(self):
+        if not self.is_leader:
+            return
+        self._valid_until = 0.0
+        try:
+            await self.database.release_lease(self.name, self.owner)
+        except Exception as e:
+            logger.error(f"Не удалось освободить аренду {self.name}: {e}")
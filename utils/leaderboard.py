@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Ключ результата: процент верных ответов * 100 + бонус за скорость 0..99
+# (99 минус среднее время на вопрос в десятых долях секунды)
+KEY_RANGE = 101 * 100
+
+
+def result_key(score: int, total_questions: int, completion_time: Optional[float] = None) -> int:
+    """Ключ для сравнения результатов: сначала точность, при равной — скорость"""
+    percent = min(100, max(0, score * 100 // total_questions))
+    bonus = 0
+    if completion_time is not None:
+        bonus = 99 - min(99, int(max(0.0, completion_time) * 10 / total_questions))
+    return percent * 100 + bonus
+
+
+def key_percent(key: int) -> int:
+    return key // 100
+
+
+class FenwickTree:
+    """Дерево Фенвика: число результатов по ключам, префиксные суммы за O(log n)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._tree = [0] * (size + 1)
+
+    def add(self, key: int, delta: int):
+        index = key + 1
+        while index <= self.size:
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, key: int) -> int:
+        """Сколько результатов с ключом <= ``key``"""
+        index = min(key + 1, self.size)
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+
+class Standing(NamedTuple):
+    """Место пользователя: 1 — лучший; ``top_percent`` — в какой верхней доле он находится"""
+    place: int
+    total: int
+    top_percent: float
+    percent: int
+
+
+class Leaderboard:
+    """Лучшие результаты пользователей в одном тесте"""
+
+    def __init__(self, top_size: int = 10):
+        self.top_size = top_size
+        self._tree = FenwickTree(KEY_RANGE)
+        self._best: Dict[int, int] = {}
+        # (ключ, user_id) по убыванию; лучший результат пользователя только растёт
+        self._top: List[Tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._best)
+
+    def update(self, user_id: int, key: int) -> bool:
+        """Новый результат; True, если он лучше прежнего лучшего"""
+        previous = self._best.get(user_id)
+        if previous is not None and key <= previous:
+            return False
+        if previous is not None:
+            self._tree.add(previous, -1)
+        self._tree.add(key, 1)
+        self._best[user_id] = key
+
+        if len(self._top) < self.top_size or key > self._top[-1][0]:
+            top = [entry for entry in self._top if entry[1] != user_id]
+            top.append((key, user_id))
+            top.sort(reverse=True)
+            self._top = top[:self.top_size]
+        return True
+
+    def best(self, user_id: int) -> Optional[int]:
+        return self._best.get(user_id)
+
+    def standing(self, user_id: int) -> Optional[Standing]:
+        key = self._best.get(user_id)
+        if key is None:
+            return None
+        total = len(self._best)
+        better = total - self._tree.prefix(key)
+        place = better + 1
+        return Standing(place, total, place / total * 100, key_percent(key))
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(user_id, ключ) лучших пользователей"""
+        return [(user_id, key) for key, user_id in self._top[:limit]]
+
+
+class Leaderboards:
+    """Рейтинги по всем тестам, обновляемые с каждым сохранённым результатом.
+
+    Место и доля считаются по дереву Фенвика в памяти, таблица test_results
+    при чтении не используется. Лучшие результаты записываются в
+    leaderboard_entries отложенно; при каждой записи подтягиваются
+    результаты, записанные другими экземплярами бота.
+    """
+
+    def __init__(self, database: Database, flush_interval: float = 30.0, top_size: int = 10):
+        self.database = database
+        self.flush_interval = flush_interval
+        self.top_size = top_size
+        self._boards: Dict[str, Leaderboard] = {}
+        self._dirty: Set[Tuple[str, int]] = set()
+        self._synced_at = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _board(self, test_type: str) -> Leaderboard:
+        board = self._boards.get(test_type)
+        if board is None:
+            board = self._boards[test_type] = Leaderboard(self.top_size)
+        return board
+
+    async def load(self):
+        """Лучшие результаты из базы; при первом запуске их заполняет миграция из test_results"""
+        await self._sync()
+        logger.info(f"Загружены рейтинги: {sum(len(board) for board in self._boards.values())} результатов")
+
+    async def _sync(self):
+        started = time.time()
+        rows = await self.database.get_leaderboard_entries(self._synced_at)
+        for test_type, user_id, key in rows:
+            self._board(test_type).update(user_id, key)
+        # С запасом на расхождение часов экземпляров: повторное применение ничего не меняет
+        self._synced_at = started - 60
+
+    def on_result(self, user_id: int, test_type: str, score: int, total_questions: int,
+                  completion_time: Optional[float] = None, **_):
+        """Слушатель Database.save_test_result"""
+        if not total_questions or test_type is None:
+            return
+        if self._board(test_type).update(user_id, result_key(score, total_questions, completion_time)):
+            self._dirty.add((test_type, user_id))
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_loop())
+
+    def standing(self, test_type: str, user_id: int) -> Optional[Standing]:
+        board = self._boards.get(test_type)
+        return board.standing(user_id) if board is not None else None
+
+    def standings(self, user_id: int) -> Dict[str, Standing]:
+        """Место пользователя во всех тестах, которые он проходил"""
+        result = {}
+        for test_type, board in self._boards.items():
+            standing = board.standing(user_id)
+            if standing is not None:
+                result[test_type] = standing
+        return result
+
+    def top(self, test_type: str, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        board = self._boards.get(test_type)
+        return board.top(limit) if board is not None else []
+
+    async def _write(self):
+        """Запись улучшенных результатов; при ошибке или отмене они остаются к записи"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        entries = [(test_type, user_id, self._boards[test_type].best(user_id)) for test_type, user_id in dirty]
+        try:
+            await self.database.save_leaderboard_entries(entries, time.time())
+        except BaseException as e:
+            self._dirty |= dirty
+            if not isinstance(e, Exception):
+                raise
+            logger.error(f"Ошибка записи рейтингов: {e}")
+
+    async def flush(self):
+        """Запись улучшенных результатов и подтягивание чужих"""
+        await self._write()
+        try:
+            await self._sync()
+        except Exception as e:
+            logger.error(f"Ошибка чтения рейтингов: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self._write()
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+
+class ThrottledEditor:
+    """Прогрессивное редактирование сообщения с ограничением частоты.
+
+    ``update`` только запоминает последний текст; фоновая задача отправляет
+    его не чаще раза в ``min_interval`` секунд, так что промежуточные версии
+    склеиваются и лимиты Telegram на правки не превышаются.
+    """
+
+    def __init__(self, message: types.Message, min_interval: float = 1.0):
+        self.message = message
+        self.min_interval = min_interval
+        self.edits = 0
+        self._latest: Optional[str] = None
+        self._sent: Optional[str] = None
+        self._next_edit_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, text: str):
+        """Новый текст сообщения; отправится при ближайшей разрешённой правке"""
+        self._latest = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._latest is not None and self._latest != self._sent:
+            delay = self._next_edit_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            text = self._latest
+            try:
+                await self.message.edit_text(text)
+                self._sent = text
+                self.edits += 1
+                self._next_edit_at = time.monotonic() + self.min_interval
+            except TelegramRetryAfter as e:
+                self._next_edit_at = time.monotonic() + e.retry_after
+            except TelegramBadRequest as e:
+                # Например, «message is not modified» — просто пропускаем версию
+                logger.debug(f"Правка сообщения пропущена: {e}")
+                self._sent = text
+                self._next_edit_at = time.monotonic() + self.min_interval
+
+    async def finish(self):
+        """Остановка промежуточных правок перед финальным текстом"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        # Финальная правка тоже должна уважать интервал
+        delay = self._next_edit_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
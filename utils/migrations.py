@@ -0,0 +1,455 @@
+import logging
+from typing import Dict, List
+from utils.db_backends import BaseBackend
+
+logger = logging.getLogger(__name__)
+
+
+class Migration:
+    """Версионированное изменение схемы с SQL для каждого диалекта"""
+
+    def __init__(self, version: int, description: str, statements: Dict[str, List[str]]):
+        self.version = version
+        self.description = description
+        self.statements = statements
+
+
+# Миграции применяются по порядку версий и никогда не меняются задним числом:
+# для новой схемы добавляется новая миграция в конец списка
+MIGRATIONS = [
+    Migration(1, "Базовая схема", {
+        'sqlite': [
+            # Таблица пользователей
+            '''
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT,
+                first_name TEXT,
+                last_name TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                reminder_frequency TEXT DEFAULT 'none',
+                reminder_enabled BOOLEAN DEFAULT FALSE
+            )
+            ''',
+            # Таблица результатов тестов
+            '''
+            CREATE TABLE IF NOT EXISTS test_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                test_type TEXT,
+                score INTEGER,
+                total_questions INTEGER,
+                completion_time REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+            ''',
+            # Таблица взаимодействий с ИИ
+            '''
+            CREATE TABLE IF NOT EXISTS ai_interactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                question TEXT,
+                answer TEXT,
+                feedback INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+            ''',
+        ],
+        # В PostgreSQL id Telegram не помещаются в INTEGER
+        'postgres': [
+            '''
+            CREATE TABLE IF NOT EXISTS users (
+                user_id BIGINT PRIMARY KEY,
+                username TEXT,
+                first_name TEXT,
+                last_name TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                reminder_frequency TEXT DEFAULT 'none',
+                reminder_enabled BOOLEAN DEFAULT FALSE
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS test_results (
+                id BIGSERIAL PRIMARY KEY,
+                user_id BIGINT REFERENCES users (user_id),
+                test_type TEXT,
+                score INTEGER,
+                total_questions INTEGER,
+                completion_time DOUBLE PRECISION,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS ai_interactions (
+                id BIGSERIAL PRIMARY KEY,
+                user_id BIGINT REFERENCES users (user_id),
+                question TEXT,
+                answer TEXT,
+                feedback INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+        ],
+    }),
+    Migration(2, "Индексы для истории результатов, ИИ и рассылки напоминаний", {
+        'sqlite': [
+            # История пользователя по типу теста читается только из индекса
+            '''
+            CREATE INDEX IF NOT EXISTS idx_test_results_user_type_created
+            ON test_results (user_id, test_type, created_at, score, total_questions, completion_time)
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_ai_interactions_user_created
+            ON ai_interactions (user_id, created_at)
+            ''',
+            # Частичный индекс: в рассылке участвуют только включённые напоминания
+            '''
+            CREATE INDEX IF NOT EXISTS idx_users_reminders_enabled
+            ON users (reminder_frequency, user_id)
+            WHERE reminder_enabled = TRUE
+            ''',
+        ],
+        'postgres': [
+            '''
+            CREATE INDEX IF NOT EXISTS idx_test_results_user_type_created
+            ON test_results (user_id, test_type, created_at)
+            INCLUDE (score, total_questions, completion_time)
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_ai_interactions_user_created
+            ON ai_interactions (user_id, created_at)
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_users_reminders_enabled
+            ON users (reminder_frequency, user_id)
+            WHERE reminder_enabled = TRUE
+            ''',
+        ],
+    }),
+    Migration(3, "Постоянное хранилище FSM-состояний", {
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS fsm_states (
+                storage_key TEXT PRIMARY KEY,
+                state TEXT,
+                data TEXT NOT NULL DEFAULT '{}',
+                updated_at REAL NOT NULL
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states (updated_at)',
+        ],
+        'postgres': [
+            '''
+            CREATE TABLE IF NOT EXISTS fsm_states (
+                storage_key TEXT PRIMARY KEY,
+                state TEXT,
+                data TEXT NOT NULL DEFAULT '{}',
+                updated_at DOUBLE PRECISION NOT NULL
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states (updated_at)',
+        ],
+    }),
+    Migration(4, "Хэш контекста в ai_interactions для кэша ответов", {
+        'sqlite': ['ALTER TABLE ai_interactions ADD COLUMN context_hash TEXT'],
+        'postgres': ['ALTER TABLE ai_interactions ADD COLUMN IF NOT EXISTS context_hash TEXT'],
+    }),
+    Migration(5, "Прогресс массовых рассылок", {
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS broadcast_runs (
+                run_id TEXT PRIMARY KEY,
+                audience TEXT NOT NULL,
+                last_user_id INTEGER NOT NULL DEFAULT 0,
+                sent INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                blocked INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'running',
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+        ],
+        'postgres': [
+            '''
+            CREATE TABLE IF NOT EXISTS broadcast_runs (
+                run_id TEXT PRIMARY KEY,
+                audience TEXT NOT NULL,
+                last_user_id BIGINT NOT NULL DEFAULT 0,
+                sent INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                blocked INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'running',
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+        ],
+    }),
+    Migration(6, "Время последнего напоминания и индекс для выбора получателей", {
+        'sqlite': [
+            'ALTER TABLE users ADD COLUMN last_reminded_at TIMESTAMP',
+            'ALTER TABLE broadcast_runs ADD COLUMN due_before TIMESTAMP',
+            # Покрывающий частичный индекс: рассылка читает только его
+            '''
+            CREATE INDEX IF NOT EXISTS idx_users_reminders_due
+            ON users (reminder_frequency, user_id, last_reminded_at)
+            WHERE reminder_enabled = TRUE
+            ''',
+            'DROP INDEX IF EXISTS idx_users_reminders_enabled',
+        ],
+        'postgres': [
+            'ALTER TABLE users ADD COLUMN IF NOT EXISTS last_reminded_at TIMESTAMP',
+            'ALTER TABLE broadcast_runs ADD COLUMN IF NOT EXISTS due_before TIMESTAMP',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_users_reminders_due
+            ON users (reminder_frequency, user_id)
+            INCLUDE (last_reminded_at)
+            WHERE reminder_enabled = TRUE
+            ''',
+            'DROP INDEX IF EXISTS idx_users_reminders_enabled',
+        ],
+    }),
+    Migration(7, "Часовой пояс, время и очередь напоминаний", {
+        'sqlite': [
+            'ALTER TABLE users ADD COLUMN timezone TEXT',
+            'ALTER TABLE users ADD COLUMN reminder_time TEXT',
+            'ALTER TABLE users ADD COLUMN next_reminder_at TIMESTAMP',
+            # Диспетчер каждую минуту забирает из начала этого индекса тех, кому пора
+            '''
+            CREATE INDEX IF NOT EXISTS idx_users_next_reminder
+            ON users (next_reminder_at)
+            WHERE reminder_enabled = TRUE
+            ''',
+        ],
+        'postgres': [
+            'ALTER TABLE users ADD COLUMN IF NOT EXISTS timezone TEXT',
+            'ALTER TABLE users ADD COLUMN IF NOT EXISTS reminder_time TEXT',
+            'ALTER TABLE users ADD COLUMN IF NOT EXISTS next_reminder_at TIMESTAMP',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_users_next_reminder
+            ON users (next_reminder_at)
+            WHERE reminder_enabled = TRUE
+            ''',
+        ],
+    }),
+    Migration(8, "Аренда лидерства для нескольких экземпляров бота", {
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS scheduler_leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            ''',
+        ],
+        'postgres': [
+            '''
+            CREATE TABLE IF NOT EXISTS scheduler_leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at DOUBLE PRECISION NOT NULL
+            )
+            ''',
+        ],
+    }),
+    Migration(9, "Источник ответа в ai_interactions", {
+        # Все старые записи — ответы модели
+        'sqlite': ["ALTER TABLE ai_interactions ADD COLUMN source TEXT NOT NULL DEFAULT 'llm'"],
+        'postgres': ["ALTER TABLE ai_interactions ADD COLUMN IF NOT EXISTS source TEXT NOT NULL DEFAULT 'llm'"],
+    }),
+    Migration(10, "Рейтинги навыков пользователей и сложности вопросов", {
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS skill_ratings (
+                user_id INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                rating REAL NOT NULL,
+                answers INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, topic)
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS item_ratings (
+                item_id INTEGER PRIMARY KEY,
+                rating REAL NOT NULL,
+                answers INTEGER NOT NULL DEFAULT 0
+            )
+            ''',
+        ],
+        'postgres': [
+            '''
+            CREATE TABLE IF NOT EXISTS skill_ratings (
+                user_id BIGINT NOT NULL,
+                topic TEXT NOT NULL,
+                rating DOUBLE PRECISION NOT NULL,
+                answers INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, topic)
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS item_ratings (
+                item_id INTEGER PRIMARY KEY,
+                rating DOUBLE PRECISION NOT NULL,
+                answers INTEGER NOT NULL DEFAULT 0
+            )
+            ''',
+        ],
+    }),
+    Migration(11, "Журнал ответов на вопросы тестов", {
+        # Только добавление строк: без автоинкрементного id и внешних ключей
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS answer_events (
+                user_id INTEGER NOT NULL,
+                test_type TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                chosen INTEGER NOT NULL,
+                correct BOOLEAN NOT NULL,
+                latency_ms INTEGER,
+                created_at REAL NOT NULL
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_answer_events_question ON answer_events (question_id)',
+        ],
+        'postgres': [
+            '''
+            CREATE TABLE IF NOT EXISTS answer_events (
+                user_id BIGINT NOT NULL,
+                test_type TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                chosen SMALLINT NOT NULL,
+                correct BOOLEAN NOT NULL,
+                latency_ms INTEGER,
+                created_at DOUBLE PRECISION NOT NULL
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_answer_events_question ON answer_events (question_id)',
+        ],
+    }),
+    Migration(12, "Перцентили времени ответа в test_results", {
+        'sqlite': [
+            'ALTER TABLE test_results ADD COLUMN response_p50 REAL',
+            'ALTER TABLE test_results ADD COLUMN response_p90 REAL',
+        ],
+        'postgres': [
+            'ALTER TABLE test_results ADD COLUMN IF NOT EXISTS response_p50 DOUBLE PRECISION',
+            'ALTER TABLE test_results ADD COLUMN IF NOT EXISTS response_p90 DOUBLE PRECISION',
+        ],
+    }),
+    Migration(13, "Лучшие результаты для рейтингов", {
+        # best_key — utils.leaderboard.result_key; заполняется по уже сохранённым результатам
+        'sqlite': [
+            '''
+            CREATE TABLE IF NOT EXISTS leaderboard_entries (
+                test_type TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                best_key INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (test_type, user_id)
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_leaderboard_entries_updated ON leaderboard_entries (updated_at)',
+            '''
+            INSERT OR IGNORE INTO leaderboard_entries (test_type, user_id, best_key, updated_at)
+            SELECT test_type, user_id,
+                   MAX(MIN(100, MAX(0, score * 100 / total_questions)) * 100
+                       + CASE WHEN completion_time IS NULL THEN 0
+                              ELSE 99 - MIN(99, CAST(MAX(0, completion_time) * 10 / total_questions AS INTEGER))
+                         END),
+                   CAST(strftime('%s', 'now') AS REAL)
+            FROM test_results
+            WHERE test_type IS NOT NULL AND user_id IS NOT NULL AND total_questions > 0
+            GROUP BY test_type, user_id
+            ''',
+        ],
+        'postgres': [
+            '''
+            CREATE TABLE IF NOT EXISTS leaderboard_entries (
+                test_type TEXT NOT NULL,
+                user_id BIGINT NOT NULL,
+                best_key INTEGER NOT NULL,
+                updated_at DOUBLE PRECISION NOT NULL,
+                PRIMARY KEY (test_type, user_id)
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_leaderboard_entries_updated ON leaderboard_entries (updated_at)',
+            '''
+            INSERT INTO leaderboard_entries (test_type, user_id, best_key, updated_at)
+            SELECT test_type, user_id,
+                   MAX(LEAST(100, GREATEST(0, score * 100 / total_questions)) * 100
+                       + CASE WHEN completion_time IS NULL THEN 0
+                              ELSE 99 - LEAST(99, FLOOR(GREATEST(0, completion_time) * 10 / total_questions))::INTEGER
+                         END),
+                   EXTRACT(EPOCH FROM NOW())
+            FROM test_results
+            WHERE test_type IS NOT NULL AND user_id IS NOT NULL AND total_questions > 0
+            GROUP BY test_type, user_id
+            ON CONFLICT (test_type, user_id) DO NOTHING
+            ''',
+        ],
+    }),
+    Migration(14, "Индекс ответов с 👎 для прогрева кэша", {
+        # Проверка NOT EXISTS в get_cacheable_ai_answers — поиск по индексу, а не просмотр таблицы
+        'sqlite': [
+            'CREATE INDEX IF NOT EXISTS idx_ai_interactions_disliked ON ai_interactions (answer) WHERE feedback = 0',
+        ],
+        'postgres': [
+            'CREATE INDEX IF NOT EXISTS idx_ai_interactions_disliked ON ai_interactions (answer) WHERE feedback = 0',
+        ],
+    }),
+    Migration(15, "Удаление прогресса постраничных рассылок", {
+        # Напоминания рассылает диспетчер по next_reminder_at; столбец last_reminded_at
+        # остаётся, но больше не пишется
+        'sqlite': [
+            'DROP INDEX IF EXISTS idx_users_reminders_due',
+            'DROP TABLE IF EXISTS broadcast_runs',
+        ],
+        'postgres': [
+            'DROP INDEX IF EXISTS idx_users_reminders_due',
+            'DROP TABLE IF EXISTS broadcast_runs',
+        ],
+    }),
+]
+
+
+async def get_schema_version(backend: BaseBackend) -> int:
+    """Текущая версия схемы (0 — миграции ещё не применялись)"""
+    await backend.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    rows = await backend.fetchall('SELECT MAX(version) FROM schema_migrations')
+    return rows[0][0] or 0
+
+
+async def apply_migrations(backend: BaseBackend, target: int = None) -> int:
+    """Применение недостающих миграций; каждая выполняется в своей транзакции"""
+    current = await get_schema_version(backend)
+
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        if target is not None and migration.version > target:
+            break
+
+        statements = [(sql, ()) for sql in migration.statements[backend.dialect]]
+        if backend.dialect == 'postgres':
+            record_sql = '''
+                INSERT INTO schema_migrations (version, description) VALUES (?, ?)
+                ON CONFLICT (version) DO NOTHING
+            '''
+        else:
+            record_sql = 'INSERT OR IGNORE INTO schema_migrations (version, description) VALUES (?, ?)'
+        statements.append((record_sql, (migration.version, migration.description)))
+
+        await backend.transaction(statements)
+        current = migration.version
+        logger.info(f"Применена миграция {migration.version}: {migration.description}")
+
+    return current
@@ -0,0 +1,50 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Ограничение частоты: ``rate`` токенов в секунду, запас до ``capacity``.
+
+    Ожидающие ``acquire`` обслуживаются по очереди; при ``rate <= 0``
+    ограничение выключено.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """Через сколько секунд будет доступно ``tokens`` токенов"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Взять токены без ожидания, если они есть"""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Дождаться токенов; возвращает время ожидания в секундах"""
+        if self.rate <= 0:
+            return 0.0
+        start = time.monotonic()
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep(self.delay(tokens))
+        return time.monotonic() - start
@@ -0,0 +1,88 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from typing import Dict, FrozenSet, NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from config import SCHEDULER_TIMEZONE, REMINDER_SPREAD_MINUTES
+
+
+class ReminderSchedule(NamedTuple):
+    """Дни недели (0 — понедельник), минимальный шаг в днях и время по умолчанию"""
+    weekdays: FrozenSet[int]
+    step_days: int
+    default_time: time
+
+
+EVERY_DAY = frozenset(range(7))
+
+SCHEDULES: Dict[str, ReminderSchedule] = {
+    'daily': ReminderSchedule(EVERY_DAY, 1, time(10, 0)),
+    'once_a_day': ReminderSchedule(EVERY_DAY, 1, time(10, 0)),
+    '2days': ReminderSchedule(EVERY_DAY, 2, time(10, 0)),
+    'mon_thu': ReminderSchedule(frozenset({0, 3}), 1, time(18, 0)),
+    'twice_a_week': ReminderSchedule(frozenset({0, 3}), 1, time(18, 0)),
+    'weekends': ReminderSchedule(frozenset({5, 6}), 1, time(12, 0)),
+    'weekend_only': ReminderSchedule(frozenset({5, 6}), 1, time(12, 0)),
+}
+
+# Часовые пояса, которые предлагаются в настройках
+TIMEZONES = {
+    'Europe/Kaliningrad': 'Калининград (МСК−1)',
+    'Europe/Moscow': 'Москва (МСК)',
+    'Europe/Samara': 'Самара (МСК+1)',
+    'Asia/Yekaterinburg': 'Екатеринбург (МСК+2)',
+    'Asia/Omsk': 'Омск (МСК+3)',
+    'Asia/Novosibirsk': 'Новосибирск (МСК+4)',
+    'Asia/Irkutsk': 'Иркутск (МСК+5)',
+    'Asia/Vladivostok': 'Владивосток (МСК+7)',
+}
+
+# Время, которое предлагается в настройках
+REMINDER_TIMES = ['08:00', '09:00', '10:00', '12:00', '15:00', '18:00', '20:00', '21:00']
+
+
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """Часовой пояс пользователя; неизвестный или пустой — пояс бота"""
+    try:
+        return ZoneInfo(name or SCHEDULER_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(SCHEDULER_TIMEZONE)
+
+
+def parse_time(value: Optional[str]) -> Optional[time]:
+    """'ЧЧ:ММ' -> time; некорректное значение -> None"""
+    try:
+        return time.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def next_reminder_at(user_id: int, frequency: str, timezone: Optional[str], reminder_time: Optional[str],
+                     after: datetime, reminded: bool = False) -> Optional[datetime]:
+    """Следующее напоминание в UTC (naive, как в базе) строго позже ``after``.
+
+    Без выбранного времени напоминание сдвигается от времени по умолчанию
+    на ``user_id % REMINDER_SPREAD_MINUTES`` минут, чтобы пользователи не
+    получали его в одну и ту же минуту. ``reminded`` — напоминание только
+    что отправлено, и следующее должно быть не раньше чем через шаг расписания.
+    """
+    schedule = SCHEDULES.get(frequency)
+    if schedule is None:
+        return None
+
+    at = parse_time(reminder_time)
+    if at is None:
+        spread = user_id % REMINDER_SPREAD_MINUTES if REMINDER_SPREAD_MINUTES > 0 else 0
+        start = datetime.combine(datetime.min, schedule.default_time) + timedelta(minutes=spread)
+        at = start.time()
+
+    zone = get_zone(timezone)
+    local_now = after.replace(tzinfo=dt_timezone.utc).astimezone(zone)
+    first_day = local_now.date() + timedelta(days=schedule.step_days if reminded else 0)
+    for offset in range(8):
+        day = first_day + timedelta(days=offset)
+        if day.weekday() not in schedule.weekdays:
+            continue
+        candidate = datetime.combine(day, at, tzinfo=zone)
+        if candidate > local_now:
+            return candidate.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return None
@@ -1,110 +1,142 @@
+import asyncio
+import logging
+import random
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from datetime import datetime
-from typing import List, Dict, Any
+from datetime import datetime, timedelta
+from typing import Optional
+from utils.broadcast import BroadcastEngine
 from utils.database import Database
+from utils.leader import LeaderLease
+from utils.keyboards import KEYBOARDS
+from utils.reminder_schedule import next_reminder_at
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from config import (BROADCAST_RATE, BROADCAST_CONCURRENCY, BROADCAST_PAGE_SIZE, SCHEDULER_TIMEZONE,
+                    SCHEDULER_LEASE_TTL, REMINDER_MISFIRE_GRACE)
+
+logger = logging.getLogger(__name__)
+
+REMINDER_MESSAGES = [
+    "🧠 Привет! Не забывай прокачивать своё мышление! Готов к новым вызовам?",
+    "💪 Время для тренировки мозга! Какой тест выберешь сегодня?",
+    "🚀 Твой мозг ждёт новых задач! Загляни в помощник курса!",
+    "🎯 Маленький шаг к большому мышлению! Пора заниматься!",
+    "🌟 Развитие мышления - это путь к успеху! Продолжай движение!"
+]
 
 class Scheduler:
     def __init__(self, bot, database: Database):
         self.bot = bot
         self.database = database
-        self.scheduler = AsyncIOScheduler()
+        # Задачи планировщика — только диспетчер, его состояние (next_reminder_at) уже в базе.
+        # Пропущенные запуски склеиваются в один, параллельных запусков нет
+        self.scheduler = AsyncIOScheduler(timezone=SCHEDULER_TIMEZONE, job_defaults={
+            'coalesce': True,
+            'max_instances': 1,
+            'misfire_grace_time': 30
+        })
+        self.lease = LeaderLease(database, 'scheduler', ttl=SCHEDULER_LEASE_TTL)
+        self.broadcast = BroadcastEngine(
+            bot, database,
+            rate=BROADCAST_RATE,
+            concurrency=BROADCAST_CONCURRENCY,
+            page_size=BROADCAST_PAGE_SIZE
+        )
+        self._resume_task: Optional[asyncio.Task] = None
         
     async def start(self):
         """Запуск планировщика"""
         self.scheduler.start()
         self._setup_reminders()
     
+    async def _resume(self):
+        """Работа нового лидера: досчитать время напоминаний, которого ещё нет"""
+        await self._schedule_missing_reminders()
+    
     async def stop(self):
         """Остановка планировщика"""
+        if self._resume_task is not None and not self._resume_task.done():
+            self._resume_task.cancel()
+            await asyncio.gather(self._resume_task, return_exceptions=True)
         self.scheduler.shutdown()
+        await self.lease.release()
     
     def _setup_reminders(self):
         """Настройка напоминаний"""
-        # Ежедневные напоминания в 10:00
+        # Вместо трёх крупных рассылок по cron — небольшие пачки каждую минуту:
+        # у каждого пользователя своё время с учётом его часового пояса.
+        # Первый запуск сразу — чтобы догнать напоминания, пропущенные пока бот был выключен
         self.scheduler.add_job(
-            self._send_daily_reminders,
-            CronTrigger(hour=10, minute=0),
-            id='daily_reminders',
-            replace_existing=True
-        )
-        
-        # Напоминания по понедельникам и четвергам в 18:00
-        self.scheduler.add_job(
-            self._send_weekly_reminders,
-            CronTrigger(day_of_week='mon,thu', hour=18, minute=0),
-            id='weekly_reminders',
-            replace_existing=True
-        )
-        
-        # Напоминания по выходным в 12:00
-        self.scheduler.add_job(
-            self._send_weekend_reminders,
-            CronTrigger(day_of_week='sat,sun', hour=12, minute=0),
-            id='weekend_reminders',
-            replace_existing=True
+            self._dispatch_due_reminders,
+            CronTrigger(minute='*'),
+            id='reminder_dispatcher',
+            replace_existing=True,
+            next_run_time=datetime.now(self.scheduler.timezone)
         )
     
-    async def _send_daily_reminders(self):
-        """Отправка ежедневных напоминаний"""
-        users = await self.database.get_users_with_reminders()
+    async def _dispatch_due_reminders(self):
+        """Отправка напоминаний, время которых наступило; только на экземпляре-лидере"""
+        was_leader = self.lease.is_leader
+        if not await self.lease.acquire():
+            return
+        if not was_leader and (self._resume_task is None or self._resume_task.done()):
+            self._resume_task = asyncio.create_task(self._resume())
         
-        for user in users:
-            if user['reminder_frequency'] in ['daily', 'once_a_day']:
-                await self._send_reminder_message(user['user_id'])
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=REMINDER_MISFIRE_GRACE)
+        keyboard = self._get_reminder_keyboard()
+        while True:
+            due = await self.database.get_due_reminders(now, self.broadcast.page_size)
+            if not due:
+                break
+            # Следующее время записывается до отправки: при падении
+            # напоминание лучше пропустить, чем прислать дважды
+            await self.database.schedule_reminders([
+                (user['user_id'], next_reminder_at(user['user_id'], user['reminder_frequency'], user['timezone'],
+                                                   user['reminder_time'], now, reminded=True))
+                for user in due
+            ])
+            # Сильно опоздавшие (бот был выключен) только переносятся: утреннее напоминание ночью не нужно
+            fresh = [user['user_id'] for user in due if user['next_reminder_at'] >= stale_before]
+            if len(fresh) < len(due):
+                logger.info(f"Пропущено опоздавших напоминаний: {len(due) - len(fresh)}")
+            if fresh:
+                await self.broadcast.send_batch(fresh, self._reminder_text, keyboard)
+            # Долгая пачка не должна пережить аренду: иначе начнёт рассылать второй экземпляр
+            if not await self.lease.acquire():
+                break
     
-    async def _send_weekly_reminders(self):
-        """Отправка напоминаний по понедельникам и четвергам"""
-        users = await self.database.get_users_with_reminders()
-        
-        for user in users:
-            if user['reminder_frequency'] in ['mon_thu', 'twice_a_week']:
-                await self._send_reminder_message(user['user_id'])
+    async def _schedule_missing_reminders(self):
+        """Расчёт времени напоминаний для тех, у кого его ещё нет"""
+        now = datetime.utcnow()
+        after_user_id = 0
+        while True:
+            users = await self.database.get_unscheduled_reminders(after_user_id, self.broadcast.page_size)
+            if not users:
+                break
+            await self.database.schedule_reminders([
+                (user['user_id'], next_reminder_at(user['user_id'], user['reminder_frequency'], user['timezone'],
+                                                   user['reminder_time'], now))
+                for user in users
+            ])
+            after_user_id = users[-1]['user_id']
     
-    async def _send_weekend_reminders(self):
-        """Отправка напоминаний по выходным"""
-        users = await self.database.get_users_with_reminders()
-        
-        for user in users:
-            if user['reminder_frequency'] in ['weekends', 'weekend_only']:
-                await self._send_reminder_message(user['user_id'])
-    
-    async def _send_reminder_message(self, user_id: int):
-        """Отправка сообщения-напоминания"""
-        reminder_messages = [
-            "🧠 Привет! Не забывай прокачивать своё мышление! Готов к новым вызовам?",
-            "💪 Время для тренировки мозга! Какой тест выберешь сегодня?",
-            "🚀 Твой мозг ждёт новых задач! Загляни в помощник курса!",
-            "🎯 Маленький шаг к большому мышлению! Пора заниматься!",
-            "🌟 Развитие мышления - это путь к успеху! Продолжай движение!"
-        ]
-        
-        import random
-        message = random.choice(reminder_messages)
-        
-        try:
-            await self.bot.send_message(
-                chat_id=user_id,
-                text=message,
-                reply_markup=self._get_reminder_keyboard()
-            )
-        except Exception as e:
-            print(f"Ошибка отправки напоминания пользователю {user_id}: {e}")
+    def _reminder_text(self, user_id: int) -> str:
+        """Текст напоминания"""
+        return random.choice(REMINDER_MESSAGES)
     
     def _get_reminder_keyboard(self):
         """Клавиатура для напоминаний"""
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        return KEYBOARDS.get('reminder_notification', lambda: InlineKeyboardMarkup(inline_keyboard=[
             [
-                InlineKeyboardButton(text="📚 Тест-квиз", callback_data="quiz"),
-                InlineKeyboardButton(text="👁 Тест на внимание", callback_data="attention")
+                InlineKeyboardButton(text="📚 Тест-квиз", callback_data="menu:quiz"),
+                InlineKeyboardButton(text="👁 Тест на внимание", callback_data="menu:attention")
             ],
             [
-                InlineKeyboardButton(text="⚡ Тест на скорость", callback_data="speed"),
-                InlineKeyboardButton(text="🧠 Разминка мозга", callback_data="brain_games")
+                InlineKeyboardButton(text="⚡ Тест на скорость", callback_data="menu:speed"),
+                InlineKeyboardButton(text="🧠 Разминка мозга", callback_data="menu:brain_games")
             ],
             [
-                InlineKeyboardButton(text="🤖 ИИ помощник", callback_data="ai_assistant")
+                InlineKeyboardButton(text="🤖 ИИ помощник", callback_data="menu:ai_assistant")
             ]
-        ])
-        return keyboard 
\ No newline at end of file
+        ])) 
\ No newline at end of file
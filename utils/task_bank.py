@@ -0,0 +1,214 @@
+import logging
+import os
+import random
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TERMS = 4
+OPTIONS = 4
+
+# Виды последовательностей и базовая сложность (по шкале рейтинга Эло)
+KINDS = ('arithmetic', 'geometric', 'fibonacci', 'mixed')
+_BASE_DIFFICULTY = np.array([800, 1000, 1150, 1250])
+
+TASK_DTYPE = np.dtype([
+    ('terms', np.int32, (TERMS,)),
+    ('options', np.int32, (OPTIONS,)),
+    ('difficulty', np.uint16),
+    ('correct', np.uint8),
+    ('kind', np.uint8),
+])
+
+# Генерация кусками: матрица сравнения вариантов растёт как chunk × k²
+_CHUNK = 100_000
+
+
+def _arithmetic(rng: np.random.Generator, n: int):
+    step = rng.integers(2, 31, n) * rng.choice([-1, 1], n)
+    start = rng.integers(1, 200, n)
+    # Убывающие последовательности не уходят в минус
+    start = np.where(step < 0, start - step * TERMS, start)
+    terms = start[:, None] + step[:, None] * np.arange(TERMS + 1)
+    return terms, np.abs(step)
+
+
+def _geometric(rng: np.random.Generator, n: int):
+    ratio = rng.integers(2, 6, n)
+    start = rng.integers(1, 21, n)
+    terms = start[:, None] * ratio[:, None] ** np.arange(TERMS + 1)
+    return terms, ratio * 3
+
+
+def _fibonacci(rng: np.random.Generator, n: int):
+    terms = np.empty((n, TERMS + 1), dtype=np.int64)
+    terms[:, 0] = rng.integers(1, 51, n)
+    terms[:, 1] = rng.integers(1, 51, n)
+    for i in range(2, TERMS + 1):
+        terms[:, i] = terms[:, i - 1] + terms[:, i - 2]
+    return terms, terms[:, 1]
+
+
+def _mixed(rng: np.random.Generator, n: int):
+    """Чередование двух шагов: +p, +q, +p, +q"""
+    p = rng.integers(1, 21, n)
+    # q ≠ p: сдвиг по кругу на 1..19
+    q = (p - 1 + rng.integers(1, 20, n)) % 20 + 1
+    steps = np.stack([p, q, p, q], axis=1)
+    terms = np.concatenate([rng.integers(1, 100, n)[:, None], steps], axis=1).cumsum(axis=1)
+    return terms, np.maximum(p, q)
+
+
+_GENERATORS = (_arithmetic, _geometric, _fibonacci, _mixed)
+
+
+def _distractors(rng: np.random.Generator, terms: np.ndarray, answer: np.ndarray) -> np.ndarray:
+    """Три различных неверных варианта на задачу.
+
+    Кандидаты — типичные ошибки (повтор последнего шага, ответ ± немного,
+    удвоение), в конце — запасные ответ + 7/13/19, поэтому трёх различных
+    положительных вариантов хватает всегда.
+    """
+    n = len(answer)
+    last = terms[:, -2]
+    candidates = np.stack([
+        last + (last - terms[:, -3]),
+        answer + rng.integers(1, 6, n),
+        answer - rng.integers(1, 4, n),
+        answer * 2,
+        last * 2,
+        answer + 7,
+        answer + 13,
+        answer + 19,
+    ], axis=1)
+    k = candidates.shape[1]
+    repeated = ((candidates[:, :, None] == candidates[:, None, :]) & np.tri(k, k, -1, dtype=bool)).any(axis=2)
+    valid = ~repeated & (candidates != answer[:, None]) & (candidates > 0)
+    # Стабильная сортировка ставит подходящие кандидаты вперёд, сохраняя порядок
+    first = np.argsort(~valid, axis=1, kind='stable')[:, :OPTIONS - 1]
+    return np.take_along_axis(candidates, first, axis=1)
+
+
+def generate_tasks(size: int, seed: Optional[int] = None) -> np.ndarray:
+    """Массив ``size`` задач TASK_DTYPE без повторов, отсортированный по сложности"""
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for offset in range(0, size, _CHUNK):
+        n = min(_CHUNK, size - offset)
+        kind = rng.integers(0, len(KINDS), n)
+        sequences = np.zeros((n, TERMS + 1), dtype=np.int64)
+        spread = np.zeros(n, dtype=np.int64)
+        for kind_id, generator in enumerate(_GENERATORS):
+            rows = np.flatnonzero(kind == kind_id)
+            sequences[rows], spread[rows] = generator(rng, len(rows))
+        answer = sequences[:, -1]
+
+        options = np.concatenate([answer[:, None], _distractors(rng, sequences, answer)], axis=1)
+        order = np.argsort(rng.random((n, OPTIONS)), axis=1)
+        options = np.take_along_axis(options, order, axis=1)
+
+        tasks = np.empty(n, dtype=TASK_DTYPE)
+        tasks['terms'] = sequences[:, :TERMS]
+        tasks['options'] = options
+        tasks['correct'] = np.argmax(order == 0, axis=1)
+        tasks['kind'] = kind
+        difficulty = _BASE_DIFFICULTY[kind] + 120 * np.log10(1 + answer) + 8 * spread
+        tasks['difficulty'] = np.clip(difficulty, 0, np.iinfo(np.uint16).max)
+        chunks.append(tasks)
+
+    tasks = np.concatenate(chunks) if chunks else np.empty(0, dtype=TASK_DTYPE)
+    # Одинаковые последовательности оставляем один раз (строка из 4 int32 как 16 байт)
+    keys = np.ascontiguousarray(tasks['terms']).view(np.dtype((np.void, TERMS * 4))).ravel()
+    _, unique = np.unique(keys, return_index=True)
+    tasks = tasks[np.sort(unique)]
+    return tasks[np.argsort(tasks['difficulty'], kind='stable')]
+
+
+def _difficulty_value(value: float) -> np.uint16:
+    return np.uint16(min(max(value, 0), np.iinfo(np.uint16).max))
+
+
+class SequenceBank:
+    """Заранее сгенерированные задачи «продолжи последовательность».
+
+    Задачи лежат в одном структурированном массиве NumPy (36 байт на задачу),
+    отсортированном по сложности: случайная задача — O(1), задача из
+    диапазона сложности — двоичный поиск по границам. Массив можно сохранить
+    в .npy и открывать через memory-map, не загружая целиком в память.
+    """
+
+    def __init__(self, tasks: np.ndarray):
+        if len(tasks) == 0:
+            raise ValueError("Пустой банк задач")
+        self.tasks = tasks
+        # Поле структурированного массива — страйдовый вид, searchsorted копировал бы его
+        self._difficulty = np.ascontiguousarray(tasks['difficulty'])
+        # Различных геометрических прогрессий с небольшими числами мало,
+        # чередований шагов — много: без ограничений вид выбирается поровну
+        kinds = np.asarray(tasks['kind'])
+        self._by_kind = [rows for rows in (np.flatnonzero(kinds == kind_id).astype(np.int32)
+                                           for kind_id in range(len(KINDS))) if len(rows)]
+
+    @classmethod
+    def generate(cls, size: int, seed: Optional[int] = None) -> 'SequenceBank':
+        return cls(generate_tasks(size, seed))
+
+    @classmethod
+    def load(cls, path: str) -> 'SequenceBank':
+        tasks = np.load(path, mmap_mode='r')
+        if tasks.dtype != TASK_DTYPE:
+            raise ValueError(f"Файл {path} не является банком задач")
+        return cls(tasks)
+
+    def save(self, path: str):
+        np.save(path, np.asarray(self.tasks))
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def draw(self, min_difficulty: Optional[int] = None, max_difficulty: Optional[int] = None) -> int:
+        """Индекс случайной задачи, при указании границ — со сложностью в них"""
+        low, high = 0, len(self.tasks)
+        if min_difficulty is not None or max_difficulty is not None:
+            # Граница того же типа, что и массив, иначе searchsorted приводит весь массив
+            if min_difficulty is not None:
+                low = int(np.searchsorted(self._difficulty, _difficulty_value(min_difficulty), side='left'))
+            if max_difficulty is not None:
+                high = int(np.searchsorted(self._difficulty, _difficulty_value(max_difficulty), side='right'))
+            if low >= high:
+                # В диапазоне пусто: ближайшая по сложности задача
+                return min(low, len(self.tasks) - 1)
+            return random.randrange(low, high)
+        rows = random.choice(self._by_kind)
+        return int(rows[random.randrange(len(rows))])
+
+    def task(self, index: int) -> dict:
+        """Задача в формате генератора игр: question, options, correct"""
+        terms, options, difficulty, correct, kind = self.tasks[index].item()
+        terms = ', '.join(map(str, terms.tolist()))
+        return {
+            'question': f"Найдите следующее число в последовательности:\n{terms}, ?",
+            'options': options.tolist(),
+            'correct': correct,
+            'difficulty': difficulty,
+            'kind': KINDS[kind],
+        }
+
+
+def load_sequence_bank(path: str, size: int, seed: int) -> SequenceBank:
+    """Банк из файла ``path``; если файла нет — генерируется (и сохраняется, если путь задан)"""
+    if path and os.path.exists(path):
+        bank = SequenceBank.load(path)
+        logger.info(f"Банк последовательностей загружен из {path}: {len(bank)} задач")
+        return bank
+    bank = SequenceBank.generate(size, seed)
+    logger.info(f"Сгенерирован банк последовательностей: {len(bank)} задач")
+    if path:
+        try:
+            bank.save(path)
+        except OSError as e:
+            # Без файла бот работает, но банк будет генерироваться при каждом запуске
+            logger.warning(f"Не удалось сохранить банк последовательностей в {path}: {e}")
+    return bank
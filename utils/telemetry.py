@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+# (user_id, test_type, question_id, chosen, correct, latency_ms, created_at)
+AnswerEvent = Tuple[int, str, int, int, bool, Optional[int], float]
+
+
+class AnswerRecorder:
+    """Журнал ответов на вопросы тестов.
+
+    Обработчик ответа только кладёт событие в кольцевой буфер в памяти;
+    фоновая задача раз в ``flush_interval`` секунд пишет накопленное в
+    answer_events пачками по ``batch_size`` через executemany. Если база не
+    успевает и буфер заполнен, старые события вытесняются — счётчик
+    ``dropped`` показывает, сколько потеряно.
+    """
+
+    def __init__(self, database: Database, capacity: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: Deque[AnswerEvent] = deque(maxlen=capacity)
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.dropped = 0
+
+    def record(self, user_id: int, test_type: str, question_id: int, chosen: int, correct: bool,
+               latency: Optional[float] = None):
+        """Событие ответа; ``latency`` — секунд от показа вопроса до ответа"""
+        latency_ms = round(latency * 1000) if latency is not None else None
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((user_id, test_type, question_id, chosen, correct, latency_ms, time.time()))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    async def flush(self):
+        """Запись всего накопленного пачками"""
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                try:
+                    await self.database.save_answer_events(batch)
+                except BaseException as e:
+                    # Возвращаем пачку в начало буфера, попробуем в следующий раз;
+                    # при отмене (close во время записи) — допишет close
+                    free = self._buffer.maxlen - len(self._buffer)
+                    self._buffer.extendleft(reversed(batch[-free:] if free else []))
+                    self.dropped += len(batch) - min(free, len(batch))
+                    if not isinstance(e, Exception):
+                        raise
+                    logger.error(f"Ошибка записи событий ответов: {e}")
+                    return
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+        if self.dropped:
+            logger.warning(f"Потеряно событий ответов при переполнении буфера: {self.dropped}")
@@ -0,0 +1,41 @@
+import math
+import time
+import uuid
+from typing import List, Optional, Sequence
+
+# Отметки time.monotonic() сравнимы только внутри одного процесса
+_PROCESS = uuid.uuid4().hex[:12]
+
+
+def mark() -> list:
+    """Отметка времени для FSM-состояния: [процесс, monotonic, time.time()]"""
+    return [_PROCESS, time.monotonic(), time.time()]
+
+
+def seconds_since(marker, now: Optional[list] = None) -> Optional[float]:
+    """Секунд от ``marker`` до ``now`` (по умолчанию — до текущего момента).
+
+    В том же процессе считается по монотонным часам; если состояние пришло
+    из другого процесса (webhook на нескольких экземплярах, перезапуск) —
+    по системным. Старые отметки — просто time.time().
+    """
+    if marker is None:
+        return None
+    now = now or mark()
+    if isinstance(marker, (int, float)):
+        return max(0.0, now[2] - marker)
+    process, monotonic, wall = marker
+    if process == now[0]:
+        return max(0.0, now[1] - monotonic)
+    return max(0.0, now[2] - wall)
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Перцентиль ``q`` (0–100) с линейной интерполяцией между соседними значениями"""
+    if not values:
+        return None
+    ordered: List[float] = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
@@ -0,0 +1,127 @@
+import asyncio
+import hmac
+import logging
+from typing import List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """Приём обновлений от Telegram через webhook.
+
+    Запрос с неверным секретом отклоняется, корректное обновление кладётся
+    в очередь и сразу подтверждается — Telegram не ждёт обработчиков.
+    Очередь разбирают ``workers`` задач; при переполнении очереди отвечаем
+    503, и Telegram повторит доставку позже. При остановке новые обновления
+    не принимаются, а уже принятые дорабатываются не дольше ``drain_timeout``
+    секунд.
+    """
+
+    def __init__(self, bot: Bot, dispatcher: Dispatcher, path: str = '/webhook',
+                 secret: Optional[str] = None, workers: int = 50, queue_size: int = 1000,
+                 drain_timeout: float = 30.0):
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.path = path
+        self.secret = secret
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.received = 0
+        self.processed = 0
+        self.rejected = 0
+        self._draining = False
+        self._worker_tasks: List[asyncio.Task] = []
+        self._runner: Optional[web.AppRunner] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self._handle)
+        app.router.add_get('/healthz', self._health)
+        return app
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8080, url: Optional[str] = None) -> int:
+        """Запуск сервера и воркеров; с ``url`` webhook регистрируется в Telegram. Возвращает порт"""
+        self._draining = False
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+
+        if url:
+            await self.bot.set_webhook(
+                url=url.rstrip('/') + self.path,
+                secret_token=self.secret,
+                allowed_updates=self.dispatcher.resolve_used_update_types(),
+                max_connections=min(self.workers, 100)
+            )
+        logger.info(f"Webhook слушает {host}:{port}{self.path}, воркеров: {self.workers}")
+        return port
+
+    async def stop(self):
+        """Плавная остановка: перестать принимать, доработать очередь, остановить воркеры"""
+        self._draining = True
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не обработано при остановке: {self.queue.qsize()} обновлений")
+
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if self.secret is not None:
+            token = request.headers.get(SECRET_HEADER, '')
+            # Байты, а не str: compare_digest не принимает строки с не-ASCII символами
+            if not hmac.compare_digest(token.encode('utf-8', 'surrogateescape'), self.secret.encode()):
+                return web.Response(status=401)
+        if self._draining:
+            return web.Response(status=503)
+
+        try:
+            update = Update.model_validate(await request.json(), context={'bot': self.bot})
+        except Exception as e:
+            # Повтор не поможет: подтверждаем, чтобы Telegram не присылал его снова
+            logger.warning(f"Некорректное обновление: {e}")
+            return web.Response()
+
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return web.Response(status=503)
+        self.received += 1
+        return web.Response()
+
+    async def _health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'queue': self.queue.qsize(),
+            'received': self.received,
+            'processed': self.processed,
+            'rejected': self.rejected,
+            'draining': self._draining
+        })
+
+    async def _worker(self):
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"Ошибка обработки обновления {update.update_id}: {e}")
+            finally:
+                self.processed += 1
+                self.queue.task_done()